@@ -9,9 +9,12 @@ IEC 编码解析与拓扑分析服务
 - Excel 数据导入
 """
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from routers import parse, topology, import_data
+from services.executor import ExecutorBusyError, executor_stats
+from services.import_jobs import import_job_manager
 
 app = FastAPI(
     title="IEC 81346 Logic Engine",
@@ -34,12 +37,30 @@ app.include_router(topology.router, prefix="/api/topology", tags=["拓扑"])
 app.include_router(import_data.router, prefix="/api/import", tags=["导入"])
 
 
+@app.on_event("startup")
+async def resume_import_jobs():
+    """恢复上次进程退出时尚未完成的导入任务"""
+    import_job_manager.resume_pending()
+
+
+@app.exception_handler(ExecutorBusyError)
+async def executor_busy_handler(request: Request, exc: ExecutorBusyError):
+    """线程池排队已满时返回 503，提示调用方稍后重试"""
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
+
 @app.get("/health")
 async def health_check():
     """健康检查接口"""
     return {"status": "ok", "service": "logic-engine"}
 
 
+@app.get("/metrics/executors")
+async def get_executor_metrics():
+    """线程池指标：并发数、排队深度、完成/失败/拒绝次数及平均耗时"""
+    return executor_stats()
+
+
 @app.get("/")
 async def root():
     """根路径 - 服务信息"""
@@ -48,11 +69,30 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "health": "/health",
+            "executor_metrics": "GET /metrics/executors",
             "parse_code": "POST /api/parse/code",
             "parse_hierarchy": "POST /api/parse/hierarchy",
             "parse_excel": "POST /api/parse/excel",
             "trace_topology": "POST /api/topology/trace",
+            "trace_topology_batch": "POST /api/topology/trace/batch",
+            "find_path": "POST /api/topology/path",
+            "graph_cache_stats": "GET /api/topology/cache/stats",
+            "hierarchy_subtree": "GET /api/topology/hierarchy/{file_id}/subtree",
+            "hierarchy_ancestors": "GET /api/topology/hierarchy/{file_id}/ancestors",
+            "power_critical_upstream": "GET /api/topology/power/{file_id}/critical-upstream",
+            "power_outage_impact": "GET /api/topology/power/{file_id}/outage-impact",
+            "power_impact_ranking": "GET /api/topology/power/{file_id}/impact-ranking",
+            "power_is_ancestor": "POST /api/topology/power/{file_id}/is-ancestor",
+            "power_common_upstream": "POST /api/topology/power/{file_id}/common-upstream",
+            "power_contingency": "GET /api/topology/power/{file_id}/contingency",
+            "power_contingency_lost_devices": "GET /api/topology/power/{file_id}/contingency/lost-devices",
+            "live_switch_updates": "POST /api/topology/live/{file_id}/switches",
+            "live_state": "GET /api/topology/live/{file_id}/state",
+            "live_reset": "DELETE /api/topology/live/{file_id}",
             "import_excel": "POST /api/import/excel/{file_id}",
+            "submit_import_job": "POST /api/import/jobs/excel/{file_id}",
+            "get_import_job": "GET /api/import/jobs/{job_id}",
+            "cancel_import_job": "POST /api/import/jobs/{job_id}/cancel",
             "clear_data": "DELETE /api/import/{file_id}",
             "get_stats": "GET /api/import/{file_id}/stats"
         }
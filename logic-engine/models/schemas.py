@@ -54,17 +54,30 @@ class ExcelImportResponse(BaseModel):
 
 class TraceRequest(BaseModel):
     """拓扑追溯请求"""
-    object_id: str = Field(..., description="起始对象 ID")
+    object_id: str = Field(..., description="起始对象 ID；电源图模式下也可以是电源节点 ID、MC 编码或 full_code")
     direction: str = Field("upstream", description="追溯方向: upstream(上游) 或 downstream(下游)")
-    relation_type: str = Field("FEEDS_POWER_TO", description="关系类型，如 FEEDS_POWER_TO(供电)")
+    relation_type: str = Field("FEEDS_POWER_TO", description="关系类型，如 FEEDS_POWER_TO(供电)（对象关系图模式）")
+    file_id: Optional[int] = Field(None, description="模型文件 ID，追溯范围限定在该文件内")
+    source: Optional[str] = Field(
+        None,
+        description="图来源: relations(rds_relations 对象关系) 或 power(rds_power_nodes/edges 电源图)；"
+                    "默认提供 file_id 时为 power，否则为 relations"
+    )
+    edge_types: Optional[List[str]] = Field(
+        None,
+        description="电源图模式参与追溯的边类型: hierarchy / power_supply / backup，默认全部"
+    )
+    live: bool = Field(False, description="电源图模式按实时开关状态追溯（跳过断开的开关）")
 
 
 class TraceNode(BaseModel):
     """追溯节点"""
-    id: str = Field(..., description="对象 ID")
-    ref_code: str = Field(..., description="引用编码")
-    name: str = Field(..., description="对象名称")
+    id: str = Field(..., description="对象 ID（电源图模式为电源节点 ID）")
+    ref_code: str = Field(..., description="引用编码（电源图模式为 full_code）")
+    name: str = Field(..., description="对象名称（电源图模式为节点标签）")
     level: int = Field(..., description="距离起始节点的层级")
+    node_type: Optional[str] = Field(None, description="电源图节点类型: source/bus/feeder/device")
+    object_id: Optional[str] = Field(None, description="电源图节点关联的对象 ID")
 
 
 class TraceResponse(BaseModel):
@@ -73,6 +86,82 @@ class TraceResponse(BaseModel):
     total: int = Field(..., description="节点总数")
 
 
+class BatchTraceRequest(BaseModel):
+    """批量拓扑追溯请求"""
+    object_ids: List[str] = Field(..., description="起始对象 ID 列表；电源图模式下也可以是电源节点 ID、MC 编码或 full_code")
+    direction: str = Field("upstream", description="追溯方向: upstream(上游) 或 downstream(下游)")
+    relation_type: str = Field("FEEDS_POWER_TO", description="关系类型，如 FEEDS_POWER_TO(供电)（对象关系图模式）")
+    file_id: Optional[int] = Field(None, description="模型文件 ID，追溯范围限定在该文件内")
+    source: Optional[str] = Field(
+        None,
+        description="图来源: relations(rds_relations 对象关系) 或 power(rds_power_nodes/edges 电源图)；"
+                    "默认提供 file_id 时为 power，否则为 relations"
+    )
+    edge_types: Optional[List[str]] = Field(
+        None,
+        description="电源图模式参与追溯的边类型: hierarchy / power_supply / backup，默认全部"
+    )
+
+
+class BatchTraceResult(BaseModel):
+    """单个起始对象的追溯结果"""
+    object_id: str = Field(..., description="起始对象 ID")
+    found: bool = Field(..., description="起始对象是否存在")
+    nodes: List[TraceNode] = Field(..., description="追溯路径上的节点列表")
+    total: int = Field(..., description="节点总数")
+
+
+class BatchTraceResponse(BaseModel):
+    """批量拓扑追溯响应"""
+    results: List[BatchTraceResult] = Field(..., description="按请求顺序排列的各起始对象结果")
+    union: List[TraceNode] = Field(..., description="所有结果去重后的节点，level 为距最近起始节点的层级")
+    total: int = Field(..., description="去重后的节点总数")
+
+
+class ReachabilityPair(BaseModel):
+    """可达性查询的节点对"""
+    upstream: str = Field(..., description="上游候选：电源节点 ID、对象 ID、MC 编码或 full_code")
+    downstream: str = Field(..., description="下游节点：电源节点 ID、对象 ID、MC 编码或 full_code")
+
+
+class ReachabilityRequest(BaseModel):
+    """批量上下游判断请求"""
+    pairs: List[ReachabilityPair] = Field(..., description="待判断的节点对")
+    edge_types: Optional[List[str]] = Field(
+        None,
+        description="参与判断的边类型: hierarchy / power_supply / backup，默认全部"
+    )
+
+
+class ReachabilityResponse(BaseModel):
+    """批量上下游判断响应"""
+    results: List[Optional[bool]] = Field(
+        ...,
+        description="按请求顺序排列：upstream 是否为 downstream 的上游（不含自身），节点不存在时为 null"
+    )
+    unresolved: List[str] = Field(..., description="未找到的节点键")
+    total: int = Field(..., description="节点对数量")
+
+
+class CommonUpstreamRequest(BaseModel):
+    """最近公共上游查询请求"""
+    nodes: List[str] = Field(..., description="节点键列表：电源节点 ID、对象 ID、MC 编码或 full_code")
+
+
+class SwitchUpdateItem(BaseModel):
+    """单个开关变位：按边 ID 或按两端节点定位"""
+    state: str = Field(..., description="开关状态: open(断开) 或 closed(闭合)")
+    edge_id: Optional[str] = Field(None, description="rds_power_edges.id")
+    source: Optional[str] = Field(None, description="源节点键（节点 ID、对象 ID、MC 编码或 full_code）")
+    target: Optional[str] = Field(None, description="目标节点键")
+    relation_type: Optional[str] = Field(None, description="按两端节点定位时限定的边类型，不传表示两点间全部边")
+
+
+class SwitchBatchRequest(BaseModel):
+    """批量开关变位请求"""
+    updates: List[SwitchUpdateItem] = Field(..., description="按顺序应用的开关变位")
+
+
 # ==================== 树节点相关模型 ====================
 
 class TreeNode(BaseModel):
@@ -5,18 +5,25 @@
 - 上传并解析 Excel 文件
 - 将解析结果导入数据库
 - 清除已导入数据
+- 异步导入任务（提交、查询进度、取消、恢复）
 """
 
 from fastapi import APIRouter, UploadFile, File, HTTPException, Query
 from typing import Optional
-import pandas as pd
-import io
 
-from services.iec_parser import IECParser
-from services.importer import import_excel_data, clear_file_rds_data, ImportResult
+from services.excel_reader import spool_upload, remove_spooled
+from services.workbook_parser import parse_workbook_for_import
+from services.importer import (
+    import_excel_data,
+    replace_excel_data,
+    delta_import_excel_data,
+    clear_file_rds_data,
+    ImportResult,
+)
+from services.executor import import_executor, query_executor
+from services.import_jobs import import_job_manager
 
 router = APIRouter()
-parser = IECParser()
 
 
 @router.post("/excel/{file_id}")
@@ -24,7 +31,9 @@ async def import_excel_to_db(
     file_id: int,
     file: UploadFile = File(...),
     clear_existing: bool = Query(False, description="导入前清除现有数据"),
-    create_relations: bool = Query(True, description="自动创建供电关系")
+    create_relations: bool = Query(True, description="自动创建供电关系"),
+    swap: bool = Query(True, description="清除现有数据时先导入新数据再一次性切换"),
+    delta: bool = Query(False, description="增量导入：只写入变化的对象、方面、关系和电源图")
 ):
     """
     上传 Excel 并导入到数据库
@@ -40,6 +49,10 @@ async def import_excel_to_db(
         file: Excel 文件 (.xlsx 或 .xls)
         clear_existing: 是否在导入前清除该文件的现有 RDS 数据
         create_relations: 是否自动创建供电关系
+        swap: clear_existing 时是否使用替换模式：新数据完整导入后才替换旧数据，
+              导入期间追溯和树查询仍返回旧数据；为 False 时先清除再导入
+        delta: 增量导入，与现有数据比较后只写入差异（忽略 clear_existing），
+               返回结果中的 diff 为各类记录的增删改数量
         
     Returns:
         导入统计结果
@@ -52,8 +65,29 @@ async def import_excel_to_db(
             detail="仅支持 Excel 文件 (.xlsx, .xls)"
         )
     
-    # 如果需要，先清除现有数据
-    if clear_existing:
+    # 上传内容先落盘，随后在导入线程池中逐个工作表、分批读取
+    spooled_path = await spool_upload(file)
+    try:
+        return await import_executor.run(
+            _import_workbook, file_id, spooled_path, clear_existing, create_relations, swap, delta
+        )
+    finally:
+        remove_spooled(spooled_path)
+
+
+def _import_workbook(
+    file_id: int,
+    spooled_path: str,
+    clear_existing: bool,
+    create_relations: bool,
+    swap: bool = False,
+    delta: bool = False
+) -> dict:
+    """解析已落盘的 Excel 并导入数据库（阻塞操作，在导入线程池中执行）"""
+    replace = clear_existing and swap and not delta
+    
+    # 如果需要，先清除现有数据（替换模式下由 replace_excel_data 在导入完成后替换）
+    if clear_existing and not replace and not delta:
         clear_result = clear_file_rds_data(file_id)
         if not clear_result.get('success'):
             raise HTTPException(
@@ -61,168 +95,113 @@ async def import_excel_to_db(
                 detail=f"清除现有数据失败: {clear_result.get('error')}"
             )
     
-    # 读取文件内容
-    content = await file.read()
-    
-    try:
-        dfs = pd.read_excel(io.BytesIO(content), sheet_name=None)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"读取 Excel 文件失败: {str(e)}")
-    
-    # 列名映射（支持中英文列名）
-    column_mapping = {
-        '工艺功能': 'function',
-        '位置': 'location', 
-        '电源功能': 'power',
-        'ProcessFunction': 'function',
-        'Location': 'location',
-        'PowerFunction': 'power'
-    }
-    
-    # 解析 Excel 数据
-    parsed_objects = []
-    parse_errors = []
-    total_rows = 0
-    
-    # 1. 收集所有 Excel 行定义的显式对象
-    # ref_code -> obj_data
-    explicit_objects_map = {} 
-    # 记录所有已被显式对象占用的 full_code，避免为它们创建虚拟父节点
-    known_codes = set() 
-    
-    for sheet_name, df in dfs.items():
-        total_rows += len(df)
-        
-        for idx, row in df.iterrows():
-            try:
-                # 安全获取值，处理 NaN
-                name_val = row.get('名称', row.get('Name', ''))
-                name = str(name_val).strip() if pd.notna(name_val) else ""
-                if name.lower() == 'nan': name = ""
-
-                code_val = row.get('设备编码', row.get('DeviceCode', ''))
-                asset_code = str(code_val).strip() if pd.notna(code_val) else ""
-                if asset_code.lower() == 'nan': asset_code = ""
-                # 特殊补丁：如果设备编码等于名称，视为无效编码（可能是误填），强制分离
-                if asset_code == name: asset_code = ""
-                
-                # 生成唯一标识 ref_code
-                if asset_code:
-                    # 有设备编码：严格使用设备编码作为 ID，允许重复（意味着同一设备的多行定义）
-                    ref_code = asset_code
-                elif name:
-                    # 无设备编码：使用 Name + Sheet + RowIndex 确保物理独立性
-                    # (这是为了解决 115 个开关如果没有编码会被错误合并成 1 个的问题)
-                    ref_code = f"{name}_{sheet_name}_{idx}"
-                else:
-                    continue # 跳过空行
-                
-
-
-                obj = {
-                    'sheet': sheet_name,
-                    'row_index': int(idx),
-                    'name': name,
-                    'asset_code': asset_code,
-                    'ref_code': ref_code,
-                    'aspects': []
-                }
-                
-                # 解析三种方面编码（只取当前对象的直接编码）
-                for col_name, aspect_type in column_mapping.items():
-                    code = row.get(col_name, '')
-                    if pd.notna(code) and str(code).strip():
-                        # 清理编码 (保留末尾点号，因为它是叶子节点标识)
-                        code_str = str(code).strip()
-                        if code_str:
-                            # 仅解析当前编码结构，不展开层级
-                            parsed = parser.parse_code(code_str)
-                            if parsed:
-                                known_codes.add(parsed.full_code)
-                                obj['aspects'].append({
-                                    'full_code': parsed.full_code,
-                                    'prefix': parsed.prefix,
-                                    'aspect_type': parsed.aspect_type,
-                                    'hierarchy_level': parsed.hierarchy_level,
-                                    'parent_code': parsed.parent_code
-                                })
-                
-                if obj['aspects']:
-                    if ref_code in explicit_objects_map:
-                        # 核心逻辑变更：如果对象已存在，则合并 aspects (一物多面)
-                        existing_obj = explicit_objects_map[ref_code]
-                        existing_obj['aspects'].extend(obj['aspects'])
-                        # 更新属性为最新一行的值（如名称修正）
-                        existing_obj['name'] = obj['name']
-                        existing_obj['sheet'] = obj['sheet']
-                        existing_obj['row_index'] = obj['row_index']
-                    else:
-                        explicit_objects_map[ref_code] = obj
-                    
-            except Exception as e:
-                parse_errors.append(f"Sheet '{sheet_name}' 行 {idx}: {str(e)}")
-    
-    parsed_objects = list(explicit_objects_map.values())
-    
-    # 2. 补全缺失的父节点（虚拟对象）
-    virtual_objects = []
-    processed_virtual_codes = set()
-
-    for obj in parsed_objects:
-        for aspect in obj['aspects']:
-            # 展开该 aspect 的所有父级
-            hierarchy = parser.expand_hierarchy(aspect['full_code'])
-            
-            # 排除掉最后一个（即它自己）
-            parents = hierarchy[:-1] if hierarchy else []
-            
-            for p in parents:
-                if p.full_code in known_codes:
-                    continue # 已经有显式对象了，跳过
-                
-                if p.full_code in processed_virtual_codes:
-                    continue # 已经创建过虚拟对象了，跳过
-                
-                # 创建虚拟系统对象
-                virtual_obj = {
-                    'sheet': 'SYSTEM_GENERATED',
-                    'row_index': -1,
-                    'name': p.full_code,  # 虚拟对象默认用编码作为名称
-                    'asset_code': p.full_code, # 用 full_code 作为 ref_code
-                    'object_type': 'system',
-                    'aspects': [{
-                        'full_code': p.full_code,
-                        'prefix': p.prefix,
-                        'aspect_type': p.aspect_type,
-                        'hierarchy_level': p.hierarchy_level,
-                        'parent_code': p.parent_code
-                    }]
-                }
-                virtual_objects.append(virtual_obj)
-                processed_virtual_codes.add(p.full_code)
-    
-    # 合并显式对象和虚拟对象
-    all_objects = parsed_objects + virtual_objects
-    
-    # 导入到数据库
-    import_result = import_excel_data(
+    # 导入到数据库（解析批次在导入过程中逐批产出并写入暂存表）
+    if delta:
+        import_data = delta_import_excel_data
+    elif replace:
+        import_data = replace_excel_data
+    else:
+        import_data = import_excel_data
+    workbook = parse_workbook_for_import(spooled_path)
+    import_result = import_data(
         file_id=file_id,
-        parsed_objects=all_objects,
+        object_batches=workbook.batches(),
         create_power_relations=create_relations
     )
+    if workbook.read_error is not None:
+        raise HTTPException(status_code=400, detail=f"读取 Excel 文件失败: {str(workbook.read_error)}")
     
-    return {
+    response = {
         'success': import_result.success,
         'statistics': {
-            'total_rows': total_rows,
-            'parsed_objects': len(parsed_objects), # 只统计显式解析的对象
-            'virtual_objects_created': len(virtual_objects), # 额外统计虚拟对象
+            'total_rows': workbook.total_rows,
+            'parsed_objects': workbook.parsed_objects, # 只统计显式解析的对象
+            'virtual_objects_created': workbook.virtual_objects, # 额外统计虚拟对象
             'objects_created': import_result.objects_created,
             'aspects_created': import_result.aspects_created,
             'relations_created': import_result.relations_created
         },
-        'errors': parse_errors + import_result.errors
+        'errors': workbook.errors + import_result.errors
     }
+    if delta:
+        response['diff'] = import_result.diff
+    return response
+
+
+# ==================== 异步导入任务 ====================
+
+@router.post("/jobs/excel/{file_id}")
+async def submit_import_job(
+    file_id: int,
+    file: UploadFile = File(...),
+    clear_existing: bool = Query(False, description="导入前清除现有数据"),
+    create_relations: bool = Query(True, description="自动创建供电关系")
+):
+    """
+    提交异步导入任务
+    
+    与 POST /excel/{file_id} 的导入结果相同，但立即返回任务 ID，
+    调用方通过 GET /jobs/{job_id} 轮询进度，无需长时间保持 HTTP 连接。
+    
+    Returns:
+        任务状态
+    """
+    valid_extensions = ('.xlsx', '.xls')
+    if not file.filename.lower().endswith(valid_extensions):
+        raise HTTPException(
+            status_code=400, 
+            detail="仅支持 Excel 文件 (.xlsx, .xls)"
+        )
+    
+    spooled_path = await spool_upload(file)
+    try:
+        job = await query_executor.run(
+            import_job_manager.submit, file_id, spooled_path, clear_existing, create_relations
+        )
+    finally:
+        # 提交成功后文件已移动到任务目录，这里只清理失败时的残留
+        remove_spooled(spooled_path)
+    
+    return job.to_dict()
+
+
+@router.get("/jobs")
+async def list_import_jobs(file_id: Optional[int] = Query(None, description="按模型文件过滤")):
+    """列出导入任务（按创建时间倒序）"""
+    jobs = await query_executor.run(import_job_manager.list, file_id)
+    return {'jobs': [job.to_dict() for job in jobs]}
+
+
+@router.get("/jobs/{job_id}")
+async def get_import_job(job_id: str):
+    """
+    查询导入任务状态与进度
+    
+    status: queued / running / succeeded / failed / cancelled
+    progress: 已解析行数、已写入的对象/方面/关系/电源图节点与边数量
+    """
+    job = await query_executor.run(import_job_manager.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"导入任务不存在: {job_id}")
+    return job.to_dict()
+
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_import_job(job_id: str):
+    """取消导入任务（在阶段或解析批次之间生效）"""
+    job = await query_executor.run(import_job_manager.cancel, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"导入任务不存在: {job_id}")
+    return job.to_dict()
+
+
+@router.post("/jobs/{job_id}/resume")
+async def resume_import_job(job_id: str):
+    """从最后一个完成的阶段重新执行失败的任务"""
+    job = await query_executor.run(import_job_manager.resume, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"导入任务不存在: {job_id}")
+    return job.to_dict()
 
 
 @router.delete("/{file_id}")
@@ -231,7 +210,7 @@ async def clear_rds_data(file_id: int):
     清除指定文件的所有 RDS 数据
     
     删除该文件关联的所有 rds_objects、rds_aspects、rds_relations 记录。
-    用于重新导入数据前的清理操作。
+    用于重新导入数据前的清理操作。分区表结构下直接删除该文件的分区。
     
     Args:
         file_id: 模型文件 ID
@@ -239,7 +218,7 @@ async def clear_rds_data(file_id: int):
     Returns:
         删除统计
     """
-    result = clear_file_rds_data(file_id)
+    result = await query_executor.run(clear_file_rds_data, file_id)
     
     if not result.get('success'):
         raise HTTPException(
@@ -268,6 +247,11 @@ async def get_rds_stats(file_id: int):
     Returns:
         数据统计
     """
+    return await query_executor.run(_query_rds_stats, file_id)
+
+
+def _query_rds_stats(file_id: int) -> dict:
+    """查询 RDS 数据统计（阻塞操作，在查询线程池中执行）"""
     from sqlalchemy import text
     from services.importer import SessionLocal
     
@@ -283,11 +267,10 @@ async def get_rds_stats(file_id: int):
             
             # 方面统计
             aspects_result = session.execute(text("""
-                SELECT a.aspect_type, COUNT(*) as count
-                FROM rds_aspects a
-                JOIN rds_objects o ON a.object_id = o.id
-                WHERE o.file_id = :file_id
-                GROUP BY a.aspect_type
+                SELECT aspect_type, COUNT(*) as count
+                FROM rds_aspects
+                WHERE file_id = :file_id
+                GROUP BY aspect_type
             """), {'file_id': file_id}).fetchall()
             
             # 关系统计
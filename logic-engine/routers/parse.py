@@ -9,10 +9,13 @@
 
 from fastapi import APIRouter, UploadFile, File, HTTPException
 from typing import List
+import numpy as np
 import pandas as pd
-import io
 
 from services.iec_parser import IECParser
+from services.excel_reader import spool_upload, iter_sheet_batches, remove_spooled
+from services.workbook_parser import ASSET_CODE_COLUMNS, NAME_COLUMNS, parse_aspect_columns, text_column
+from services.executor import import_executor
 from models.schemas import (
     ParseRequest, 
     ParseResponse, 
@@ -106,87 +109,109 @@ async def import_excel(file: UploadFile = File(...)):
             detail="仅支持 Excel 文件 (.xlsx, .xls)"
         )
     
-    # 读取文件内容
-    content = await file.read()
-    
+    # 上传内容先落盘，随后逐个工作表、分批读取，避免原始字节和整表 DataFrame 驻留内存
+    # （响应本身包含全部解析对象，仍随对象数量增长）
+    spooled_path = await spool_upload(file)
     try:
-        # sheet_name=None 读取所有工作表，返回字典 {sheet_name: df}
-        dfs = pd.read_excel(io.BytesIO(content), sheet_name=None)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"读取 Excel 文件失败: {str(e)}")
-    
+        return await import_executor.run(_parse_workbook, spooled_path)
+    finally:
+        remove_spooled(spooled_path)
+
+
+def _parse_workbook(spooled_path: str) -> ExcelImportResponse:
+    """解析已落盘的 Excel（阻塞操作，在导入线程池中执行）"""
     results = ExcelImportResponse(
         total_rows=0,
         parsed_objects=[],
         errors=[]
     )
     
-    # 列名映射（支持中英文列名）
-    column_mapping = {
-        '工艺功能': 'function',
-        '位置': 'location', 
-        '电源功能': 'power',
-        'ProcessFunction': 'function',
-        'Location': 'location',
-        'PowerFunction': 'power'
-    }
-    
-    for sheet_name, df in dfs.items():
-        results.total_rows += len(df)
-        
-        for idx, row in df.iterrows():
+    try:
+        for sheet_name, df in iter_sheet_batches(spooled_path):
+            results.total_rows += len(df)
             try:
-                obj = ParsedObject(
-                    sheet=sheet_name,
-                    row_index=int(idx),
-                    name=str(row.get('名称', row.get('Name', ''))),
-                    asset_code=str(row.get('设备编码', row.get('DeviceCode', ''))),
-                    aspects=[]
-                )
-                
-                # 解析三种方面编码
-                for col_name, aspect_type in column_mapping.items():
-                    code = row.get(col_name, '')
-                    if pd.notna(code) and str(code).strip():
-                        # Debug: Log what we are finding for specific items
-                        if '1回路' in obj.name or 'AH1' in obj.name:
-                            print(f"[DEBUG] Row {idx} ({obj.name}): Found code '{code}' in column '{col_name}'")
-
-                        # Fix: Use parse_code instead of expand_hierarchy to avoid creating duplicate
-                        # aspect entries for parent levels when they are not explicitly defined as objects.
-                        # Each object should only claim the specific code defined in its row.
-                        parsed = parser.parse_code(str(code))
-                        if parsed:
-                            # Add Entity Aspect (e.g., ===A)
-                            obj.aspects.append(AspectInfo(
-                                full_code=parsed.full_code,
-                                prefix=parsed.prefix,
-                                aspect_type=parsed.aspect_type,
-                                hierarchy_level=parsed.hierarchy_level,
-                                parent_code=parsed.parent_code
-                            ))
-                            
-                            # Fix: Explicitly create Container Aspect (e.g., ===A.) if it's an entity
-                            # This ensures children can link to this object via the container node
-                            if not parsed.full_code.endswith('.'):
-                                container_code = parsed.full_code + '.'
-                                container_level = parsed.hierarchy_level + 1
-                                obj.aspects.append(AspectInfo(
-                                    full_code=container_code,
-                                    prefix=parsed.prefix,
-                                    aspect_type=parsed.aspect_type,
-                                    hierarchy_level=container_level,
-                                    parent_code=parsed.full_code # Container parent is the Entity itself
-                                ))
-                
-                results.parsed_objects.append(obj)
-                
-            except Exception as e:
-                results.errors.append(f"Sheet '{sheet_name}' 行 {idx}: {str(e)}")
+                results.parsed_objects.extend(_parse_objects(sheet_name, df))
+            except Exception:
+                # 列式解析失败时逐行重新解析，只有出错的行被跳过并报告
+                _parse_rows(results, sheet_name, df)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"读取 Excel 文件失败: {str(e)}")
     
     return results
 
 
+def _parse_rows(results: ExcelImportResponse, sheet_name: str, df: pd.DataFrame) -> None:
+    """逐行解析一个批次（列式解析失败时的回退路径），每行的错误单独记录"""
+    for position in range(len(df)):
+        row = df.iloc[position:position + 1]
+        try:
+            results.parsed_objects.extend(_parse_objects(sheet_name, row))
+        except Exception as e:
+            results.errors.append(f"Sheet '{sheet_name}' 行 {row.index[0]}: {str(e)}")
+
+
+def _parse_objects(sheet_name: str, df: pd.DataFrame) -> List[ParsedObject]:
+    """
+    列式解析一个批次的三种方面编码（工艺功能、位置、电源功能），每行生成一个对象
+
+    名称和设备编码按原值转为字符串（不做空值处理）。
+    """
+    def raw_text(names) -> pd.Series:
+        column = text_column(df, names)
+        if column is None:
+            return pd.Series('', index=df.index, dtype=object)
+        return column.astype(object).astype(str)
+
+    names = raw_text(NAME_COLUMNS)
+    asset_codes = raw_text(ASSET_CODE_COLUMNS)
+    row_aspects: List[List[AspectInfo]] = [[] for _ in range(len(df))]
+
+    for _, parsed in parse_aspect_columns(df):
+        # Fix: Use parse_code instead of expand_hierarchy to avoid creating duplicate
+        # aspect entries for parent levels when they are not explicitly defined as objects.
+        # Each object should only claim the specific code defined in its row.
+        valid = parsed.valid.to_numpy()
+        for position, full_code, prefix, aspect_type, level, parent_code in zip(
+            np.flatnonzero(valid).tolist(),
+            parsed.full_code[valid].tolist(),
+            parsed.prefix[valid].tolist(),
+            parsed.aspect_type[valid].tolist(),
+            parsed.hierarchy_level[valid].tolist(),
+            parsed.parent_code[valid].tolist()
+        ):
+            aspects = row_aspects[position]
+            # Add Entity Aspect (e.g., ===A)
+            aspects.append(AspectInfo(
+                full_code=full_code,
+                prefix=prefix,
+                aspect_type=aspect_type,
+                hierarchy_level=level,
+                parent_code=parent_code
+            ))
+
+            # Fix: Explicitly create Container Aspect (e.g., ===A.) if it's an entity
+            # This ensures children can link to this object via the container node
+            if not full_code.endswith('.'):
+                aspects.append(AspectInfo(
+                    full_code=full_code + '.',
+                    prefix=prefix,
+                    aspect_type=aspect_type,
+                    hierarchy_level=level + 1,
+                    parent_code=full_code # Container parent is the Entity itself
+                ))
+
+    return [
+        ParsedObject(
+            sheet=sheet_name,
+            row_index=int(idx),
+            name=name,
+            asset_code=asset_code,
+            aspects=aspects
+        )
+        for idx, name, asset_code, aspects in zip(df.index.tolist(), names.tolist(), asset_codes.tolist(), row_aspects)
+    ]
+
+
 @router.post("/batch")
 async def parse_batch(codes: List[str]):
     """
@@ -4,15 +4,61 @@
 提供设备拓扑关系追溯接口：
 - 上游追溯（如：追溯供电路径直到变压器）
 - 下游追溯（如：分析停电影响范围）
+- 路径查询
+- 层级子树 / 祖先查询 / 编码概要
+- 电源图分析（必经上游节点、故障影响范围、关键节点排名、批量上下游判断、最近公共上游、N-1 故障扫描）
+- 实时拓扑（开关状态、带电状态增量更新）
+
+追溯与路径查询基于按文件缓存的内存拓扑图，层级查询基于物化路径，均不再执行递归 CTE。
+追溯、路径与层级子树接口支持按 Accept: application/x-ndjson 协商流式响应（每行一个 JSON 对象）。
 """
 
+import json
 import os
-from fastapi import APIRouter, HTTPException
-from typing import List
+import threading
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, Union
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 
-from models.schemas import TraceRequest, TraceNode, TraceResponse
+from models.schemas import (
+    TraceRequest,
+    TraceNode,
+    TraceResponse,
+    BatchTraceRequest,
+    BatchTraceResult,
+    BatchTraceResponse,
+    ReachabilityRequest,
+    ReachabilityResponse,
+    CommonUpstreamRequest,
+    SwitchBatchRequest,
+)
+from services.graph_cache import (
+    GRAPH_SOURCES,
+    POWER_EDGE_TYPES,
+    POWER_SOURCE,
+    RELATIONS_SOURCE,
+    graph_cache,
+)
+from services.hierarchy import (
+    HIERARCHY_SOURCES,
+    code_trie,
+    iter_subtree,
+    query_ancestors,
+    query_subtree,
+    summarize_code,
+)
+from services.live_topology import SWITCH_STATES, SwitchUpdate, live_topology
+from services.power_analysis import (
+    common_upstream_index,
+    contingency,
+    dominator_tree,
+    downstream_impact,
+    reachability_index,
+)
+from services.executor import query_executor
 
 router = APIRouter()
 
@@ -34,88 +80,333 @@ engine = create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+# ==================== 流式响应 (NDJSON) ====================
+
+NDJSON_MEDIA_TYPES = ('application/x-ndjson', 'application/ndjson')
+
+
+def _wants_ndjson(http_request: Request) -> bool:
+    """客户端是否通过 Accept 头请求 NDJSON 流式响应"""
+    accept = http_request.headers.get('accept', '')
+    return any(media.split(';')[0].strip().lower() in NDJSON_MEDIA_TYPES for media in accept.split(','))
+
+
+# 同时进行的流式响应数量上限：响应发送期间占用 Starlette 线程池（层级子树还占用一个数据库连接），
+# 超出时返回 503
+MAX_NDJSON_STREAMS = int(os.getenv('NDJSON_MAX_STREAMS', '8'))
+
+# 层级子树流式会话的超时：单条语句（含每次 FETCH）/ 客户端读取缓慢导致的事务空闲
+NDJSON_STATEMENT_TIMEOUT = os.getenv('NDJSON_STATEMENT_TIMEOUT', '30s')
+NDJSON_IDLE_TIMEOUT = os.getenv('NDJSON_IDLE_TIMEOUT', '60s')
+
+_stream_slots = threading.BoundedSemaphore(MAX_NDJSON_STREAMS)
+
+
+class _StreamSlot:
+    """一个流式响应名额（释放只生效一次）"""
+
+    def __init__(self):
+        if not _stream_slots.acquire(blocking=False):
+            raise HTTPException(
+                status_code=503,
+                detail=f"流式响应数量已达上限 {MAX_NDJSON_STREAMS}，请稍后重试"
+            )
+        self._lock = threading.Lock()
+        self._released = False
+
+    def release(self) -> None:
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        _stream_slots.release()
+
+
+async def _ndjson_stream(prepare: Callable, *args, error_message: str) -> StreamingResponse:
+    """
+    在查询线程池中完成准备工作后返回 NDJSON 流式响应
+    
+    prepare(*args) 在 query_executor 中执行（排队已满时 503），负责加载图、打开游标等阻塞操作，
+    返回 (节点迭代器, 清理函数或 None)；准备阶段的错误以正常的 HTTP 状态码返回。
+    流结束、出错或客户端断开后释放流式名额并执行清理。
+    """
+    slot = _StreamSlot()
+    try:
+        items, cleanup = await query_executor.run(prepare, *args)
+    except BaseException:
+        slot.release()
+        raise
+    
+    def close():
+        try:
+            if cleanup is not None:
+                cleanup()
+        finally:
+            slot.release()
+    
+    return _ndjson_response(items, error_message, close)
+
+
+def _ndjson_response(
+    items: Iterable[dict],
+    error_message: str,
+    on_close: Optional[Callable[[], None]] = None
+) -> StreamingResponse:
+    """
+    逐行输出 JSON 对象的流式响应
+    
+    items 在响应发送过程中逐个生成，结果无需全部载入内存。
+    响应头发出后无法再返回错误状态码，生成过程中的异常以 {"error": ...} 行结束输出。
+    on_close 需可重复调用：输出结束时调用一次，响应结束后（含客户端提前断开）再作为后台任务调用一次。
+    """
+    def lines():
+        try:
+            for item in items:
+                yield json.dumps(item, ensure_ascii=False) + '\n'
+        except Exception as e:
+            yield json.dumps({"error": f"{error_message}: {str(e)}"}, ensure_ascii=False) + '\n'
+        finally:
+            if on_close is not None:
+                on_close()
+    
+    background = BackgroundTask(on_close) if on_close is not None else None
+    return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPES[0], background=background)
+
+
+# ==================== 追溯 ====================
+
 @router.post("/trace", response_model=TraceResponse)
-async def trace_topology(request: TraceRequest):
+async def trace_topology(request: TraceRequest, http_request: Request):
     """
     递归追溯上下游关系
     
-    使用 PostgreSQL Recursive CTE 实现图遍历，支持：
+    基于按文件缓存的内存拓扑图（见 services/graph_cache.py）做广度优先遍历，支持：
     - upstream: 向上游追溯（如：设备 -> 配电柜 -> 变压器）
     - downstream: 向下游追溯（如：变压器 -> 配电柜 -> 所有终端设备）
     
+    两种图来源：
+    - relations: rds_relations 对象关系图，按 relation_type 追溯
+    - power: 文件的电源图 (rds_power_nodes/rds_power_edges)，按 edge_types 追溯；
+      起始节点可以是电源节点 ID、对象 ID、MC 编码或 full_code；live=true 时跳过断开的开关
+    
+    Accept: application/x-ndjson 时以 NDJSON 流式返回，每行一个节点；
+    下游追溯边遍历边输出，上游追溯需要全部遍历后按层级倒序输出。
+    
     Args:
-        request: 追溯请求，包含起始对象ID、方向和关系类型
+        request: 追溯请求，包含起始对象ID、方向、关系类型和可选的文件范围
         
     Returns:
         追溯路径上的所有节点
     """
+    source = _trace_source(request)
+    if source == POWER_SOURCE:
+        if request.file_id is None:
+            raise HTTPException(status_code=400, detail="电源图追溯需要提供 file_id")
+        _check_power_edge_types(request.edge_types)
+    if _wants_ndjson(http_request):
+        return await _ndjson_stream(_prepare_trace_stream, request, source, error_message="追溯查询失败")
+    return await query_executor.run(_trace, request, source)
+
+
+def _check_power_edge_types(edge_types: Optional[List[str]]) -> None:
+    invalid = [t for t in edge_types or () if t not in POWER_EDGE_TYPES]
+    if invalid:
+        raise HTTPException(
+            status_code=400,
+            detail=f"不支持的边类型: {', '.join(invalid)}，可选值: {', '.join(POWER_EDGE_TYPES)}"
+        )
+
+
+def _trace_source(request: Union[TraceRequest, BatchTraceRequest]) -> str:
+    """请求使用的图来源（未指定时有 file_id 即为电源图）"""
+    if request.source is None:
+        return POWER_SOURCE if request.file_id is not None else RELATIONS_SOURCE
+    if request.source not in GRAPH_SOURCES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"不支持的 source: {request.source}，可选值: {', '.join(GRAPH_SOURCES)}"
+        )
+    return request.source
+
+
+def _resolve_trace(request: TraceRequest, source: str):
+    """
+    定位追溯使用的图与起始节点
     
+    Returns:
+        (图, 起始节点编号, 关系类型, 断开的边)，起始对象不存在时返回 None
+    """
+    with SessionLocal() as session:
+        file_id = request.file_id
+        if source == POWER_SOURCE:
+            relation_types = request.edge_types or POWER_EDGE_TYPES
+        else:
+            if file_id is None:
+                file_id = graph_cache.find_file_id(session, request.object_id)
+            relation_types = request.relation_type
+        if file_id is None:
+            return None
+        live = live_topology.get(session, file_id) if source == POWER_SOURCE and request.live else None
+        graph = live.graph if live is not None else graph_cache.get_graph(session, file_id, source)
+    
+    start = graph.resolve(request.object_id)
+    if start is None:
+        return None
+    return graph, start, relation_types, live.blocked_edges() if live is not None else None
+
+
+def _trace(request: TraceRequest, source: str = RELATIONS_SOURCE) -> TraceResponse:
+    """执行追溯（阻塞操作，在查询线程池中执行）"""
+    try:
+        resolved = _resolve_trace(request, source)
+        if resolved is None:
+            return TraceResponse(nodes=[], total=0)
+        
+        graph, start, relation_types, blocked = resolved
+        nodes = _trace_nodes(graph, graph.trace(start, request.direction, relation_types, blocked=blocked))
+        
+        return TraceResponse(nodes=nodes, total=len(nodes))
+            
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"追溯查询失败: {str(e)}")
+
+
+def _prepare_trace_stream(request: TraceRequest, source: str):
+    """
+    准备追溯的流式输出（阻塞操作，在查询线程池中执行）
+    
+    图的加载与起始节点定位在此完成；上游追溯需要全部遍历后按层级排序，也在此完成，
+    下游追溯在响应发送过程中边遍历边输出。
+    """
+    try:
+        resolved = _resolve_trace(request, source)
+        if resolved is None:
+            return iter(()), None
+        
+        graph, start, relation_types, blocked = resolved
+        if request.direction == 'upstream':
+            traced = graph.trace(start, request.direction, relation_types, blocked=blocked)
+        else:
+            traced = graph.iter_trace(start, request.direction, relation_types, blocked=blocked)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"追溯查询失败: {str(e)}")
+    return (_trace_node(graph, node, level) for node, level in traced), None
+
+
+def _trace_node(graph, node: int, level: int) -> dict:
+    """追溯节点的字段（与 TraceNode 一致）"""
+    power = graph.source == POWER_SOURCE
+    return {
+        "id": graph.node_ids[node],
+        "ref_code": graph.ref_codes[node],
+        "name": graph.names[node],
+        "level": level,
+        "node_type": graph.node_types[node] if power else None,
+        "object_id": graph.object_ids[node] if power else None
+    }
+
+
+def _trace_nodes(graph, traced) -> List[TraceNode]:
+    """(节点编号, 层级) 列表转换为响应节点"""
+    return [TraceNode(**_trace_node(graph, node, level)) for node, level in traced]
+
+
+# 单次批量追溯的起始对象数量上限
+MAX_BATCH_TRACE_OBJECTS = 2000
+
+
+@router.post("/trace/batch", response_model=BatchTraceResponse)
+async def trace_topology_batch(request: BatchTraceRequest):
+    """
+    批量追溯多个起始对象的上下游关系
+    
+    所有起始对象共用一次文件归属查询和同一份内存拓扑图，返回：
+    - results: 与请求顺序一致的各起始对象结果（与 POST /trace 相同）
+    - union: 多起点一次广度优先遍历得到的去重节点集合
+    
+    与 POST /trace 相同，提供 file_id 时默认使用该文件的电源图（source=power，按 edge_types 追溯），
+    起始节点可以是电源节点 ID、对象 ID、MC 编码或 full_code。
+    
+    Args:
+        request: 起始对象 ID 列表、方向、关系类型和可选的文件范围
+        
+    Returns:
+        各起始对象结果与去重并集
+    """
+    if len(request.object_ids) > MAX_BATCH_TRACE_OBJECTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"起始对象数量超过上限 {MAX_BATCH_TRACE_OBJECTS}"
+        )
+    source = _trace_source(request)
+    if source == POWER_SOURCE:
+        if request.file_id is None:
+            raise HTTPException(status_code=400, detail="电源图追溯需要提供 file_id")
+        _check_power_edge_types(request.edge_types)
+    return await query_executor.run(_trace_batch, request, source)
+
+
+def _trace_batch(request: BatchTraceRequest, source: str = RELATIONS_SOURCE) -> BatchTraceResponse:
+    """执行批量追溯（阻塞操作，在查询线程池中执行）"""
     try:
         with SessionLocal() as session:
-            if request.direction == 'upstream':
-                # 上游追溯：从目标向电源方向追溯
-                query = text("""
-                    WITH RECURSIVE upstream AS (
-                        -- 起始节点
-                        SELECT o.id, o.ref_code, o.name, 0 as level
-                        FROM rds_objects o WHERE o.id::text = :object_id
-                        
-                        UNION ALL
-                        
-                        -- 递归向上游查找
-                        SELECT o.id, o.ref_code, o.name, u.level + 1
-                        FROM rds_objects o
-                        JOIN rds_relations r ON r.source_obj_id = o.id
-                        JOIN upstream u ON r.target_obj_id = u.id
-                        WHERE r.relation_type = :relation_type 
-                          AND u.level < 20  -- 防止无限递归
-                    )
-                    SELECT DISTINCT id, ref_code, name, level 
-                    FROM upstream 
-                    ORDER BY level DESC
-                """)
+            if request.file_id is not None:
+                file_ids = {object_id: request.file_id for object_id in request.object_ids}
+                graphs = {request.file_id: graph_cache.get_graph(session, request.file_id, source)}
             else:
-                # 下游追溯：从电源向终端方向追溯
-                query = text("""
-                    WITH RECURSIVE downstream AS (
-                        -- 起始节点
-                        SELECT o.id, o.ref_code, o.name, 0 as level
-                        FROM rds_objects o WHERE o.id::text = :object_id
-                        
-                        UNION ALL
-                        
-                        -- 递归向下游查找
-                        SELECT o.id, o.ref_code, o.name, d.level + 1
-                        FROM rds_objects o
-                        JOIN rds_relations r ON r.target_obj_id = o.id
-                        JOIN downstream d ON r.source_obj_id = d.id
-                        WHERE r.relation_type = :relation_type 
-                          AND d.level < 20  -- 防止无限递归
+                file_ids = graph_cache.find_file_ids(session, request.object_ids)
+                graphs = {
+                    file_id: graph_cache.get_graph(session, file_id)
+                    for file_id in sorted(set(file_ids.values()))
+                }
+        relation_types = (request.edge_types or POWER_EDGE_TYPES) if source == POWER_SOURCE else request.relation_type
+        
+        results: List[BatchTraceResult] = []
+        traced_by_id = {}
+        starts_by_file = {file_id: [] for file_id in graphs}
+        for object_id in request.object_ids:
+            if object_id not in traced_by_id:
+                file_id = file_ids.get(object_id)
+                graph = graphs.get(file_id)
+                start = graph.resolve(object_id) if graph is not None else None
+                if start is None:
+                    traced_by_id[object_id] = None
+                else:
+                    starts_by_file[file_id].append(start)
+                    traced_by_id[object_id] = _trace_nodes(
+                        graph, graph.trace(start, request.direction, relation_types)
                     )
-                    SELECT DISTINCT id, ref_code, name, level 
-                    FROM downstream 
-                    ORDER BY level
-                """)
-            
-            result = session.execute(query, {
-                'object_id': request.object_id,
-                'relation_type': request.relation_type
-            })
             
-            nodes = [
-                TraceNode(
-                    id=str(row.id), 
-                    ref_code=row.ref_code or '',
-                    name=row.name or '', 
-                    level=row.level
-                ) 
-                for row in result
-            ]
-            
-            return TraceResponse(nodes=nodes, total=len(nodes))
+            nodes = traced_by_id[object_id]
+            results.append(BatchTraceResult(
+                object_id=object_id,
+                found=nodes is not None,
+                nodes=nodes or [],
+                total=len(nodes or [])
+            ))
+        
+        union: List[TraceNode] = []
+        for file_id, starts in starts_by_file.items():
+            if starts:
+                graph = graphs[file_id]
+                union.extend(_trace_nodes(
+                    graph, graph.trace_many(starts, request.direction, relation_types)
+                ))
+        
+        return BatchTraceResponse(results=results, union=union, total=len(union))
             
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"追溯查询失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"批量追溯查询失败: {str(e)}")
+
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """
+    获取拓扑图缓存统计
+    
+    返回命中/未命中次数、构建耗时以及各文件缓存图的规模
+    """
+    return graph_cache.stats()
 
 
 @router.get("/relation-types")
@@ -151,92 +442,718 @@ async def get_relation_types():
     }
 
 
+# 单次路径查询返回的最大路径数
+MAX_PATHS = 10
+
+
 @router.post("/path")
-async def find_path(source_id: str, target_id: str, relation_type: str = "FEEDS_POWER_TO"):
+async def find_path(
+    http_request: Request,
+    source_id: str,
+    target_id: str,
+    relation_type: str = "FEEDS_POWER_TO",
+    k: int = Query(1, ge=1, le=MAX_PATHS, description="返回的最短路径条数（双电源设备可取 2 及以上）"),
+    file_id: Optional[int] = Query(None, description="模型文件 ID，提供时默认在电源图上查找"),
+    source: Optional[str] = Query(None, description="图来源: relations 或 power，默认规则与 /trace 相同")
+):
     """
     查找两个对象之间的路径
     
+    在缓存的邻接结构上做双向广度优先搜索，k > 1 时用 Yen 算法返回前 k 条无环最短路径，
+    节点详情随路径一起返回。电源图模式下沿 hierarchy / power_supply / backup 边查找，
+    两端可以是电源节点 ID、对象 ID、MC 编码或 full_code。
+    
     Args:
-        source_id: 起始对象 ID
-        target_id: 目标对象 ID
-        relation_type: 关系类型
+        source_id: 起始对象 ID（上游）
+        target_id: 目标对象 ID（下游）
+        relation_type: 关系类型（对象关系图模式）
+        k: 返回的路径条数
+        file_id: 模型文件 ID
+        source: 图来源
+        
+    Accept: application/x-ndjson 时以 NDJSON 流式返回，每行一条路径 {path_length, path}。
         
     Returns:
-        两点之间的路径（如果存在）
+        两点之间的路径（如果存在）：path 为最短路径，paths 为全部路径
     """
+    request = TraceRequest(object_id=source_id, relation_type=relation_type, file_id=file_id, source=source)
+    graph_source = _trace_source(request)
+    if graph_source == POWER_SOURCE and file_id is None:
+        raise HTTPException(status_code=400, detail="电源图路径查询需要提供 file_id")
+    if _wants_ndjson(http_request):
+        return await _ndjson_stream(
+            _prepare_path_stream, source_id, target_id, relation_type, k, file_id, graph_source,
+            error_message="路径查询失败"
+        )
+    return await query_executor.run(_find_path, source_id, target_id, relation_type, k, file_id, graph_source)
+
+
+def _find_path(
+    source_id: str,
+    target_id: str,
+    relation_type: str,
+    k: int = 1,
+    file_id: Optional[int] = None,
+    source: str = RELATIONS_SOURCE
+) -> dict:
+    """执行路径查询（阻塞操作，在查询线程池中执行）"""
     try:
-        with SessionLocal() as session:
-            query = text("""
-                WITH RECURSIVE path_finder AS (
-                    SELECT 
-                        o.id, 
-                        o.ref_code, 
-                        o.name, 
-                        0 as level,
-                        ARRAY[o.id] as path
-                    FROM rds_objects o 
-                    WHERE o.id::text = :source_id
-                    
-                    UNION ALL
-                    
-                    SELECT 
-                        o.id, 
-                        o.ref_code, 
-                        o.name, 
-                        pf.level + 1,
-                        pf.path || o.id
-                    FROM rds_objects o
-                    JOIN rds_relations r ON r.target_obj_id = o.id
-                    JOIN path_finder pf ON r.source_obj_id = pf.id
-                    WHERE r.relation_type = :relation_type 
-                      AND o.id != ALL(pf.path)  -- 防止循环
-                      AND pf.level < 20
-                )
-                SELECT id, ref_code, name, level, path
-                FROM path_finder 
-                WHERE id::text = :target_id
-                ORDER BY level
-                LIMIT 1
-            """)
-            
-            result = session.execute(query, {
-                'source_id': source_id,
-                'target_id': target_id,
-                'relation_type': relation_type
-            }).fetchone()
-            
-            if result:
-                # 获取路径上所有节点的详细信息
-                path_ids = result.path
-                nodes_query = text("""
-                    SELECT id, ref_code, name 
-                    FROM rds_objects 
-                    WHERE id = ANY(:path_ids)
-                """)
-                path_nodes = session.execute(nodes_query, {'path_ids': path_ids}).fetchall()
-                
-                # 按路径顺序排列
-                nodes_dict = {str(n.id): n for n in path_nodes}
-                ordered_nodes = []
-                for pid in path_ids:
-                    node = nodes_dict.get(str(pid))
-                    if node:
-                        ordered_nodes.append({
-                            "id": str(node.id),
-                            "ref_code": node.ref_code or '',
-                            "name": node.name or ''
-                        })
+        resolved = _resolve_paths(source_id, target_id, relation_type, file_id, source)
+        details = list(_iter_paths(*resolved, k)) if resolved is not None else []
+        
+        if details:
+            return {
+                "found": True,
+                "path_length": details[0]["path_length"],
+                "path": details[0]["path"],
+                "paths": details
+            }
+        else:
+            return {
+                "found": False,
+                "message": "未找到连接路径"
+            }
                 
-                return {
-                    "found": True,
-                    "path_length": result.level,
-                    "path": ordered_nodes
-                }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"路径查询失败: {str(e)}")
+
+
+def _prepare_path_stream(
+    source_id: str,
+    target_id: str,
+    relation_type: str,
+    k: int,
+    file_id: Optional[int],
+    source: str
+):
+    """准备路径查询的流式输出：加载图并定位两端节点（阻塞操作，在查询线程池中执行）"""
+    try:
+        resolved = _resolve_paths(source_id, target_id, relation_type, file_id, source)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"路径查询失败: {str(e)}")
+    return (_iter_paths(*resolved, k) if resolved is not None else iter(())), None
+
+
+def _resolve_paths(
+    source_id: str,
+    target_id: str,
+    relation_type: str,
+    file_id: Optional[int] = None,
+    source: str = RELATIONS_SOURCE
+):
+    """
+    定位路径查询使用的图与两端节点
+    
+    Returns:
+        (图, 起点编号, 终点编号, 关系类型)，任一端不存在时返回 None
+    """
+    with SessionLocal() as session:
+        if file_id is None and source == RELATIONS_SOURCE:
+            file_id = graph_cache.find_file_id(session, source_id)
+        graph = graph_cache.get_graph(session, file_id, source) if file_id is not None else None
+    if graph is None:
+        return None
+    
+    start = graph.resolve(source_id)
+    end = graph.resolve(target_id)
+    if start is None or end is None:
+        return None
+    
+    relation_types = POWER_EDGE_TYPES if source == POWER_SOURCE else relation_type
+    return graph, start, end, relation_types
+
+
+def _iter_paths(graph, start: int, end: int, relation_types, k: int = 1) -> Iterator[dict]:
+    """逐条产出路径详情 {path_length, path}，按长度升序"""
+    for path in graph.iter_shortest_paths(start, end, relation_types, k):
+        yield {
+            "path_length": len(path) - 1,
+            "path": [_path_node(graph, node) for node in path]
+        }
+
+
+def _path_node(graph, node: int) -> dict:
+    """路径节点详情"""
+    detail = {
+        "id": graph.node_ids[node],
+        "ref_code": graph.ref_codes[node],
+        "name": graph.names[node]
+    }
+    if graph.source == POWER_SOURCE:
+        detail["node_type"] = graph.node_types[node]
+        detail["object_id"] = graph.object_ids[node]
+    return detail
+
+
+# ==================== 层级查询（物化路径） ====================
+
+@router.get("/hierarchy/{file_id}/subtree")
+async def get_hierarchy_subtree(
+    http_request: Request,
+    file_id: int,
+    code: str = Query(..., description="子树根节点编码，如 =TA1 或 ===DY1.AH1"),
+    source: str = Query("aspect", description="aspect(方面编码树) 或 power(电源图层级)"),
+    max_depth: Optional[int] = Query(None, ge=0, description="最大相对深度，不传表示不限"),
+    include_self: bool = Query(True, description="是否包含根节点本身")
+):
+    """
+    查询编码的全部子孙节点
+    
+    使用 path 列的 GIN 索引一次查出整个子树，结果按深度优先顺序排列。
+    Accept: application/x-ndjson 时通过服务端游标分批读取并以 NDJSON 流式返回，每行一个节点。
+    
+    Returns:
+        子树节点列表，depth 为相对根节点的深度
+    """
+    _check_hierarchy_source(source)
+    if _wants_ndjson(http_request):
+        return await _ndjson_stream(
+            _open_subtree_stream, file_id, code, source, max_depth, include_self,
+            error_message="层级查询失败"
+        )
+    return await query_executor.run(_hierarchy_query, query_subtree, file_id, code, source, max_depth, include_self)
+
+
+def _open_subtree_stream(file_id: int, code: str, source: str, max_depth: Optional[int], include_self: bool):
+    """
+    打开子树查询的服务端游标（阻塞操作，在查询线程池中执行）
+    
+    会话在输出结束前保持打开，由流式响应结束时关闭；事务内设置语句超时和空闲超时，
+    客户端长时间不读取时由数据库结束会话，不会无限期占用连接。
+    """
+    session = SessionLocal()
+    try:
+        session.execute(
+            text("SELECT set_config('statement_timeout', :statement_timeout, true), "
+                 "set_config('idle_in_transaction_session_timeout', :idle_timeout, true)"),
+            {'statement_timeout': NDJSON_STATEMENT_TIMEOUT, 'idle_timeout': NDJSON_IDLE_TIMEOUT}
+        )
+        items = iter_subtree(session, file_id, code, source, max_depth, include_self, stream=True)
+    except Exception as e:
+        session.close()
+        raise HTTPException(status_code=500, detail=f"层级查询失败: {str(e)}")
+    return items, session.close
+
+
+@router.get("/hierarchy/{file_id}/ancestors")
+async def get_hierarchy_ancestors(
+    file_id: int,
+    code: str = Query(..., description="节点编码"),
+    source: str = Query("aspect", description="aspect(方面编码树) 或 power(电源图层级)"),
+    include_self: bool = Query(False, description="是否包含节点本身")
+):
+    """
+    查询编码的全部祖先节点（从根节点开始）
+    
+    Returns:
+        祖先节点列表，depth 为距查询节点的层数（父节点为 1）
+    """
+    _check_hierarchy_source(source)
+    return await query_executor.run(_hierarchy_query, query_ancestors, file_id, code, source, include_self)
+
+
+@router.get("/hierarchy/{file_id}/summary")
+async def get_hierarchy_summary(
+    file_id: int,
+    code: str = Query(..., description="节点编码"),
+    source: str = Query("aspect", description="aspect(方面编码树) 或 power(电源图层级)"),
+    limit: int = Query(100, ge=0, le=10000, description="最多返回的子孙编码数量")
+):
+    """
+    查询编码概要：是否存在、结构祖先（标记缺失的中间节点）、子树规模和子孙编码
+    
+    基于按文件缓存的编码前缀树，祖先与子树规模的计算为 O(depth)，适合树形界面的懒加载计数。
+    编码按段落归一化比较（=A..B 与 =A.B 视为同一节点）。
+    """
+    _check_hierarchy_source(source)
+    return await query_executor.run(_hierarchy_summary, file_id, code, source, limit)
+
+
+def _hierarchy_summary(file_id: int, code: str, source: str, limit: int) -> dict:
+    """执行编码概要查询（阻塞操作，在查询线程池中执行）"""
+    try:
+        with SessionLocal() as session:
+            trie = code_trie(session, file_id, source)
+        return {
+            'file_id': file_id,
+            'code': code,
+            'source': source,
+            **summarize_code(trie, code, limit)
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"层级查询失败: {str(e)}")
+
+
+def _check_hierarchy_source(source: str) -> None:
+    if source not in HIERARCHY_SOURCES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"不支持的 source: {source}，可选值: {', '.join(HIERARCHY_SOURCES)}"
+        )
+
+
+def _hierarchy_query(query, file_id: int, code: str, source: str, *args) -> dict:
+    """执行层级查询（阻塞操作，在查询线程池中执行）"""
+    try:
+        with SessionLocal() as session:
+            nodes = query(session, file_id, code, source, *args)
+        return {
+            'file_id': file_id,
+            'code': code,
+            'source': source,
+            'nodes': nodes,
+            'total': len(nodes)
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"层级查询失败: {str(e)}")
+
+
+# ==================== 电源图分析 ====================
+
+@router.get("/power/{file_id}/critical-upstream")
+async def get_critical_upstream(
+    file_id: int,
+    node: str = Query(..., description="电源图节点 ID、对象 ID、MC 编码或 full_code")
+):
+    """
+    查询节点的必经上游节点（单点故障）
+    
+    基于电源图支配树（含 backup 备用路径）：返回从电源到该节点的每条供电路径都经过的节点，
+    任何一个故障都会导致该节点失电。支配树按图版本缓存，查询耗时与结果数量成正比。
+    
+    Returns:
+        必经上游节点列表（从电源侧开始），level 为距查询节点的支配层数
+    """
+    return await query_executor.run(_power_analysis, file_id, node, _critical_upstream)
+
+
+@router.get("/power/{file_id}/outage-impact")
+async def get_outage_impact(
+    file_id: int,
+    node: str = Query(..., description="故障节点：电源图节点 ID、对象 ID、MC 编码或 full_code"),
+    devices_only: bool = Query(True, description="只返回设备节点")
+):
+    """
+    查询节点故障后失电的节点
+    
+    返回支配树中该节点的全部子孙，即所有供电路径（含 backup 备用路径）都经过该节点的节点。
+    
+    Returns:
+        失电节点列表，level 为相对故障节点的支配层数
+    """
+    return await query_executor.run(_power_analysis, file_id, node, _outage_impact, devices_only)
+
+
+def _critical_upstream(graph, node: int) -> List[Tuple[int, int]]:
+    return list(reversed(dominator_tree(graph).critical_upstream(node)))
+
+
+def _outage_impact(graph, node: int, devices_only: bool = True) -> List[Tuple[int, int]]:
+    dependents = dominator_tree(graph).dependents(node)
+    if devices_only:
+        dependents = [item for item in dependents if graph.node_types[item[0]] == 'device']
+    return dependents
+
+
+def _power_analysis(file_id: int, node_key: str, analyze, *args) -> dict:
+    """在文件的电源图上执行分析查询（阻塞操作，在查询线程池中执行）"""
+    try:
+        with SessionLocal() as session:
+            graph = graph_cache.get_graph(session, file_id, POWER_SOURCE)
+        
+        node = graph.resolve(node_key)
+        if node is None:
+            return {
+                "found": False,
+                "message": f"未找到电源图节点: {node_key}"
+            }
+        
+        nodes = _trace_nodes(graph, analyze(graph, node, *args))
+        return {
+            "found": True,
+            "file_id": file_id,
+            "node": _path_node(graph, node),
+            "nodes": nodes,
+            "total": len(nodes)
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"电源图分析失败: {str(e)}")
+
+
+# 影响排名单次返回的最大节点数
+MAX_IMPACT_RANKING = 1000
+
+
+@router.get("/power/{file_id}/impact-ranking")
+async def get_impact_ranking(
+    file_id: int,
+    top: int = Query(20, ge=1, le=MAX_IMPACT_RANKING, description="返回前 N 个节点"),
+    node_types: Optional[List[str]] = Query(None, description="只统计这些节点类型，如 bus、feeder"),
+    property: Optional[str] = Query(None, description="同时合计下游设备的 properties 数值属性，如 rated_power"),
+    order_by: str = Query("devices", description="排序依据: devices(设备数) 或 property(属性合计)")
+):
+    """
+    按下游供电设备数量排名关键节点
+    
+    每个文件的电源图一次逆拓扑序遍历算出全部节点的下游设备数（双电源设备只计一次），
+    结果按图版本缓存，导入后随图缓存失效在下次查询时重新计算。
+    
+    Returns:
+        排名节点列表，包含 device_count 与可选的 property_total
+    """
+    if order_by not in ('devices', 'property'):
+        raise HTTPException(status_code=400, detail=f"不支持的 order_by: {order_by}，可选值: devices, property")
+    if order_by == 'property' and not property:
+        raise HTTPException(status_code=400, detail="按属性排序需要提供 property")
+    return await query_executor.run(_impact_ranking, file_id, top, node_types, property, order_by)
+
+
+def _impact_ranking(
+    file_id: int,
+    top: int,
+    node_types: Optional[List[str]],
+    property_key: Optional[str],
+    order_by: str
+) -> dict:
+    """执行影响排名查询（阻塞操作，在查询线程池中执行）"""
+    try:
+        with SessionLocal() as session:
+            graph = graph_cache.get_graph(session, file_id, POWER_SOURCE)
+            impact = downstream_impact(graph, session, property_key)
+        
+        ranked = []
+        for node in impact.top(graph, top, set(node_types or ()), by_property=(order_by == 'property')):
+            item = _path_node(graph, node)
+            item["device_count"] = impact.device_counts[node]
+            if impact.totals is not None:
+                item["property_total"] = impact.totals[node]
+            ranked.append(item)
+        
+        return {
+            "file_id": file_id,
+            "property": property_key,
+            "order_by": order_by,
+            "nodes": ranked,
+            "total": len(ranked)
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"影响排名查询失败: {str(e)}")
+
+
+# 单次可达性判断的最大节点对数量
+MAX_REACHABILITY_PAIRS = 100000
+
+
+@router.post("/power/{file_id}/is-ancestor", response_model=ReachabilityResponse)
+async def check_is_ancestor(file_id: int, request: ReachabilityRequest):
+    """
+    批量判断 upstream 是否为 downstream 的电源上游
+    
+    使用按图版本缓存的区间标注可达性索引：生成森林先序区间覆盖树形部分，
+    双电源 / 备用电源边带来的额外可达范围合并为少量附加区间，每对节点一次二分查找。
+    
+    Returns:
+        与请求顺序一致的判断结果
+    """
+    if len(request.pairs) > MAX_REACHABILITY_PAIRS:
+        raise HTTPException(status_code=400, detail=f"节点对数量超过上限 {MAX_REACHABILITY_PAIRS}")
+    _check_power_edge_types(request.edge_types)
+    return await query_executor.run(_is_ancestor, file_id, request)
+
+
+def _is_ancestor(file_id: int, request: ReachabilityRequest) -> ReachabilityResponse:
+    """执行批量可达性判断（阻塞操作，在查询线程池中执行）"""
+    try:
+        with SessionLocal() as session:
+            graph = graph_cache.get_graph(session, file_id, POWER_SOURCE)
+        index = reachability_index(graph, request.edge_types or POWER_EDGE_TYPES)
+        
+        results: List[Optional[bool]] = []
+        unresolved = set()
+        for pair in request.pairs:
+            upstream = graph.resolve(pair.upstream)
+            downstream = graph.resolve(pair.downstream)
+            if upstream is None:
+                unresolved.add(pair.upstream)
+            if downstream is None:
+                unresolved.add(pair.downstream)
+            if upstream is None or downstream is None:
+                results.append(None)
+            else:
+                results.append(index.is_ancestor(upstream, downstream))
+        
+        return ReachabilityResponse(results=results, unresolved=sorted(unresolved), total=len(results))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"可达性判断失败: {str(e)}")
+
+
+# 单次最近公共上游查询的最大节点数量
+MAX_COMMON_UPSTREAM_NODES = 10000
+
+
+@router.post("/power/{file_id}/common-upstream")
+async def find_common_upstream(file_id: int, request: CommonUpstreamRequest):
+    """
+    查找一组节点的最近公共上游（如多个设备同时告警时的共同馈线 / 母线）
+    
+    在电源图支配树上做倍增 LCA：结果是所有节点的每条供电路径（含 backup 备用路径）
+    都经过的最近节点。跳转表按图版本缓存，每个节点 O(log 深度)。
+    
+    Returns:
+        common_upstream 为最近公共上游节点（可以是输入节点之一），
+        shared_upstream 为它及其全部必经上游（从电源侧开始）
+    """
+    if not request.nodes:
+        raise HTTPException(status_code=400, detail="nodes 不能为空")
+    if len(request.nodes) > MAX_COMMON_UPSTREAM_NODES:
+        raise HTTPException(status_code=400, detail=f"节点数量超过上限 {MAX_COMMON_UPSTREAM_NODES}")
+    return await query_executor.run(_common_upstream, file_id, request.nodes)
+
+
+def _common_upstream(file_id: int, node_keys: List[str]) -> dict:
+    """执行最近公共上游查询（阻塞操作，在查询线程池中执行）"""
+    try:
+        with SessionLocal() as session:
+            graph = graph_cache.get_graph(session, file_id, POWER_SOURCE)
+        
+        nodes = []
+        unresolved = []
+        for key in node_keys:
+            node = graph.resolve(key)
+            if node is None:
+                unresolved.append(key)
             else:
-                return {
-                    "found": False,
-                    "message": "未找到连接路径"
+                nodes.append(node)
+        
+        common = common_upstream_index(graph).lca_many(nodes) if nodes else -1
+        if common < 0:
+            return {
+                "found": False,
+                "unresolved": unresolved,
+                "message": "未找到公共上游节点（节点属于不同电源或不可从电源到达）"
+            }
+        
+        chain = [(common, 0)] + dominator_tree(graph).critical_upstream(common)
+        shared = _trace_nodes(graph, reversed(chain))
+        return {
+            "found": True,
+            "file_id": file_id,
+            "common_upstream": _path_node(graph, common),
+            "shared_upstream": shared,
+            "unresolved": unresolved,
+            "total": len(shared)
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"公共上游查询失败: {str(e)}")
+
+
+# N-1 扫描结果单页返回的最大数量
+MAX_CONTINGENCY_PAGE = 5000
+
+
+@router.get("/power/{file_id}/contingency")
+async def get_contingency(
+    file_id: int,
+    top: int = Query(50, ge=1, le=MAX_CONTINGENCY_PAGE, description="返回失电设备最多的前 N 个故障节点"),
+    node_types: Optional[List[str]] = Query(None, description="只统计这些节点类型，默认除 device 外全部"),
+    min_lost: int = Query(1, ge=0, description="只返回失电设备数不少于该值的故障节点")
+):
+    """
+    N-1 故障扫描：每个母线 / 馈线 / 电源单独故障时失去全部供电（含 backup 备用路径）的设备
+    
+    全部单节点故障由电源图支配树一次得到，结果按图版本缓存为紧凑的区间矩阵，
+    本接口返回按失电设备数排序的汇总，明细见 /contingency/lost-devices。
+    
+    Returns:
+        故障节点汇总列表（lost_device_count）、设备总数与无供电设备数
+    """
+    return await query_executor.run(_contingency_summary, file_id, top, node_types, min_lost)
+
+
+@router.get("/power/{file_id}/contingency/lost-devices")
+async def get_contingency_lost_devices(
+    file_id: int,
+    node: str = Query(..., description="故障节点：电源图节点 ID、对象 ID、MC 编码或 full_code"),
+    offset: int = Query(0, ge=0, description="分页起始位置"),
+    limit: int = Query(1000, ge=1, le=MAX_CONTINGENCY_PAGE, description="分页大小")
+):
+    """
+    查询 N-1 扫描结果中某个节点故障后失电的设备（分页）
+    
+    Returns:
+        失电设备列表与总数
+    """
+    return await query_executor.run(_contingency_lost_devices, file_id, node, offset, limit)
+
+
+def _contingency_summary(file_id: int, top: int, node_types: Optional[List[str]], min_lost: int) -> dict:
+    """执行 N-1 扫描汇总查询（阻塞操作，在查询线程池中执行）"""
+    try:
+        with SessionLocal() as session:
+            graph = graph_cache.get_graph(session, file_id, POWER_SOURCE)
+        result = contingency(graph)
+        
+        wanted = set(node_types) if node_types else None
+        elements = []
+        for node in result.ranking.tolist():
+            lost = int(result.lost_counts[node])
+            if lost < min_lost:
+                break
+            node_type = graph.node_types[node]
+            if (wanted is not None and node_type not in wanted) or (wanted is None and node_type == 'device'):
+                continue
+            item = _path_node(graph, node)
+            item["lost_device_count"] = lost
+            elements.append(item)
+            if len(elements) >= top:
+                break
+        
+        return {
+            "file_id": file_id,
+            "devices": int(len(result.device_order)) + result.unsupplied_devices,
+            "unsupplied_devices": result.unsupplied_devices,
+            "elements": elements,
+            "total": len(elements)
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"N-1 故障扫描失败: {str(e)}")
+
+
+def _contingency_lost_devices(file_id: int, node_key: str, offset: int, limit: int) -> dict:
+    """执行 N-1 失电设备明细查询（阻塞操作，在查询线程池中执行）"""
+    try:
+        with SessionLocal() as session:
+            graph = graph_cache.get_graph(session, file_id, POWER_SOURCE)
+        
+        node = graph.resolve(node_key)
+        if node is None:
+            return {
+                "found": False,
+                "message": f"未找到电源图节点: {node_key}"
+            }
+        
+        lost = contingency(graph).lost_devices(node)
+        return {
+            "found": True,
+            "file_id": file_id,
+            "node": _path_node(graph, node),
+            "devices": [_path_node(graph, device) for device in lost[offset:offset + limit].tolist()],
+            "total": int(len(lost))
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"N-1 故障扫描失败: {str(e)}")
+
+# ==================== 实时拓扑（开关状态） ====================
+
+# 单次开关变位的最大数量
+MAX_SWITCH_UPDATES = 10000
+
+
+@router.post("/live/{file_id}/switches")
+async def apply_switch_updates(file_id: int, request: SwitchBatchRequest):
+    """
+    批量写入开关变位（如 SCADA 变位事件）
+    
+    开关状态保存在内存中，带电状态增量更新：断开只重新判定断开点下游的带电区域，
+    闭合只遍历新获得供电的节点。
+    
+    Returns:
+        变位数量、未找到的开关，以及新带电 / 新失电的节点
+    """
+    if len(request.updates) > MAX_SWITCH_UPDATES:
+        raise HTTPException(status_code=400, detail=f"开关变位数量超过上限 {MAX_SWITCH_UPDATES}")
+    for update in request.updates:
+        if update.state not in SWITCH_STATES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"不支持的开关状态: {update.state}，可选值: {', '.join(SWITCH_STATES)}"
+            )
+        if not update.edge_id and not (update.source and update.target):
+            raise HTTPException(status_code=400, detail="开关变位需要提供 edge_id 或 source + target")
+    return await query_executor.run(_apply_switch_updates, file_id, request)
+
+
+def _apply_switch_updates(file_id: int, request: SwitchBatchRequest) -> dict:
+    """执行开关变位（阻塞操作，在查询线程池中执行）"""
+    try:
+        with SessionLocal() as session:
+            live = live_topology.get(session, file_id)
+        
+        result = live.apply([
+            SwitchUpdate(
+                state=update.state,
+                edge_id=update.edge_id,
+                source=update.source,
+                target=update.target,
+                relation_type=update.relation_type
+            )
+            for update in request.updates
+        ])
+        graph = live.graph
+        return {
+            "file_id": file_id,
+            "applied": result.applied,
+            "unchanged": result.unchanged,
+            "unresolved": result.unresolved,
+            "energized": [_path_node(graph, node) for node in result.energized],
+            "deenergized": [_path_node(graph, node) for node in result.deenergized],
+            "open_switches": len(live.open_edges)
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"开关变位失败: {str(e)}")
+
+
+@router.get("/live/{file_id}/state")
+async def get_live_state(
+    file_id: int,
+    devices_only: bool = Query(True, description="失电节点只返回设备节点")
+):
+    """
+    查询实时拓扑状态
+    
+    Returns:
+        断开的开关（边）列表、带电节点数量与失电节点列表
+    """
+    return await query_executor.run(_live_state, file_id, devices_only)
+
+
+def _live_state(file_id: int, devices_only: bool) -> dict:
+    """查询实时拓扑状态（阻塞操作，在查询线程池中执行）"""
+    try:
+        with SessionLocal() as session:
+            live = live_topology.get(session, file_id)
+        
+        graph = live.graph
+        with live.lock:
+            open_edges = sorted(live.open_edges)
+            energized = bytes(live.energized)
+        deenergized = [
+            node for node in range(len(graph.node_ids))
+            if not energized[node] and (not devices_only or graph.node_types[node] == 'device')
+        ]
+        return {
+            "file_id": file_id,
+            "open_switches": [
+                {
+                    "source": _path_node(graph, source),
+                    "target": _path_node(graph, target),
+                    "relation_type": graph.relation_types[type_code]
                 }
-                
+                for source, target, type_code in open_edges
+            ],
+            "energized_count": sum(energized),
+            "deenergized": [_path_node(graph, node) for node in deenergized],
+            "deenergized_count": len(deenergized)
+        }
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"路径查询失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"实时拓扑查询失败: {str(e)}")
+
+
+@router.delete("/live/{file_id}")
+async def reset_live_state(file_id: int):
+    """
+    丢弃文件的内存开关状态
+    
+    下次访问时从 rds_power_edges.properties 的 switch_state 重新加载初始状态
+    """
+    return {"file_id": file_id, "reset": live_topology.reset(file_id)}
@@ -0,0 +1,214 @@
+"""
+IEC 编码前缀树
+
+按前缀（=、++、===）分别建树，每个树节点对应一个编码段落，并同时记录：
+- 实体节点（如 =A.B）是否存在
+- 容器节点（如 =A.B.）是否存在
+- 子树中已存在的编码数量
+
+层级顺序与 IECParser.expand_hierarchy 一致：=A -> =A. -> =A.B -> =A.B. -> ...
+祖先枚举、缺失中间节点检查和子树计数的复杂度均为 O(depth)。
+
+注意：编码按段落归一化存储，空段会被忽略（=A..B 与 =A.B 视为同一节点）。
+"""
+
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from services.iec_parser import IECParser
+
+
+class _TrieNode:
+    __slots__ = ('children', 'entity', 'container', 'count')
+
+    def __init__(self):
+        self.children: Dict[str, '_TrieNode'] = {}
+        self.entity = False       # 实体编码是否存在
+        self.container = False    # 容器编码是否存在
+        self.count = 0            # 本节点及其子树中已存在的编码数量
+
+
+class CodeTrie:
+    """IEC 编码前缀树"""
+
+    def __init__(self):
+        self._roots: Dict[str, _TrieNode] = {}
+        self._size = 0
+
+    @staticmethod
+    def split(code: str) -> Optional[Tuple[str, List[str], bool]]:
+        """
+        拆分编码
+
+        Returns:
+            (前缀, 段落列表, 是否为容器节点)，无法解析时返回 None
+        """
+        if not code:
+            return None
+        code = code.strip()
+        match = IECParser.PREFIX_PATTERN.match(code)
+        if not match:
+            return None
+        prefix = match.group(1)
+        segments = [s for s in code[len(prefix):].split('.') if s]
+        if not segments:
+            return None
+        return prefix, segments, code.endswith('.')
+
+    @staticmethod
+    def _join(prefix: str, segments: List[str], container: bool) -> str:
+        return prefix + '.'.join(segments) + ('.' if container else '')
+
+    def _walk(self, prefix: str, segments: List[str]) -> List[_TrieNode]:
+        """返回从根到目标段落的已存在节点路径（可能短于 segments）"""
+        path = []
+        node = self._roots.get(prefix)
+        for segment in segments:
+            if node is None:
+                break
+            node = node.children.get(segment)
+            if node is None:
+                break
+            path.append(node)
+        return path
+
+    def _find(self, code: str) -> Optional[Tuple[_TrieNode, bool]]:
+        parts = self.split(code)
+        if parts is None:
+            return None
+        prefix, segments, container = parts
+        path = self._walk(prefix, segments)
+        if len(path) != len(segments):
+            return None
+        return path[-1], container
+
+    def insert(self, code: str) -> bool:
+        """插入编码，返回是否为新编码"""
+        parts = self.split(code)
+        if parts is None:
+            return False
+        prefix, segments, container = parts
+
+        path = []
+        node = self._roots.setdefault(prefix, _TrieNode())
+        for segment in segments:
+            node = node.children.setdefault(segment, _TrieNode())
+            path.append(node)
+
+        if container:
+            if node.container:
+                return False
+            node.container = True
+        else:
+            if node.entity:
+                return False
+            node.entity = True
+
+        for visited in path:
+            visited.count += 1
+        self._size += 1
+        return True
+
+    def insert_many(self, codes: Iterable[str]) -> int:
+        """批量插入编码，返回新增数量"""
+        return sum(1 for code in codes if self.insert(code))
+
+    def __contains__(self, code: str) -> bool:
+        found = self._find(code)
+        if found is None:
+            return False
+        node, container = found
+        return node.container if container else node.entity
+
+    def __len__(self) -> int:
+        return self._size
+
+    def ancestors(self, code: str) -> List[str]:
+        """
+        枚举编码的全部结构祖先（从根开始，不含自身，无论是否已插入）
+
+        Example:
+            =A.B.C -> [=A, =A., =A.B, =A.B.]
+            =A.B.  -> [=A, =A., =A.B]
+        """
+        parts = self.split(code)
+        if parts is None:
+            return []
+        prefix, segments, container = parts
+
+        result = []
+        for i in range(len(segments)):
+            is_last = i == len(segments) - 1
+            result.append(self._join(prefix, segments[:i + 1], False))
+            if not is_last:
+                result.append(self._join(prefix, segments[:i + 1], True))
+        if not container:
+            result.pop()
+        return result
+
+    def missing_ancestors(self, code: str) -> List[str]:
+        """返回尚未插入的祖先编码（从根开始）"""
+        parts = self.split(code)
+        if parts is None:
+            return []
+        prefix, segments, container = parts
+        path = self._walk(prefix, segments)
+
+        result = []
+        for i in range(len(segments)):
+            node = path[i] if i < len(path) else None
+            is_last = i == len(segments) - 1
+            if is_last and not container:
+                break
+            if node is None or not node.entity:
+                result.append(self._join(prefix, segments[:i + 1], False))
+            if not is_last and (node is None or not node.container):
+                result.append(self._join(prefix, segments[:i + 1], True))
+        return result
+
+    def find_missing(self) -> List[str]:
+        """返回所有已插入编码的缺失中间节点（去重，按前序遍历顺序）"""
+        result = []
+        stack = [(prefix, [], root) for prefix, root in reversed(list(self._roots.items()))]
+        while stack:
+            prefix, segments, node = stack.pop()
+            if segments:
+                # 树中存在的节点必然位于某个已插入编码的路径上
+                if not node.entity:
+                    result.append(self._join(prefix, segments, False))
+                if not node.container and node.count - node.entity > 0:
+                    result.append(self._join(prefix, segments, True))
+            for segment, child in reversed(list(node.children.items())):
+                stack.append((prefix, segments + [segment], child))
+        return result
+
+    def subtree_size(self, code: str) -> int:
+        """子树中已插入的编码数量（包含自身，若已插入）"""
+        found = self._find(code)
+        if found is None:
+            return 0
+        node, container = found
+        return node.count - node.entity if container else node.count
+
+    def descendants(self, code: str) -> Iterator[str]:
+        """枚举子树中已插入的编码（不含自身，前序遍历）"""
+        parts = self.split(code)
+        if parts is None:
+            return
+        prefix, segments, container = parts
+        found = self._find(code)
+        if found is None:
+            return
+        node, _ = found
+
+        if not container and node.container:
+            yield self._join(prefix, segments, True)
+
+        stack = [(segments + [segment], child) for segment, child in reversed(list(node.children.items()))]
+        while stack:
+            child_segments, child = stack.pop()
+            if child.entity:
+                yield self._join(prefix, child_segments, False)
+            if child.container:
+                yield self._join(prefix, child_segments, True)
+            for segment, grandchild in reversed(list(child.children.items())):
+                stack.append((child_segments + [segment], grandchild))
@@ -0,0 +1,195 @@
+"""
+Excel 流式读取
+
+避免 `await file.read()` + `pd.read_excel(sheet_name=None)` 一次性载入整个工作簿：
+- 上传内容按块落盘到临时文件
+- 使用 openpyxl 只读模式逐个工作表、逐行读取
+- 以固定行数的 DataFrame 批次产出，读取阶段不再同时持有原始字节和全部工作表的 DataFrame
+
+导入流程中解析结果同样逐批写入数据库暂存表，一物多面合并在数据库中完成，
+内存中只保留编码索引（见 services.workbook_parser）；/api/parse/excel 的响应包含全部对象，
+其峰值内存仍随对象数量增长。
+"""
+
+import math
+import os
+import tempfile
+from typing import Iterator, List, Optional, Tuple
+
+import pandas as pd
+from fastapi import UploadFile
+from openpyxl import load_workbook
+
+
+# 上传落盘时每次读取的字节数
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# 每个 DataFrame 批次包含的最大行数
+DEFAULT_BATCH_ROWS = int(os.getenv('EXCEL_BATCH_ROWS', '2000'))
+
+# 临时文件目录，未配置时使用系统默认临时目录
+SPOOL_DIR = os.getenv('EXCEL_SPOOL_DIR') or None
+
+# pd.read_excel 默认识别为缺失值的字符串
+NA_STRINGS = frozenset({
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan',
+    '1.#IND', '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'
+})
+
+
+async def spool_upload(file: UploadFile) -> str:
+    """
+    将上传文件分块写入临时文件
+
+    Returns:
+        临时文件路径，调用方负责在使用完毕后调用 remove_spooled 删除
+    """
+    suffix = os.path.splitext(file.filename or '')[1].lower()
+    spooled = tempfile.NamedTemporaryFile(delete=False, suffix=suffix, dir=SPOOL_DIR)
+    try:
+        with spooled:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                spooled.write(chunk)
+    except Exception:
+        remove_spooled(spooled.name)
+        raise
+    return spooled.name
+
+
+def remove_spooled(path: Optional[str]) -> None:
+    """删除临时文件（忽略不存在的情况）"""
+    if path:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _header_names(header_row: Tuple) -> List[str]:
+    """生成与 pandas.read_excel 一致的列名（空列名为 Unnamed: i，重复列名追加 .1/.2）"""
+    names: List[str] = []
+    seen = {}
+    for i, value in enumerate(header_row):
+        name = f"Unnamed: {i}" if value is None else str(value)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _is_empty_row(values: Tuple) -> bool:
+    return all(v is None or v == '' for v in values)
+
+
+def _cell_value(value):
+    """缺失值统一转换为 NaN，与 pd.read_excel 的结果保持一致"""
+    if value is None or (isinstance(value, str) and value in NA_STRINGS):
+        return math.nan
+    return value
+
+
+def _to_frame(columns: List[str], rows: List[Tuple], indexes: List[int]) -> pd.DataFrame:
+    return pd.DataFrame.from_records(rows, columns=columns, index=indexes)
+
+
+def _iter_xlsx_batches(
+    path: str,
+    batch_rows: int,
+    sheet_name: Optional[str] = None
+) -> Iterator[Tuple[str, pd.DataFrame]]:
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for worksheet in workbook.worksheets:
+            if sheet_name is not None and worksheet.title != sheet_name:
+                continue
+            row_iter = worksheet.iter_rows(values_only=True)
+            header_row = next(row_iter, None)
+            if header_row is None:
+                continue
+            columns = _header_names(header_row)
+            width = len(columns)
+
+            rows: List[Tuple] = []
+            indexes: List[int] = []
+            # 连续空行先暂存，后面出现非空行时才计入（与 pandas 忽略末尾空行的行为一致）
+            pending_empty: List[int] = []
+            row_index = 0
+
+            for values in row_iter:
+                values = tuple(values[:width]) + (None,) * (width - len(values))
+                if _is_empty_row(values):
+                    pending_empty.append(row_index)
+                else:
+                    for empty_index in pending_empty:
+                        rows.append((math.nan,) * width)
+                        indexes.append(empty_index)
+                    pending_empty = []
+                    rows.append(tuple(_cell_value(v) for v in values))
+                    indexes.append(row_index)
+                row_index += 1
+
+                if len(rows) >= batch_rows:
+                    yield worksheet.title, _to_frame(columns, rows, indexes)
+                    rows, indexes = [], []
+
+            if rows:
+                yield worksheet.title, _to_frame(columns, rows, indexes)
+    finally:
+        workbook.close()
+
+
+def _iter_xls_batches(
+    path: str,
+    batch_rows: int,
+    sheet_name: Optional[str] = None
+) -> Iterator[Tuple[str, pd.DataFrame]]:
+    # 旧版 .xls 无法被 openpyxl 读取，退回 pandas，但仍按工作表逐个加载
+    with pd.ExcelFile(path) as workbook:
+        for name in workbook.sheet_names:
+            if sheet_name is not None and name != sheet_name:
+                continue
+            df = workbook.parse(name)
+            for start in range(0, len(df), batch_rows):
+                yield name, df.iloc[start:start + batch_rows]
+
+
+def list_sheets(path: str) -> List[str]:
+    """列出工作表名称（按工作簿中的顺序）"""
+    if path.lower().endswith('.xls'):
+        with pd.ExcelFile(path) as workbook:
+            return list(workbook.sheet_names)
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        return list(workbook.sheetnames)
+    finally:
+        workbook.close()
+
+
+def iter_sheet_batches(
+    path: str,
+    batch_rows: int = DEFAULT_BATCH_ROWS,
+    sheet_name: Optional[str] = None
+) -> Iterator[Tuple[str, pd.DataFrame]]:
+    """
+    按工作表顺序逐批读取 Excel 数据
+
+    Args:
+        path: Excel 文件路径
+        batch_rows: 每批最大行数
+        sheet_name: 只读取指定工作表（None 表示全部）
+
+    Yields:
+        (工作表名, DataFrame 批次)，DataFrame 的索引为该行在工作表中的数据行号（从 0 开始，
+        与 pd.read_excel 的默认索引一致），首行作为列名
+    """
+    if path.lower().endswith('.xls'):
+        yield from _iter_xls_batches(path, batch_rows, sheet_name)
+    else:
+        yield from _iter_xlsx_batches(path, batch_rows, sheet_name)
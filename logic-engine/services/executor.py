@@ -0,0 +1,178 @@
+"""
+有界线程池
+
+Excel 解析、同步 SQLAlchemy 会话等阻塞操作不能直接在 asyncio 事件循环上执行，
+否则一次大文件导入会阻塞同一 uvicorn worker 上的 /health 和追溯请求。
+
+这里提供两个独立的线程池：
+- import_executor: Excel 解析与数据导入（重任务，并发数较小）
+- query_executor:  拓扑查询、统计、清除等数据库操作
+
+每个线程池限制排队长度，超出时抛出 ExecutorBusyError（由 main.py 转换为 503），
+并记录排队/执行数量与耗时等指标。
+
+另有一个按需创建的进程池 (parse_process_pool)，用于 CPU 密集的工作簿解析，
+绕开 GIL 让多个工作表在多核上并行解析。
+"""
+
+import asyncio
+import functools
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+
+class ExecutorBusyError(Exception):
+    """线程池排队已满"""
+
+    def __init__(self, name: str, max_queue: int):
+        super().__init__(f"{name} 线程池繁忙（排队任务已达上限 {max_queue}），请稍后重试")
+        self.name = name
+        self.max_queue = max_queue
+
+
+class BoundedExecutor:
+    """带排队上限和指标统计的线程池"""
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._max_queued_seen = 0
+        self._wait_seconds_total = 0.0
+        self._run_seconds_total = 0.0
+
+    def _reserve(self) -> None:
+        with self._lock:
+            if self._queued >= self.max_queue:
+                self._rejected += 1
+                raise ExecutorBusyError(self.name, self.max_queue)
+            self._queued += 1
+            self._max_queued_seen = max(self._max_queued_seen, self._queued)
+
+    def _wrap(self, func: Callable, submitted_at: float) -> Callable:
+        def task():
+            started_at = time.perf_counter()
+            with self._lock:
+                self._queued -= 1
+                self._active += 1
+                self._wait_seconds_total += started_at - submitted_at
+            failed = False
+            try:
+                return func()
+            except BaseException:
+                failed = True
+                raise
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self._run_seconds_total += time.perf_counter() - started_at
+                    if failed:
+                        self._failed += 1
+                    else:
+                        self._completed += 1
+        return task
+
+    async def run(self, func: Callable, *args, **kwargs):
+        """在线程池中执行阻塞函数并等待结果"""
+        self._reserve()
+        task = self._wrap(functools.partial(func, *args, **kwargs), time.perf_counter())
+        return await asyncio.get_running_loop().run_in_executor(self._pool, task)
+
+    def submit(self, func: Callable, *args, **kwargs):
+        """提交后台任务（不等待结果），返回 concurrent.futures.Future"""
+        self._reserve()
+        task = self._wrap(functools.partial(func, *args, **kwargs), time.perf_counter())
+        return self._pool.submit(task)
+
+    def stats(self) -> Dict:
+        """线程池指标"""
+        with self._lock:
+            finished = self._completed + self._failed
+            return {
+                'max_workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'active': self._active,
+                'queued': self._queued,
+                'max_queued_seen': self._max_queued_seen,
+                'completed': self._completed,
+                'failed': self._failed,
+                'rejected': self._rejected,
+                'avg_wait_ms': round(self._wait_seconds_total / finished * 1000, 2) if finished else 0.0,
+                'avg_run_ms': round(self._run_seconds_total / finished * 1000, 2) if finished else 0.0
+            }
+
+
+import_executor = BoundedExecutor(
+    'import',
+    max_workers=int(os.getenv('IMPORT_WORKERS', '2')),
+    max_queue=int(os.getenv('IMPORT_QUEUE_LIMIT', '8'))
+)
+
+query_executor = BoundedExecutor(
+    'query',
+    max_workers=int(os.getenv('QUERY_WORKERS', '8')),
+    max_queue=int(os.getenv('QUERY_QUEUE_LIMIT', '64'))
+)
+
+
+# ==================== 解析进程池 ====================
+
+# 解析进程数：<= 1 时在调用线程内解析，不创建进程池
+# 按工作表并行，工作簿通常只有少数几个工作表；默认值固定且较小，避免按 CPU 核数在每个 worker 中各起一批进程
+PARSE_WORKERS = int(os.getenv('PARSE_WORKERS', '2'))
+
+_parse_pool: Optional[ProcessPoolExecutor] = None
+_parse_pool_lock = threading.Lock()
+
+
+def parse_process_pool() -> Optional[ProcessPoolExecutor]:
+    """
+    工作簿解析进程池（首次使用时创建，进程常驻复用）
+
+    使用 spawn 启动子进程：服务进程内已有多个线程，fork 可能复制处于加锁状态的锁。
+
+    Returns:
+        进程池；PARSE_WORKERS <= 1 时返回 None
+    """
+    global _parse_pool
+    if PARSE_WORKERS <= 1:
+        return None
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            _parse_pool = ProcessPoolExecutor(
+                max_workers=PARSE_WORKERS,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _parse_pool
+
+
+def reset_parse_process_pool() -> None:
+    """丢弃解析进程池（子进程异常退出导致进程池不可用时调用，下次使用时重建）"""
+    global _parse_pool
+    with _parse_pool_lock:
+        pool, _parse_pool = _parse_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def executor_stats() -> Dict:
+    """所有线程池的指标"""
+    return {
+        'import': import_executor.stats(),
+        'query': query_executor.stats(),
+        'parse': {
+            'max_workers': PARSE_WORKERS,
+            'started': _parse_pool is not None
+        }
+    }
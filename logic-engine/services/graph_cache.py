@@ -0,0 +1,684 @@
+"""
+拓扑图内存缓存
+
+按 (file_id, 图来源) 懒加载有向图，并在内存中完成追溯与路径查询：
+- relations: rds_objects / rds_relations 构成的对象关系图
+- power:     rds_power_nodes / rds_power_edges 构成的电源图（hierarchy / power_supply / backup 边）
+- 节点 UUID 映射为连续整数编号
+- 上游/下游邻接表使用 CSR 风格的整数数组（offsets + targets）
+- 导入或清除某个文件的数据时，由 importer 调用 invalidate 丢弃该文件的全部缓存
+"""
+
+import heapq
+import os
+import threading
+import time
+import uuid
+from array import array
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Callable, Dict, FrozenSet, Iterator, List, Optional, Sequence, Tuple, Union
+
+from sqlalchemy import text
+
+
+# 与原递归 CTE 保持一致的最大追溯深度
+MAX_TRACE_DEPTH = 20
+
+# 最多缓存多少个文件的图（按最近使用淘汰，一个文件的各来源图一起淘汰）
+GRAPH_CACHE_MAX_FILES = max(1, int(os.getenv('GRAPH_CACHE_MAX_FILES', '16')))
+
+# 图来源
+RELATIONS_SOURCE = 'relations'
+POWER_SOURCE = 'power'
+GRAPH_SOURCES = (RELATIONS_SOURCE, POWER_SOURCE)
+
+# 电源图的边类型（默认全部参与追溯）
+POWER_EDGE_TYPES = ('hierarchy', 'power_supply', 'backup')
+
+
+def build_csr(node_count: int, edges: List[Tuple[int, int, int]]) -> Tuple[array, array, array]:
+    """
+    将边列表构建为 CSR 邻接结构
+
+    Args:
+        node_count: 节点数量
+        edges: (源节点编号, 目标节点编号, 关系类型编号) 列表
+
+    Returns:
+        (offsets, targets, types)，节点 i 的邻居为 targets[offsets[i]:offsets[i + 1]]
+    """
+    offsets = array('i', [0]) * (node_count + 1)
+    for source, _, _ in edges:
+        offsets[source + 1] += 1
+    for i in range(node_count):
+        offsets[i + 1] += offsets[i]
+
+    targets = array('i', [0]) * len(edges)
+    types = array('H', [0]) * len(edges)
+    cursor = array('i', offsets[:-1])
+    for source, target, type_code in edges:
+        pos = cursor[source]
+        targets[pos] = target
+        types[pos] = type_code
+        cursor[source] = pos + 1
+
+    return offsets, targets, types
+
+
+@dataclass
+class TopologyGraph:
+    """单个文件的拓扑图（只读快照）"""
+    file_id: int
+    node_ids: List[str]             # 编号 -> 对象 ID
+    ref_codes: List[str]            # 编号 -> 引用编码
+    names: List[str]                # 编号 -> 对象名称
+    index: Dict[str, int]           # 对象 ID -> 编号
+    relation_types: List[str]       # 类型编号 -> 关系类型
+    down_offsets: array             # 下游邻接 (source -> target)
+    down_targets: array
+    down_types: array
+    up_offsets: array               # 上游邻接 (target -> source)
+    up_targets: array
+    up_types: array
+    edge_count: int
+    build_seconds: float
+    source: str = RELATIONS_SOURCE
+    node_types: Optional[List[str]] = None              # 编号 -> 电源图节点类型（仅电源图）
+    object_ids: Optional[List[Optional[str]]] = None    # 编号 -> 关联的 rds_objects.id（仅电源图）
+    aliases: Dict[str, int] = field(default_factory=dict)   # 其他可用于定位节点的键 -> 编号
+    _derived: Dict[str, object] = field(default_factory=dict, repr=False)
+    _derived_lock: threading.RLock = field(default_factory=threading.RLock, repr=False)
+
+    def derived(self, name: str, build: Callable[['TopologyGraph'], object]):
+        """
+        按名称缓存由图计算出的分析索引（如支配树），与图快照同生命周期
+
+        图缓存失效后新图会重新计算，因此索引始终对应当前图版本；
+        构建函数可以依赖其他分析索引（可重入锁）。
+        """
+        with self._derived_lock:
+            value = self._derived.get(name)
+            if value is None:
+                value = self._derived[name] = build(self)
+            return value
+
+    def resolve(self, key: str) -> Optional[int]:
+        """按节点 ID 或别名（电源图中为 full_code、对象 ID、MC 编码）查找节点编号"""
+        node = self.index.get(key)
+        return node if node is not None else self.aliases.get(key)
+
+    def type_code(self, relation_type: str) -> Optional[int]:
+        """关系类型对应的编号，图中不存在该类型时返回 None"""
+        try:
+            return self.relation_types.index(relation_type)
+        except ValueError:
+            return None
+
+    def type_codes(self, relation_types: Union[str, Sequence[str]]) -> FrozenSet[int]:
+        """一个或多个关系类型对应的编号集合（忽略图中不存在的类型）"""
+        if isinstance(relation_types, str):
+            relation_types = (relation_types,)
+        codes = (self.type_code(relation_type) for relation_type in relation_types)
+        return frozenset(code for code in codes if code is not None)
+
+    def neighbors(self, node: int, direction: str, type_codes: FrozenSet[int], blocked: Optional[set] = None):
+        """
+        遍历指定方向、指定关系类型的相邻节点
+
+        Args:
+            blocked: 不可通过的边集合，元素为下游方向的 (源节点, 目标节点, 类型编号)，如断开的开关
+        """
+        upstream = direction == 'upstream'
+        if upstream:
+            offsets, targets, types = self.up_offsets, self.up_targets, self.up_types
+        else:
+            offsets, targets, types = self.down_offsets, self.down_targets, self.down_types
+        for pos in range(offsets[node], offsets[node + 1]):
+            if types[pos] in type_codes:
+                if blocked and ((targets[pos], node, types[pos]) if upstream else (node, targets[pos], types[pos])) in blocked:
+                    continue
+                yield targets[pos]
+
+    def iter_trace(
+        self,
+        start: int,
+        direction: str,
+        relation_type: Union[str, Sequence[str]],
+        max_depth: int = MAX_TRACE_DEPTH,
+        blocked: Optional[set] = None
+    ) -> Iterator[Tuple[int, int]]:
+        """
+        广度优先追溯，按发现顺序逐个产出 (节点编号, 层级)，层级非递减
+
+        用于流式响应：结果无需全部生成即可开始输出。
+
+        Args:
+            blocked: 不可通过的边集合（见 neighbors）
+        """
+        yield start, 0
+        type_codes = self.type_codes(relation_type)
+        if not type_codes:
+            return
+        levels = {start: 0}
+        queue = deque([start])
+        while queue:
+            node = queue.popleft()
+            level = levels[node]
+            if level >= max_depth:
+                continue
+            for neighbor in self.neighbors(node, direction, type_codes, blocked):
+                if neighbor not in levels:
+                    levels[neighbor] = level + 1
+                    queue.append(neighbor)
+                    yield neighbor, level + 1
+
+    def trace(
+        self,
+        start: int,
+        direction: str,
+        relation_type: Union[str, Sequence[str]],
+        max_depth: int = MAX_TRACE_DEPTH,
+        blocked: Optional[set] = None
+    ) -> List[Tuple[int, int]]:
+        """
+        广度优先追溯
+
+        Args:
+            blocked: 不可通过的边集合（见 neighbors）
+
+        Returns:
+            (节点编号, 距起始节点的层级) 列表，起始节点层级为 0
+        """
+        traced = list(self.iter_trace(start, direction, relation_type, max_depth, blocked))
+
+        # 上游结果从电源侧开始排列，下游结果从起始节点开始排列
+        return sorted(traced, key=lambda item: item[1], reverse=(direction == 'upstream'))
+
+    def trace_many(
+        self,
+        starts: List[int],
+        direction: str,
+        relation_type: Union[str, Sequence[str]],
+        max_depth: int = MAX_TRACE_DEPTH
+    ) -> List[Tuple[int, int]]:
+        """
+        多起点广度优先追溯（一次遍历得到所有起点结果的并集）
+
+        Returns:
+            (节点编号, 距最近起始节点的层级) 列表，排序规则与 trace 相同
+        """
+        levels = {start: 0 for start in starts}
+        type_codes = self.type_codes(relation_type)
+        if type_codes:
+            queue = deque(levels)
+            while queue:
+                node = queue.popleft()
+                level = levels[node]
+                if level >= max_depth:
+                    continue
+                for neighbor in self.neighbors(node, direction, type_codes):
+                    if neighbor not in levels:
+                        levels[neighbor] = level + 1
+                        queue.append(neighbor)
+
+        return sorted(levels.items(), key=lambda item: item[1], reverse=(direction == 'upstream'))
+
+    def find_path(
+        self,
+        source: int,
+        target: int,
+        relation_type: Union[str, Sequence[str]],
+        max_depth: int = MAX_TRACE_DEPTH
+    ) -> Optional[List[int]]:
+        """沿下游方向查找最短路径（双向广度优先），未找到返回 None"""
+        type_codes = self.type_codes(relation_type)
+        if source != target and not type_codes:
+            return None
+        return self._shortest_path(source, target, type_codes, max_depth)
+
+    def k_shortest_paths(
+        self,
+        source: int,
+        target: int,
+        relation_type: Union[str, Sequence[str]],
+        k: int,
+        max_depth: int = MAX_TRACE_DEPTH
+    ) -> List[List[int]]:
+        """
+        沿下游方向查找前 k 条最短的无环路径（Yen 算法，子路径用双向广度优先搜索）
+
+        用于双电源等存在多条供电路径的设备。
+
+        Returns:
+            路径列表，按长度升序（同长度按节点编号序）；不连通时为空列表
+        """
+        return list(self.iter_shortest_paths(source, target, relation_type, k, max_depth))
+
+    def iter_shortest_paths(
+        self,
+        source: int,
+        target: int,
+        relation_type: Union[str, Sequence[str]],
+        k: int,
+        max_depth: int = MAX_TRACE_DEPTH
+    ) -> Iterator[List[int]]:
+        """逐条产出 k_shortest_paths 的结果，每找到一条路径立即返回"""
+        first = self.find_path(source, target, relation_type, max_depth)
+        if first is None or k < 1:
+            return
+        yield first
+        type_codes = self.type_codes(relation_type)
+
+        paths = [first]
+        seen = {tuple(first)}
+        candidates: List[Tuple[int, Tuple[int, ...]]] = []
+        while len(paths) < k:
+            previous = paths[-1]
+            for i in range(len(previous) - 1):
+                spur = previous[i]
+                root = previous[:i + 1]
+                # 与已找到路径共享同一前缀时，禁止沿它们的下一条边继续
+                banned_edges = {
+                    (path[i], path[i + 1]) for path in paths
+                    if len(path) > i + 1 and path[:i + 1] == root
+                }
+                spur_path = self._shortest_path(
+                    spur, target, type_codes, max_depth - i,
+                    banned_nodes=frozenset(root[:-1]), banned_edges=banned_edges
+                )
+                if spur_path is None:
+                    continue
+                candidate = tuple(root[:-1] + spur_path)
+                if candidate not in seen:
+                    seen.add(candidate)
+                    heapq.heappush(candidates, (len(candidate), candidate))
+            if not candidates:
+                break
+            paths.append(list(heapq.heappop(candidates)[1]))
+            yield paths[-1]
+
+    def _shortest_path(
+        self,
+        source: int,
+        target: int,
+        type_codes: FrozenSet[int],
+        max_depth: int,
+        banned_nodes: FrozenSet[int] = frozenset(),
+        banned_edges: Optional[set] = None
+    ) -> Optional[List[int]]:
+        """
+        双向广度优先搜索：每次扩展较小的一侧前沿，搜索范围只与路径长度及其附近的分支有关
+
+        Args:
+            banned_nodes: 不允许经过的节点
+            banned_edges: 不允许使用的 (源, 目标) 边
+        """
+        if source == target:
+            return [source]
+        if max_depth <= 0:
+            return None
+
+        forward_parents = {source: -1}
+        backward_parents = {target: -1}
+        forward_depth = {source: 0}
+        backward_depth = {target: 0}
+        forward_frontier = [source]
+        backward_frontier = [target]
+        forward_level = backward_level = 0
+
+        while forward_frontier and backward_frontier and forward_level + backward_level < max_depth:
+            forward = len(forward_frontier) <= len(backward_frontier)
+            if forward:
+                frontier, parents, depth, other_depth = forward_frontier, forward_parents, forward_depth, backward_depth
+                direction, level = 'downstream', forward_level + 1
+            else:
+                frontier, parents, depth, other_depth = backward_frontier, backward_parents, backward_depth, forward_depth
+                direction, level = 'upstream', backward_level + 1
+
+            # 完整扩展一层，在该层所有相遇节点中取总长度最短的
+            next_frontier = []
+            meeting = None
+            for node in frontier:
+                for neighbor in self.neighbors(node, direction, type_codes):
+                    if neighbor in parents or neighbor in banned_nodes:
+                        continue
+                    if banned_edges and ((node, neighbor) if forward else (neighbor, node)) in banned_edges:
+                        continue
+                    parents[neighbor] = node
+                    depth[neighbor] = level
+                    next_frontier.append(neighbor)
+                    if neighbor in other_depth and (meeting is None or other_depth[neighbor] < other_depth[meeting]):
+                        meeting = neighbor
+
+            if forward:
+                forward_frontier, forward_level = next_frontier, level
+            else:
+                backward_frontier, backward_level = next_frontier, level
+
+            if meeting is not None:
+                path = [meeting]
+                while forward_parents[path[-1]] != -1:
+                    path.append(forward_parents[path[-1]])
+                path.reverse()
+                node = meeting
+                while backward_parents[node] != -1:
+                    node = backward_parents[node]
+                    path.append(node)
+                return path
+        return None
+
+
+def load_topology_graph(session, file_id: int) -> TopologyGraph:
+    """从 rds_objects / rds_relations 加载单个文件的拓扑图"""
+    started = time.perf_counter()
+
+    node_rows = session.execute(text("""
+        SELECT id, ref_code, name
+        FROM rds_objects
+        WHERE file_id = :file_id
+    """), {'file_id': file_id}).fetchall()
+
+    # 只保留两端都属于该文件的关系
+    edge_rows = session.execute(text("""
+        SELECT r.source_obj_id, r.target_obj_id, r.relation_type
+        FROM rds_relations r
+        JOIN rds_objects o ON o.id = r.source_obj_id
+        WHERE o.file_id = :file_id
+    """), {'file_id': file_id}).fetchall()
+
+    return _build_graph(
+        file_id,
+        RELATIONS_SOURCE,
+        node_ids=[str(row.id) for row in node_rows],
+        ref_codes=[row.ref_code or '' for row in node_rows],
+        names=[row.name or '' for row in node_rows],
+        edges=((str(row.source_obj_id), str(row.target_obj_id), row.relation_type) for row in edge_rows),
+        started=started
+    )
+
+
+def load_power_graph(session, file_id: int) -> TopologyGraph:
+    """
+    从 rds_power_nodes / rds_power_edges 加载单个文件的电源图
+
+    节点的 ref_code 为 full_code，name 为 label。除节点 ID 外，还可以用以下键定位节点：
+    - full_code（含设备节点的 DEVICE:<asset_code>）
+    - 设备节点关联的对象 ID 与对象 MC 编码
+    - 电源方面编码对应的对象 ID 与 MC 编码（无设备节点的对象，如虚拟系统对象）
+    """
+    started = time.perf_counter()
+
+    node_rows = session.execute(text("""
+        SELECT n.id, n.full_code, n.label, n.node_type, n.object_id, o.mc_code
+        FROM rds_power_nodes n
+        LEFT JOIN rds_objects o ON o.id = n.object_id AND o.file_id = n.file_id
+        WHERE n.file_id = :file_id
+    """), {'file_id': file_id}).fetchall()
+
+    edge_rows = session.execute(text("""
+        SELECT source_node_id, target_node_id, relation_type
+        FROM rds_power_edges
+        WHERE file_id = :file_id
+    """), {'file_id': file_id}).fetchall()
+
+    aspect_rows = session.execute(text("""
+        SELECT a.object_id, a.full_code, o.mc_code
+        FROM rds_aspects a
+        JOIN rds_objects o ON o.id = a.object_id AND o.file_id = a.file_id
+        WHERE a.file_id = :file_id AND a.aspect_type = 'power'
+        ORDER BY length(a.full_code), a.full_code
+    """), {'file_id': file_id}).fetchall()
+
+    graph = _build_graph(
+        file_id,
+        POWER_SOURCE,
+        node_ids=[str(row.id) for row in node_rows],
+        ref_codes=[row.full_code or '' for row in node_rows],
+        names=[row.label or row.full_code or '' for row in node_rows],
+        edges=((str(row.source_node_id), str(row.target_node_id), row.relation_type) for row in edge_rows),
+        started=started
+    )
+    graph.node_types = [row.node_type or '' for row in node_rows]
+    graph.object_ids = [str(row.object_id) if row.object_id else None for row in node_rows]
+
+    # 别名按优先级写入（先写入的优先）
+    aliases = graph.aliases
+    for node, row in enumerate(node_rows):
+        aliases.setdefault(row.full_code, node)
+    for node, row in enumerate(node_rows):
+        if row.object_id:
+            aliases.setdefault(str(row.object_id), node)
+        if row.mc_code:
+            aliases.setdefault(row.mc_code, node)
+    for row in aspect_rows:
+        # 实体引用编码（末尾点号）没有设备节点时，对应去掉点号的逻辑节点
+        node = aliases.get(row.full_code, aliases.get(row.full_code.rstrip('.')))
+        if node is None:
+            continue
+        aliases.setdefault(str(row.object_id), node)
+        if row.mc_code:
+            aliases.setdefault(row.mc_code, node)
+
+    graph.build_seconds = time.perf_counter() - started
+    return graph
+
+
+def _build_graph(
+    file_id: int,
+    source: str,
+    node_ids: List[str],
+    ref_codes: List[str],
+    names: List[str],
+    edges,
+    started: float
+) -> TopologyGraph:
+    """由节点列表与 (源 ID, 目标 ID, 关系类型) 边构建 CSR 图，忽略端点不在节点列表中的边"""
+    index = {node_id: i for i, node_id in enumerate(node_ids)}
+
+    relation_types: List[str] = []
+    type_codes: Dict[str, int] = {}
+    down_edges: List[Tuple[int, int, int]] = []
+    up_edges: List[Tuple[int, int, int]] = []
+    for source_id, target_id, relation_type in edges:
+        source_node = index.get(source_id)
+        target_node = index.get(target_id)
+        if source_node is None or target_node is None:
+            continue
+        type_code = type_codes.get(relation_type)
+        if type_code is None:
+            type_code = type_codes[relation_type] = len(relation_types)
+            relation_types.append(relation_type)
+        down_edges.append((source_node, target_node, type_code))
+        up_edges.append((target_node, source_node, type_code))
+
+    down_offsets, down_targets, down_types = build_csr(len(node_ids), down_edges)
+    up_offsets, up_targets, up_types = build_csr(len(node_ids), up_edges)
+
+    return TopologyGraph(
+        file_id=file_id,
+        node_ids=node_ids,
+        ref_codes=ref_codes,
+        names=names,
+        index=index,
+        relation_types=relation_types,
+        down_offsets=down_offsets,
+        down_targets=down_targets,
+        down_types=down_types,
+        up_offsets=up_offsets,
+        up_targets=up_targets,
+        up_types=up_types,
+        edge_count=len(down_edges),
+        build_seconds=time.perf_counter() - started,
+        source=source
+    )
+
+
+# 各图来源的加载函数
+_LOADERS = {
+    RELATIONS_SOURCE: load_topology_graph,
+    POWER_SOURCE: load_power_graph,
+}
+
+
+class GraphCache:
+    """按 (file_id, 图来源) 缓存拓扑图，按文件 LRU 淘汰，线程安全"""
+
+    def __init__(self, max_files: int = GRAPH_CACHE_MAX_FILES):
+        self._lock = threading.Lock()
+        self._max_files = max_files
+        self._graphs: Dict[Tuple[int, str], TopologyGraph] = {}
+        self._recent: "OrderedDict[int, None]" = OrderedDict()
+        self._build_locks: Dict[Tuple[int, str], threading.Lock] = {}
+        self._generations: Dict[int, int] = {}
+        self._hits = 0
+        self._misses = 0
+        self._builds = 0
+        self._invalidations = 0
+        self._evictions = 0
+        self._build_seconds_total = 0.0
+
+    def get_graph(self, session, file_id: int, source: str = RELATIONS_SOURCE) -> TopologyGraph:
+        """获取文件的拓扑图（relations 或 power），未缓存时从数据库加载"""
+        key = (file_id, source)
+        with self._lock:
+            graph = self._graphs.get(key)
+            if graph is not None:
+                self._hits += 1
+                self._recent.move_to_end(file_id)
+                return graph
+            self._misses += 1
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+            generation = self._generations.get(file_id, 0)
+
+        # 同一文件同一来源只允许一个线程构建，其他线程等待后直接复用结果
+        with build_lock:
+            with self._lock:
+                graph = self._graphs.get(key)
+            if graph is not None:
+                return graph
+
+            graph = _LOADERS[source](session, file_id)
+            with self._lock:
+                self._builds += 1
+                self._build_seconds_total += graph.build_seconds
+                # 构建期间发生过失效（如并发导入）时不写入缓存，避免缓存旧数据
+                if self._generations.get(file_id, 0) == generation:
+                    self._graphs[key] = graph
+                    self._recent[file_id] = None
+                    self._recent.move_to_end(file_id)
+                    self._evict_locked()
+                else:
+                    self._drop_build_lock(key, build_lock)
+            return graph
+
+    def _evict_locked(self) -> None:
+        """超出文件数上限时淘汰最久未使用的文件，调用方需持有锁"""
+        while len(self._recent) > self._max_files:
+            file_id, _ = self._recent.popitem(last=False)
+            for source in GRAPH_SOURCES:
+                key = (file_id, source)
+                if self._graphs.pop(key, None) is not None:
+                    self._evictions += 1
+                self._drop_build_lock(key)
+
+    def _drop_build_lock(self, key: Tuple[int, str], expected: Optional[threading.Lock] = None) -> None:
+        """移除构建锁（正在构建中的锁保留），调用方需持有锁"""
+        lock = self._build_locks.get(key)
+        if lock is None or (expected is not None and lock is not expected):
+            return
+        if expected is not None or not lock.locked():
+            self._build_locks.pop(key, None)
+
+    def _object_graphs(self):
+        """已缓存的对象关系图（节点 ID 即对象 ID），调用方需持有锁"""
+        return (
+            (file_id, graph) for (file_id, source), graph in self._graphs.items()
+            if source == RELATIONS_SOURCE
+        )
+
+    def find_file_id(self, session, object_id: str) -> Optional[int]:
+        """查找对象所属的文件 ID，优先查询已缓存的图"""
+        with self._lock:
+            for file_id, graph in self._object_graphs():
+                if object_id in graph.index:
+                    return file_id
+
+        try:
+            uuid.UUID(object_id)
+        except (TypeError, ValueError):
+            return None
+
+        row = session.execute(text("""
+            SELECT file_id FROM rds_objects WHERE id = CAST(:object_id AS uuid)
+        """), {'object_id': object_id}).fetchone()
+        return row.file_id if row else None
+
+    def find_file_ids(self, session, object_ids: List[str]) -> Dict[str, int]:
+        """
+        批量查找对象所属的文件 ID（已缓存的图优先，其余一次查询）
+
+        Returns:
+            {对象 ID: 文件 ID}，不存在或不是合法 UUID 的对象不在结果中
+        """
+        found: Dict[str, int] = {}
+        with self._lock:
+            for file_id, graph in self._object_graphs():
+                for object_id in object_ids:
+                    if object_id not in found and object_id in graph.index:
+                        found[object_id] = file_id
+
+        missing = []
+        for object_id in object_ids:
+            if object_id in found:
+                continue
+            try:
+                uuid.UUID(object_id)
+            except (TypeError, ValueError):
+                continue
+            missing.append(object_id)
+
+        if missing:
+            rows = session.execute(text("""
+                SELECT id, file_id FROM rds_objects WHERE id = ANY(CAST(:ids AS uuid[]))
+            """), {'ids': sorted(set(missing))}).fetchall()
+            for row in rows:
+                found[str(row.id)] = row.file_id
+        return found
+
+    def invalidate(self, file_id: int) -> None:
+        """丢弃文件的全部缓存图，下次查询时重新加载"""
+        with self._lock:
+            self._generations[file_id] = self._generations.get(file_id, 0) + 1
+            self._recent.pop(file_id, None)
+            for source in GRAPH_SOURCES:
+                if self._graphs.pop((file_id, source), None) is not None:
+                    self._invalidations += 1
+                self._drop_build_lock((file_id, source))
+
+    def stats(self) -> Dict:
+        """缓存统计信息"""
+        with self._lock:
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'builds': self._builds,
+                'invalidations': self._invalidations,
+                'evictions': self._evictions,
+                'max_files': self._max_files,
+                'build_seconds_total': round(self._build_seconds_total, 4),
+                'cached_graphs': [
+                    {
+                        'file_id': file_id,
+                        'source': source,
+                        'nodes': len(graph.node_ids),
+                        'edges': graph.edge_count,
+                        'build_ms': round(graph.build_seconds * 1000, 2)
+                    }
+                    for (file_id, source), graph in self._graphs.items()
+                ]
+            }
+
+
+# 进程内共享的缓存实例
+graph_cache = GraphCache()
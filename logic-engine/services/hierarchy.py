@@ -0,0 +1,238 @@
+"""
+层级物化路径
+
+rds_aspects / rds_power_nodes 的 path 列保存从根节点到自身的编码数组
+（见 018_rds_hierarchy_paths.sql），子树和祖先查询直接使用 GIN 索引，无需递归：
+- 子树: path @> ARRAY[code]
+- 祖先: full_code = ANY(节点的 path)
+
+导入写入方面编码或电源图后调用 refresh_paths 维护路径。
+
+编码概要（结构祖先、子树规模）使用按文件缓存的编码前缀树（CodeTrie），每次查询 O(depth)。
+"""
+
+from itertools import islice
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import text
+
+from services.code_trie import CodeTrie
+from services.graph_cache import POWER_SOURCE, RELATIONS_SOURCE, TopologyGraph, graph_cache
+
+
+# 查询来源：方面编码树 / 电源图层级树
+HIERARCHY_SOURCES = ('aspect', 'power')
+
+
+def refresh_paths(session, file_id: int) -> None:
+    """重新计算文件的物化路径（只更新变化的行，调用方负责提交事务）"""
+    session.execute(text("SELECT rds_refresh_paths(:file_id)"), {'file_id': file_id})
+
+
+_ASPECT_COLUMNS = """
+    a.object_id, a.full_code, a.parent_code, a.hierarchy_level, a.aspect_type,
+    o.name, o.ref_code, a.path
+"""
+
+_POWER_COLUMNS = """
+    n.id, n.object_id, n.full_code, n.short_code, n.parent_code, n.label, n.level, n.node_type, n.path
+"""
+
+
+def query_subtree(
+    session,
+    file_id: int,
+    code: str,
+    source: str = 'aspect',
+    max_depth: Optional[int] = None,
+    include_self: bool = True
+) -> List[Dict]:
+    """
+    查询编码的全部子孙节点
+
+    Args:
+        session: 数据库会话
+        file_id: 模型文件 ID
+        code: 子树根节点编码
+        source: aspect（方面编码）或 power（电源图节点）
+        max_depth: 最大相对深度（None 表示不限）
+        include_self: 是否包含根节点本身
+
+    Returns:
+        节点列表（按路径排序，即深度优先顺序），depth 为相对根节点的深度
+    """
+    return list(iter_subtree(session, file_id, code, source, max_depth, include_self))
+
+
+# 流式查询时服务端游标每批读取的行数
+STREAM_BATCH_ROWS = 1000
+
+
+def iter_subtree(
+    session,
+    file_id: int,
+    code: str,
+    source: str = 'aspect',
+    max_depth: Optional[int] = None,
+    include_self: bool = True,
+    stream: bool = False
+) -> Iterator[Dict]:
+    """
+    逐个产出编码的子孙节点（参数与 query_subtree 相同）
+
+    查询在调用时立即执行，返回的迭代器只负责逐行转换。
+    stream=True 时使用服务端游标分批读取，大子树不必一次载入内存；
+    调用方需在迭代结束前保持会话打开。
+    """
+    params = {'file_id': file_id, 'code': code, 'max_depth': max_depth, 'min_depth': 0 if include_self else 1}
+    depth_filter = """
+        AND cardinality({alias}.path) - array_position({alias}.path, CAST(:code AS text)) >= :min_depth
+        AND (CAST(:max_depth AS integer) IS NULL
+             OR cardinality({alias}.path) - array_position({alias}.path, CAST(:code AS text)) <= :max_depth)
+    """
+    if source == 'power':
+        statement = text(f"""
+            SELECT {_POWER_COLUMNS}
+            FROM rds_power_nodes n
+            WHERE n.file_id = :file_id
+              AND n.path @> ARRAY[CAST(:code AS text)]
+              {depth_filter.format(alias='n')}
+            ORDER BY n.path
+        """)
+    else:
+        statement = text(f"""
+            SELECT {_ASPECT_COLUMNS}
+            FROM rds_aspects a
+            JOIN rds_objects o ON o.id = a.object_id AND o.file_id = a.file_id
+            WHERE a.file_id = :file_id
+              AND a.path @> ARRAY[CAST(:code AS text)]
+              {depth_filter.format(alias='a')}
+            ORDER BY a.path, o.ref_code
+        """)
+    if stream:
+        statement = statement.execution_options(stream_results=True, max_row_buffer=STREAM_BATCH_ROWS)
+
+    result = session.execute(statement, params)
+    return (_row_to_node(row, source, len(row.path) - row.path.index(code) - 1) for row in result)
+
+
+def query_ancestors(
+    session,
+    file_id: int,
+    code: str,
+    source: str = 'aspect',
+    include_self: bool = False
+) -> List[Dict]:
+    """
+    查询编码的全部祖先节点
+
+    Returns:
+        节点列表（从根节点开始），depth 为距查询节点的层数（父节点为 1）；
+        编码不存在时返回空列表
+    """
+    table = 'rds_power_nodes' if source == 'power' else 'rds_aspects'
+    target = session.execute(text(f"""
+        SELECT path FROM {table}
+        WHERE file_id = :file_id AND full_code = :code AND path IS NOT NULL
+        LIMIT 1
+    """), {'file_id': file_id, 'code': code}).fetchone()
+    if target is None:
+        return []
+
+    path = list(target.path) if include_self else list(target.path)[:-1]
+    if not path:
+        return []
+
+    params = {'file_id': file_id, 'path': path}
+    if source == 'power':
+        rows = session.execute(text(f"""
+            SELECT {_POWER_COLUMNS}
+            FROM rds_power_nodes n
+            WHERE n.file_id = :file_id AND n.full_code = ANY(CAST(:path AS text[]))
+            ORDER BY cardinality(n.path)
+        """), params).fetchall()
+    else:
+        rows = session.execute(text(f"""
+            SELECT {_ASPECT_COLUMNS}
+            FROM rds_aspects a
+            JOIN rds_objects o ON o.id = a.object_id AND o.file_id = a.file_id
+            WHERE a.file_id = :file_id AND a.full_code = ANY(CAST(:path AS text[]))
+            ORDER BY cardinality(a.path), o.ref_code
+        """), params).fetchall()
+
+    depth_of = {code_: len(target.path) - 1 - i for i, code_ in enumerate(target.path)}
+    return [_row_to_node(row, source, depth_of.get(row.full_code, 0)) for row in rows]
+
+
+def _row_to_node(row, source: str, depth: int) -> Dict:
+    if source == 'power':
+        return {
+            'id': str(row.id),
+            'object_id': str(row.object_id) if row.object_id else None,
+            'full_code': row.full_code,
+            'short_code': row.short_code,
+            'parent_code': row.parent_code,
+            'label': row.label,
+            'level': row.level,
+            'node_type': row.node_type,
+            'depth': depth
+        }
+    return {
+        'object_id': str(row.object_id),
+        'full_code': row.full_code,
+        'parent_code': row.parent_code,
+        'hierarchy_level': row.hierarchy_level,
+        'aspect_type': row.aspect_type,
+        'name': row.name,
+        'ref_code': row.ref_code,
+        'depth': depth
+    }
+
+
+def code_trie(session, file_id: int, source: str = 'aspect') -> CodeTrie:
+    """
+    文件编码前缀树（与图缓存同生命周期，导入后随图缓存失效）
+
+    电源图层级由缓存电源图的节点编码（full_code）构建；方面编码从 rds_aspects 读取，
+    缓存在同一文件的对象关系图上。
+    """
+    if source == 'power':
+        graph = graph_cache.get_graph(session, file_id, POWER_SOURCE)
+        return graph.derived('code_trie', _graph_code_trie)
+    graph = graph_cache.get_graph(session, file_id, RELATIONS_SOURCE)
+    return graph.derived('aspect_code_trie', lambda _graph: _load_aspect_trie(session, file_id))
+
+
+def _graph_code_trie(graph: TopologyGraph) -> CodeTrie:
+    trie = CodeTrie()
+    trie.insert_many(graph.ref_codes)
+    return trie
+
+
+def _load_aspect_trie(session, file_id: int) -> CodeTrie:
+    result = session.execute(text("""
+        SELECT DISTINCT full_code FROM rds_aspects WHERE file_id = :file_id
+    """), {'file_id': file_id})
+    trie = CodeTrie()
+    trie.insert_many(row.full_code for row in result)
+    return trie
+
+
+def summarize_code(trie: CodeTrie, code: str, limit: int = 100) -> Dict:
+    """
+    编码在前缀树中的概要
+
+    Returns:
+        exists: 编码是否存在
+        ancestors: 结构祖先（从根开始），exists 标记中间节点是否缺失
+        subtree_size: 子树中已存在的编码数量（包含自身）
+        descendants: 前序遍历的子孙编码（最多 limit 个），truncated 表示是否截断
+    """
+    descendants = list(islice(trie.descendants(code), limit + 1))
+    return {
+        'exists': code in trie,
+        'ancestors': [{'code': ancestor, 'exists': ancestor in trie} for ancestor in trie.ancestors(code)],
+        'subtree_size': trie.subtree_size(code),
+        'descendants': descendants[:limit],
+        'truncated': len(descendants) > limit
+    }
@@ -11,6 +11,9 @@ import re
 from dataclasses import dataclass
 from typing import List, Optional
 
+import numpy as np
+import pandas as pd
+
 
 @dataclass
 class AspectCode:
@@ -23,6 +26,18 @@ class AspectCode:
     segments: List[str]     # 层级段落
 
 
+@dataclass
+class ParsedCodeColumns:
+    """批量解析结果（列式），各列与输入的索引对齐"""
+    full_code: pd.Series        # 去除首尾空白后的编码
+    prefix: pd.Series           # 前缀符号，无效行为 None
+    aspect_type: pd.Series      # 方面类型，无效行为 None
+    hierarchy_level: pd.Series  # 层级深度，无效行为 0
+    parent_code: pd.Series      # 父级编码，根节点或无效行为 None
+    segment_count: pd.Series    # 非空段落数量
+    valid: pd.Series            # 有效性掩码，等价于 parse_code 返回非 None
+
+
 class IECParser:
     """IEC 81346-12 编码解析器"""
     
@@ -35,6 +50,7 @@ class IECParser:
     
     # 前缀正则（按长度降序匹配）
     PREFIX_PATTERN = re.compile(r'^(===|\+\+|=)')
+    PREFIX_REGEX = r'^(===|\+\+|=)'
     
     def parse_code(self, code: str) -> Optional[AspectCode]:
         """
@@ -121,6 +137,59 @@ class IECParser:
             segments=segments
         )
     
+    def parse_many(self, codes) -> ParsedCodeColumns:
+        """
+        批量解析一列 IEC 编码
+        
+        与逐个调用 parse_code 的结果完全一致，但使用 pandas 向量化字符串操作，
+        不为每一行创建 AspectCode 对象和段落列表。
+        
+        Args:
+            codes: pandas Series 或字符串序列；缺失值视为无效，其他值先转为字符串
+            
+        Returns:
+            ParsedCodeColumns，无效行的 valid 为 False
+        """
+        series = codes if isinstance(codes, pd.Series) else pd.Series(list(codes), dtype=object)
+        present = series.notna()
+        full_code = series.where(present, '').astype(str).str.strip()
+        
+        prefix = full_code.str.extract(self.PREFIX_REGEX, expand=False)
+        prefix_length = prefix.str.len().fillna(0).astype(int)
+        
+        # 段落数量 = 去掉前缀后按点号分割的非空段数
+        body = full_code.str.replace(self.PREFIX_REGEX, '', n=1, regex=True)
+        segment_count = body.str.count(r'[^.]+').astype(int)
+        
+        valid = present & prefix.notna() & (segment_count > 0)
+        
+        # 层级：段落数 * 2，实体节点（无末尾点号）再减 1
+        has_trailing_dot = full_code.str.endswith('.')
+        hierarchy_level = (segment_count * 2 - (~has_trailing_dot).astype(int)).where(valid, 0)
+        
+        # 父级：容器节点 -> 去掉末尾点号；实体节点 -> 截取到最后一个点号（点号须在前缀之后）
+        up_to_last_dot = full_code.str.extract(r'(?s)^(.*\.)', expand=False)
+        last_dot = full_code.str.rfind('.')
+        parent_code = pd.Series(
+            np.where(
+                has_trailing_dot,
+                full_code.str[:-1],
+                np.where(last_dot > prefix_length, up_to_last_dot, None)
+            ),
+            index=series.index,
+            dtype=object
+        ).where(valid, None)
+        
+        return ParsedCodeColumns(
+            full_code=full_code,
+            prefix=prefix.where(valid, None),
+            aspect_type=prefix.map(self.PREFIX_MAP).where(valid, None),
+            hierarchy_level=hierarchy_level,
+            parent_code=parent_code,
+            segment_count=segment_count,
+            valid=valid
+        )
+    
     def expand_hierarchy(self, code: str) -> List[AspectCode]:
         """
         展开编码的完整层级链
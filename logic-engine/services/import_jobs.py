@@ -0,0 +1,388 @@
+"""
+异步导入任务
+
+将 Excel 导入拆分为可恢复的任务，调用方提交后立即得到任务 ID，随后轮询进度：
+- parse:       解析工作簿（检查点：parsed.jsonl，每行一个解析出的对象）
+- objects:     创建 rds_objects / rds_aspects（检查点：context.json）
+- relations:   创建 FEEDS_POWER_TO 供电关系
+- power_graph: 创建电源图节点与边
+
+任务状态保存在 IMPORT_JOB_DIR 下的独立目录中（job.json），每个阶段完成后写入检查点。
+进程崩溃或重启后，启动时会从最后一个完成的阶段继续执行未完成的任务。
+执行中的任务持有目录内 lock 文件的排他锁，多个 uvicorn worker 不会重复执行同一任务；
+取消与开始执行在 state.lock 的短时排他锁内读取并更新状态，不会互相覆盖。
+"""
+
+import fcntl
+import json
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from services.executor import import_executor
+from services.importer import (
+    IMPORT_BATCH_OBJECTS,
+    ImportContext,
+    clear_file_rds_data,
+    import_objects_phase,
+    import_relations_phase,
+    import_power_graph_phase,
+)
+from services.workbook_parser import parse_workbook_for_import
+
+
+JOB_DIR = os.getenv('IMPORT_JOB_DIR') or os.path.join(tempfile.gettempdir(), 'logic-engine-import-jobs')
+
+# 已结束任务的保留时间（小时），超时后目录被清理
+JOB_RETENTION_HOURS = float(os.getenv('IMPORT_JOB_RETENTION_HOURS', '24'))
+
+PHASES = ('parse', 'objects', 'relations', 'power_graph')
+
+# 任务状态
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_SUCCEEDED = 'succeeded'
+STATUS_FAILED = 'failed'
+STATUS_CANCELLED = 'cancelled'
+FINISHED_STATUSES = (STATUS_SUCCEEDED, STATUS_FAILED, STATUS_CANCELLED)
+
+
+class JobCancelled(Exception):
+    """任务已被取消"""
+
+
+@dataclass
+class ImportJob:
+    """导入任务状态（序列化为 job.json）"""
+    job_id: str
+    file_id: int
+    status: str
+    clear_existing: bool
+    create_relations: bool
+    phase: Optional[str] = None
+    completed_phases: List[str] = field(default_factory=list)
+    progress: Dict[str, int] = field(default_factory=lambda: {
+        'rows_parsed': 0,
+        'parsed_objects': 0,
+        'virtual_objects': 0,
+        'objects_written': 0,
+        'aspects_written': 0,
+        'relations_written': 0,
+        'power_nodes_written': 0,
+        'power_edges_written': 0
+    })
+    errors: List[str] = field(default_factory=list)
+    attempts: int = 0
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+class ImportJobManager:
+    """导入任务管理（基于文件系统的任务存储）"""
+
+    def __init__(self, job_dir: str = JOB_DIR):
+        self.job_dir = job_dir
+
+    # ---------- 路径与持久化 ----------
+
+    def _path(self, job_id: str, name: str = '') -> str:
+        return os.path.join(self.job_dir, job_id, name)
+
+    def _write_json(self, path: str, data) -> None:
+        # 先写临时文件再原子替换，崩溃时不会留下半个文件
+        with self._atomic_write(path) as f:
+            json.dump(data, f, ensure_ascii=False)
+
+    @contextmanager
+    def _atomic_write(self, path: str):
+        """
+        写入唯一命名的临时文件，成功后原子替换目标文件
+
+        临时文件名由 mkstemp 生成，多个进程同时写同一文件时不会写到同一个临时文件上。
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f"{os.path.basename(path)}.", suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                yield f
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def _read_json(self, path: str):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _write_json_lines(self, path: str, batches: Iterable[List[Dict]]) -> None:
+        """逐批写入 JSON Lines 文件（同样先写临时文件再原子替换）"""
+        with self._atomic_write(path) as f:
+            for batch in batches:
+                for item in batch:
+                    f.write(json.dumps(item, ensure_ascii=False))
+                    f.write('\n')
+
+    def _read_json_lines(self, path: str, batch_size: int = IMPORT_BATCH_OBJECTS) -> Iterator[List[Dict]]:
+        """按批读取 JSON Lines 文件"""
+        with open(path, 'r', encoding='utf-8') as f:
+            batch = []
+            for line in f:
+                batch.append(json.loads(line))
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+
+    @contextmanager
+    def _state_lock(self, job_id: str):
+        """
+        任务状态的短时排他锁
+
+        cancel 与 _run 在锁内重新读取并更新 job.json，避免取消状态被执行状态覆盖；
+        与执行锁（lock 文件）分开，任务执行期间也能取消。
+        """
+        with open(self._path(job_id, 'state.lock'), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def _save(self, job: ImportJob) -> None:
+        job.updated_at = time.time()
+        self._write_json(self._path(job.job_id, 'job.json'), job.to_dict())
+
+    def get(self, job_id: str) -> Optional[ImportJob]:
+        """读取任务状态，不存在时返回 None"""
+        # job_id 由 uuid4 生成，拒绝其他格式以免拼接出任意路径
+        try:
+            uuid.UUID(job_id)
+        except (TypeError, ValueError):
+            return None
+        try:
+            return ImportJob(**self._read_json(self._path(job_id, 'job.json')))
+        except FileNotFoundError:
+            return None
+
+    def list(self, file_id: Optional[int] = None) -> List[ImportJob]:
+        """列出任务（按创建时间倒序）"""
+        jobs = []
+        if os.path.isdir(self.job_dir):
+            for job_id in os.listdir(self.job_dir):
+                job = self.get(job_id)
+                if job and (file_id is None or job.file_id == file_id):
+                    jobs.append(job)
+        return sorted(jobs, key=lambda j: j.created_at, reverse=True)
+
+    # ---------- 提交 / 取消 / 恢复 ----------
+
+    def submit(
+        self,
+        file_id: int,
+        spooled_path: str,
+        clear_existing: bool = False,
+        create_relations: bool = True
+    ) -> ImportJob:
+        """
+        提交导入任务
+
+        Args:
+            spooled_path: 已落盘的 Excel 文件，提交后移动到任务目录中，由任务负责删除
+        """
+        self.prune()
+
+        job = ImportJob(
+            job_id=str(uuid.uuid4()),
+            file_id=file_id,
+            status=STATUS_QUEUED,
+            clear_existing=clear_existing,
+            create_relations=create_relations
+        )
+        os.makedirs(self._path(job.job_id), exist_ok=True)
+        suffix = os.path.splitext(spooled_path)[1]
+        shutil.move(spooled_path, self._path(job.job_id, f'upload{suffix}'))
+        self._save(job)
+
+        self._enqueue(job.job_id)
+        return job
+
+    def _enqueue(self, job_id: str) -> None:
+        try:
+            import_executor.submit(self._run, job_id)
+        except Exception as e:
+            job = self.get(job_id)
+            if job:
+                job.status = STATUS_FAILED
+                job.errors.append(f"任务排队失败: {str(e)}")
+                self._save(job)
+            raise
+
+    def cancel(self, job_id: str) -> Optional[ImportJob]:
+        """
+        请求取消任务
+
+        取消在阶段之间或解析批次之间生效，已提交的阶段不会回滚。
+        """
+        job = self.get(job_id)
+        if job is None or job.status in FINISHED_STATUSES:
+            return job
+        with self._state_lock(job_id):
+            job = self.get(job_id)
+            if job is None or job.status in FINISHED_STATUSES:
+                return job
+            with open(self._path(job_id, 'cancel'), 'w'):
+                pass
+            # 执行中的任务由 _run 在下一个检查点标记为已取消
+            if job.status == STATUS_QUEUED:
+                job.status = STATUS_CANCELLED
+                self._save(job)
+        return job
+
+    def resume(self, job_id: str) -> Optional[ImportJob]:
+        """从最后一个完成的阶段重新执行失败的任务"""
+        job = self.get(job_id)
+        if job is None or job.status != STATUS_FAILED:
+            return job
+        job.status = STATUS_QUEUED
+        self._save(job)
+        self._enqueue(job_id)
+        return job
+
+    def resume_pending(self) -> List[str]:
+        """服务启动时恢复未完成（排队中或执行中被中断）的任务"""
+        resumed = []
+        for job in self.list():
+            if job.status in (STATUS_QUEUED, STATUS_RUNNING):
+                try:
+                    self._enqueue(job.job_id)
+                    resumed.append(job.job_id)
+                except Exception:
+                    pass
+        return resumed
+
+    def prune(self) -> None:
+        """删除超过保留时间的已结束任务"""
+        cutoff = time.time() - JOB_RETENTION_HOURS * 3600
+        for job in self.list():
+            if job.status in FINISHED_STATUSES and job.updated_at < cutoff:
+                shutil.rmtree(self._path(job.job_id), ignore_errors=True)
+
+    # ---------- 执行 ----------
+
+    def _check_cancelled(self, job_id: str) -> None:
+        if os.path.exists(self._path(job_id, 'cancel')):
+            raise JobCancelled()
+
+    def _upload_path(self, job_id: str) -> str:
+        for name in os.listdir(self._path(job_id)):
+            if name.startswith('upload'):
+                return self._path(job_id, name)
+        raise FileNotFoundError("任务上传文件不存在")
+
+    def _run(self, job_id: str) -> None:
+        lock_file = open(self._path(job_id, 'lock'), 'w')
+        try:
+            # 另一个进程正在执行该任务
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return
+
+            # 只执行排队中或执行中被中断的任务；失败的任务需通过 resume 显式重新排队，
+            # 避免多个 worker 启动时的 resume_pending 重复执行已失败的任务
+            # 在状态锁内重新读取：排队期间已被取消的任务不会再被标记为执行中
+            with self._state_lock(job_id):
+                job = self.get(job_id)
+                if job is None or job.status not in (STATUS_QUEUED, STATUS_RUNNING):
+                    return
+
+                job.status = STATUS_RUNNING
+                job.attempts += 1
+                self._save(job)
+
+            try:
+                for phase in PHASES:
+                    if phase in job.completed_phases:
+                        continue
+                    self._check_cancelled(job_id)
+                    job.phase = phase
+                    self._save(job)
+
+                    self._run_phase(job, phase)
+
+                    job.completed_phases.append(phase)
+                    self._save(job)
+
+                job.status = STATUS_SUCCEEDED
+                job.phase = None
+                self._cleanup_payload(job_id)
+            except JobCancelled:
+                job.status = STATUS_CANCELLED
+                self._cleanup_payload(job_id)
+            except Exception as e:
+                job.status = STATUS_FAILED
+                job.errors.append(f"阶段 {job.phase} 失败: {str(e)}")
+            self._save(job)
+        finally:
+            lock_file.close()
+
+    def _run_phase(self, job: ImportJob, phase: str) -> None:
+        if phase == 'parse':
+            def on_batch(rows_parsed: int) -> None:
+                job.progress['rows_parsed'] = rows_parsed
+                self._save(job)
+                self._check_cancelled(job.job_id)
+
+            # 解析结果逐批写入检查点文件，内存中不保留整个工作簿的对象
+            workbook = parse_workbook_for_import(self._upload_path(job.job_id), on_batch=on_batch)
+            self._write_json_lines(self._path(job.job_id, 'parsed.jsonl'), workbook.batches())
+            job.progress['rows_parsed'] = workbook.total_rows
+            job.progress['parsed_objects'] = workbook.parsed_objects
+            job.progress['virtual_objects'] = workbook.virtual_objects
+            job.errors.extend(workbook.errors)
+
+        elif phase == 'objects':
+            # 重新执行该阶段时再次清除，清除本身是幂等的
+            if job.clear_existing:
+                clear_result = clear_file_rds_data(job.file_id)
+                if not clear_result.get('success'):
+                    raise RuntimeError(f"清除现有数据失败: {clear_result.get('error')}")
+
+            object_batches = self._read_json_lines(self._path(job.job_id, 'parsed.jsonl'))
+            result, context = import_objects_phase(job.file_id, object_batches)
+            job.progress['objects_written'] = result.objects_created
+            job.progress['aspects_written'] = result.aspects_created
+            job.errors.extend(result.errors)
+            self._write_json(self._path(job.job_id, 'context.json'), asdict(context))
+
+        elif phase == 'relations':
+            if job.create_relations:
+                context = ImportContext(**self._read_json(self._path(job.job_id, 'context.json')))
+                job.progress['relations_written'] = import_relations_phase(job.file_id, context)
+
+        elif phase == 'power_graph':
+            context = ImportContext(**self._read_json(self._path(job.job_id, 'context.json')))
+            graph_result = import_power_graph_phase(job.file_id, context)
+            job.progress['power_nodes_written'] = graph_result['nodes_created']
+            job.progress['power_edges_written'] = graph_result['edges_created']
+
+    def _cleanup_payload(self, job_id: str) -> None:
+        """任务结束后删除上传文件和检查点，仅保留 job.json"""
+        for name in os.listdir(self._path(job_id)):
+            if name not in ('job.json', 'lock', 'state.lock'):
+                try:
+                    os.remove(self._path(job_id, name))
+                except FileNotFoundError:
+                    pass
+
+
+# 进程内共享的任务管理器
+import_job_manager = ImportJobManager()
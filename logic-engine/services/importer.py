@@ -7,16 +7,38 @@ Excel 数据导入服务
 - rds_relations: 供电链路关系
 """
 
+import hashlib
+import io
+import json
+import logging
 import os
-from typing import List, Dict, Optional, Tuple
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import re
 
+from services.graph_cache import graph_cache
+from services.hierarchy import refresh_paths
+from services.power_graph_builder import DEVICE_LEVEL, PowerGraphPlan, build_power_graph
+from services.executor import ExecutorBusyError, query_executor
+from services.rds_partitions import (
+    SHADOW_SCHEMA_KEY,
+    create_shadow_tables,
+    drop_file_partitions,
+    drop_schema,
+    ensure_file_partitions,
+    is_partitioned,
+    list_retired_schemas,
+    list_stale_shadow_schemas,
+    swap_shadow_tables,
+)
+
 
 import urllib.parse
 
+logger = logging.getLogger(__name__)
+
 # 优先读取完整的 DATABASE_URL，如果未提供，则收集各个环境变量自己构建
 _db_url = os.getenv('DATABASE_URL')
 if not _db_url:
@@ -32,6 +54,12 @@ else:
 engine = create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 合并后的对象每批写入的数量（同一 ref_code 的对象不跨批）
+IMPORT_BATCH_OBJECTS = int(os.getenv('IMPORT_BATCH_OBJECTS', '2000'))
+
+# 解析结果按批次传入导入函数：每批为对象字典列表，同一 ref_code 的多行可以分布在不同批次中
+ObjectBatches = Iterable[List[Dict]]
+
 
 @dataclass
 class ImportResult:
@@ -43,17 +71,34 @@ class ImportResult:
     errors: List[str]
 
 
+@dataclass
+class ImportContext:
+    """
+    导入阶段之间传递的中间数据
+    
+    均为可 JSON 序列化的基础类型，异步导入任务会将其保存为检查点。
+    """
+    power_code_to_object: Dict[str, str] = field(default_factory=dict)   # 电源编码 -> 对象 ID
+    power_aspects: List[Dict] = field(default_factory=list)              # 电源方面（用于电源图）
+    asset_code_to_object_id: Dict[str, str] = field(default_factory=dict)
+
+
 def import_excel_data(
     file_id: int,
-    parsed_objects: List[Dict],
+    object_batches: ObjectBatches,
     create_power_relations: bool = True
 ) -> ImportResult:
     """
     将解析后的 Excel 数据导入数据库
     
+    采用批量加载：解析批次逐批 COPY 到暂存表，按 ref_code 合并后分批校验，
+    再通过 COPY 写入临时表，用少量集合语句合并到 rds_objects / rds_aspects，
+    避免逐行 INSERT + savepoint，内存中也不保留整个工作簿的对象。
+    所有阶段在同一事务中完成。
+    
     Args:
         file_id: 关联的模型文件 ID
-        parsed_objects: 由 parse.py 解析后的对象列表
+        object_batches: 解析出的对象批次（见 ObjectBatches）
         create_power_relations: 是否自动创建供电链路关系
         
     Returns:
@@ -66,136 +111,970 @@ def import_excel_data(
         relations_created=0,
         errors=[]
     )
-    
-    # 新增：电源图统计
-    power_nodes_created = 0
-    power_edges_created = 0
+    graph_result = {'nodes_created': 0, 'edges_created': 0}
     
     try:
         with SessionLocal() as session:
-            # 用于追踪电源编码和对象的映射（用于建立供电关系）
-            power_code_to_object: Dict[str, int] = {}
+            # 1-2. 批量创建 rds_objects / rds_aspects 记录
+            context = _load_objects(session, file_id, object_batches, result)
             
-            # 新增：收集电源方面和对象ID映射
-            power_aspects: List[Dict] = []
-            asset_code_to_object_id: Dict[str, str] = {}
+            # 3. 创建供电链路关系
+            if create_power_relations:
+                result.relations_created = _create_relations_from_context(session, context)
             
-            for obj_data in parsed_objects:
-                # 使用 savepoint 让单个对象失败不影响其他对象
-                savepoint = session.begin_nested()
+            # 4. 创建电源图数据
+            graph_result = _create_power_graph_from_context(session, file_id, context)
+            
+            # 5. 维护方面编码与电源图节点的物化路径
+            refresh_paths(session, file_id)
+            
+            session.commit()
+            
+            # 拓扑已变化，丢弃该文件的内存图缓存
+            graph_cache.invalidate(file_id)
+            
+    except Exception as e:
+        result.success = False
+        result.errors.append(f"数据库事务失败: {str(e)}")
+    
+    _append_power_graph_info(result, graph_result)
+    return result
+
+
+def replace_excel_data(
+    file_id: int,
+    object_batches: ObjectBatches,
+    create_power_relations: bool = True
+) -> ImportResult:
+    """
+    用解析结果替换文件的全部 RDS 数据，导入期间读者始终看到完整的旧数据
+    
+    - 分区表结构：先导入到影子表（独立 schema，含索引），再在一个短事务中
+      卸载旧分区、挂载新分区并重建供电关系，旧分区由后台删除
+    - 普通表结构：删除与导入在同一事务中完成，提交前其他连接看到的仍是旧数据
+    
+    Args:
+        file_id: 关联的模型文件 ID
+        object_batches: 解析出的对象批次（见 ObjectBatches）
+        create_power_relations: 是否自动创建供电链路关系
+        
+    Returns:
+        导入结果统计
+    """
+    result = ImportResult(
+        success=True,
+        objects_created=0,
+        aspects_created=0,
+        relations_created=0,
+        errors=[]
+    )
+    graph_result = {'nodes_created': 0, 'edges_created': 0}
+    
+    try:
+        with SessionLocal() as session:
+            if not is_partitioned(session):
+                _delete_file_rds_data(session, file_id)
+                context = _load_objects(session, file_id, object_batches, result)
+                if create_power_relations:
+                    result.relations_created = _create_relations_from_context(session, context)
+                graph_result = _create_power_graph_from_context(session, file_id, context)
+                refresh_paths(session, file_id)
+                session.commit()
+            else:
+                # 1. 导入影子表（提交后对读者不可见，但不再占用事务）
+                shadow_schema = create_shadow_tables(session, file_id)
                 try:
-                    # 1. 创建 rds_objects 记录
-                    object_id = _create_object(
-                        session, 
-                        file_id, 
-                        obj_data
-                    )
-                    result.objects_created += 1
-                    
-                    # 记录资产编码映射
-                    asset_code = obj_data.get('asset_code', '')
-                    if asset_code:
-                        asset_code_to_object_id[asset_code] = object_id
-                    
-                    # 2. 创建 rds_aspects 记录
-                    for aspect in obj_data.get('aspects', []):
-                        _create_aspect(session, object_id, aspect)
-                        result.aspects_created += 1
-                        
-                        # 记录电源编码映射 (用于旧的 rds_relations)
-                        if aspect.get('aspect_type') == 'power':
-                            power_code_to_object[aspect['full_code']] = object_id
-                            
-                            # 新增：收集电源方面用于图数据
-                            power_aspects.append({
-                                'full_code': aspect['full_code'],
-                                'asset_code': asset_code,
-                                'name': obj_data.get('name', '')
-                            })
-                    
-                    savepoint.commit()
-                    
-                except Exception as e:
-                    savepoint.rollback()
-                    result.errors.append(
-                        f"对象 '{obj_data.get('name', 'unknown')}': {str(e)}"
-                    )
+                    context = _load_objects(session, file_id, object_batches, result)
+                    graph_result = _create_power_graph_from_context(session, file_id, context)
+                    refresh_paths(session, file_id)
+                    session.commit()
+                except Exception:
+                    session.rollback()
+                    session.info.pop(SHADOW_SCHEMA_KEY, None)
+                    raise
+                
+                # 2. 切换分区；供电关系不分区，随切换一起替换
+                try:
+                    session.execute(text("""
+                        DELETE FROM rds_relations 
+                        WHERE source_obj_id IN (SELECT id FROM rds_objects WHERE file_id = :file_id)
+                           OR target_obj_id IN (SELECT id FROM rds_objects WHERE file_id = :file_id)
+                    """), {'file_id': file_id})
+                    retired_schema = swap_shadow_tables(session, file_id, shadow_schema)
+                    if create_power_relations:
+                        result.relations_created = _create_relations_from_context(session, context)
+                    session.commit()
+                except Exception:
+                    session.rollback()
+                    result.errors.extend(_drop_schemas([shadow_schema]))
+                    raise
+                
+                # 3. 后台删除旧分区
+                _schedule_schema_cleanup(retired_schema)
+            
+            graph_cache.invalidate(file_id)
+            
+    except Exception as e:
+        result.success = False
+        result.errors.append(f"数据库事务失败: {str(e)}")
+    
+    _append_power_graph_info(result, graph_result)
+    return result
+
+
+def _create_relations_from_context(session, context: ImportContext) -> int:
+    """创建供电链路关系 (旧逻辑，保留兼容)"""
+    if not context.power_code_to_object:
+        return 0
+    return _create_power_relations(session, context.power_code_to_object)
+
+
+def _create_power_graph_from_context(session, file_id: int, context: ImportContext) -> Dict[str, int]:
+    """创建电源图数据 (新逻辑)"""
+    if not context.power_aspects:
+        return {'nodes_created': 0, 'edges_created': 0}
+    return _create_power_graph_data(
+        session,
+        file_id,
+        context.power_aspects,
+        context.asset_code_to_object_id
+    )
+
+
+def _append_power_graph_info(result: ImportResult, graph_result: Dict[str, int]) -> None:
+    """添加电源图统计到结果（暂时放在 errors 中作为额外信息）"""
+    if graph_result['nodes_created'] > 0 or graph_result['edges_created'] > 0:
+        result.errors.append(
+            f"[INFO] 电源图: {graph_result['nodes_created']} 节点, {graph_result['edges_created']} 边"
+        )
+
+
+def _drop_schemas(schemas: List[str]) -> List[str]:
+    """
+    删除影子/旧分区 schema，失败的留给下一次清理
+
+    Returns:
+        失败信息列表（全部成功时为空）
+    """
+    errors = []
+    for schema in schemas:
+        try:
+            with SessionLocal() as session:
+                drop_schema(session, schema)
+                session.commit()
+        except Exception as e:
+            errors.append(f"删除 schema {schema} 失败: {str(e)}")
+    return errors
+
+
+def _schedule_schema_cleanup(retired_schema: str) -> None:
+    """在后台删除旧分区，同时清理之前残留的旧分区 schema 和超时未切换的影子 schema"""
+    def cleanup():
+        # 后台任务没有调用方可以接收结果，失败写入日志
+        try:
+            with SessionLocal() as session:
+                schemas = list_retired_schemas(session) + list_stale_shadow_schemas(session)
+        except Exception as e:
+            logger.warning(f"查询待清理的 schema 失败: {str(e)}")
+            return
+        for error in _drop_schemas(schemas):
+            logger.warning(error)
+    
+    try:
+        query_executor.submit(cleanup)
+    except ExecutorBusyError:
+        # 线程池繁忙时留给下一次替换导入清理
+        pass
+
+
+# ==================== 增量导入 ====================
+#
+# 同一工作簿反复上传时只写入变化的部分：
+# - 对象按 (object_type, ref_code) 匹配，内容哈希保存在 rds_objects.metadata.row_hash
+# - 新增/变化的对象重新写入（变化对象的方面编码先删除再写入），消失的对象连同方面与关系一并删除
+# - 供电关系与电源图根据完整的新数据计算后与现有记录比较，只插入/更新/删除差异部分
+
+
+@dataclass
+class DeltaImportResult(ImportResult):
+    """增量导入结果（diff 为各类记录的增删改数量）"""
+    diff: Dict[str, int] = field(default_factory=dict)
+
+
+def delta_import_excel_data(
+    file_id: int,
+    object_batches: ObjectBatches,
+    create_power_relations: bool = True
+) -> DeltaImportResult:
+    """
+    增量导入：使文件的 RDS 数据与解析结果一致，只写入实际变化的记录
+    
+    首次对历史数据执行增量导入时，旧记录没有内容哈希，全部视为变化。
+    
+    Args:
+        file_id: 关联的模型文件 ID
+        object_batches: 解析出的对象批次（见 ObjectBatches）
+        create_power_relations: 是否维护供电链路关系（False 时不改动现有关系）
+        
+    Returns:
+        导入结果统计与差异数量
+    """
+    result = DeltaImportResult(
+        success=True,
+        objects_created=0,
+        aspects_created=0,
+        relations_created=0,
+        errors=[]
+    )
+    
+    try:
+        with SessionLocal() as session:
+            ensure_file_partitions(session, file_id)
             
-            # 3. 创建供电链路关系 (旧逻辑，保留兼容)
-            if create_power_relations and power_code_to_object:
-                relations_count = _create_power_relations(
-                    session, 
-                    power_code_to_object
-                )
-                result.relations_created = relations_count
+            existing = {
+                (row.object_type, row.ref_code): (str(row.id), row.row_hash)
+                for row in session.execute(text("""
+                    SELECT id, object_type, ref_code, metadata->>'row_hash' AS row_hash
+                    FROM rds_objects
+                    WHERE file_id = :file_id
+                """), {'file_id': file_id})
+            }
+            
+            # 1-2. 逐批比较对象哈希，写入新增和变化的对象（变化对象的方面编码先删除再写入）
+            _stage_rows(session, object_batches)
+            diff = _ObjectDiff()
+            context = ImportContext()
+            for chunk in _iter_merged_chunks(session):
+                valid_objects = _validate_objects(chunk, result)
+                object_ids = _apply_objects_delta(session, file_id, valid_objects, existing, diff, result)
+                _extend_context(context, valid_objects, object_ids)
+            
+            # 3. 删除消失的对象及其方面编码与关系
+            deleted_ids = _removed_object_ids(existing, diff.seen)
+            if deleted_ids:
+                _delete_objects(session, file_id, deleted_ids)
             
-            # 4. 新增：创建电源图数据 (新逻辑)
-            if power_aspects:
-                graph_result = _create_power_graph_data(
-                    session,
-                    file_id,
-                    power_aspects,
-                    asset_code_to_object_id
-                )
-                power_nodes_created = graph_result['nodes_created']
-                power_edges_created = graph_result['edges_created']
+            # 4. 供电关系差异
+            relations_diff = {'relations_inserted': 0, 'relations_deleted': 0}
+            if create_power_relations:
+                relations_diff = _apply_relations_delta(session, file_id, context)
+                result.relations_created = relations_diff['relations_inserted']
+            
+            # 5. 电源图差异
+            plan = build_power_graph(file_id, context.power_aspects, context.asset_code_to_object_id)
+            graph_diff = _apply_power_graph_delta(session, file_id, plan)
+            
+            # 6. 物化路径（只更新变化的行）
+            refresh_paths(session, file_id)
             
             session.commit()
             
+            graph_cache.invalidate(file_id)
+            
+            result.diff = {
+                'objects_inserted': diff.inserted,
+                'objects_updated': diff.updated,
+                'objects_deleted': len(deleted_ids),
+                'objects_unchanged': len(diff.seen) - diff.inserted - diff.updated,
+                **relations_diff,
+                **graph_diff
+            }
     except Exception as e:
         result.success = False
         result.errors.append(f"数据库事务失败: {str(e)}")
     
-    # 添加电源图统计到结果（暂时放在 errors 中作为额外信息）
-    if power_nodes_created > 0 or power_edges_created > 0:
-        result.errors.append(f"[INFO] 电源图: {power_nodes_created} 节点, {power_edges_created} 边")
-    
     return result
 
 
-def _create_object(session, file_id: int, obj_data: Dict) -> int:
+@dataclass
+class _ObjectDiff:
+    """增量导入中逐批累计的对象差异"""
+    seen: set = field(default_factory=set)     # 新数据中出现的 (object_type, ref_code)
+    inserted: int = 0
+    updated: int = 0
+
+
+def _diff_object_groups(
+    groups: Dict[Tuple[str, str], '_ObjectGroup'],
+    existing: Dict[Tuple[str, str], Tuple[str, Optional[str]]]
+) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+    """
+    按内容哈希比较对象分组与现有记录
+    
+    Returns:
+        (新增的键, 内容变化的键)，其余键未变化
+    """
+    inserted = [key for key in groups if key not in existing]
+    updated = [
+        key for key, group in groups.items()
+        if key in existing and existing[key][1] != group.row_hash
+    ]
+    return inserted, updated
+
+
+def _removed_object_ids(
+    existing: Dict[Tuple[str, str], Tuple[str, Optional[str]]],
+    seen: set
+) -> List[str]:
+    """现有记录中未出现在新数据里的对象 ID（增量导入时删除）"""
+    return [object_id for key, (object_id, _) in existing.items() if key not in seen]
+
+
+def _apply_objects_delta(
+    session,
+    file_id: int,
+    valid_objects: List[Dict],
+    existing: Dict[Tuple[str, str], Tuple[str, Optional[str]]],
+    diff: _ObjectDiff,
+    result: ImportResult
+) -> List[str]:
     """
-    创建 rds_objects 记录
+    写入一批对象中新增和变化的对象（同一对象的所有行一起写入，合并规则与全量导入一致）
     
     Returns:
-        新创建的对象 ID
+        与 valid_objects 一一对应的对象 ID（未变化的沿用现有 ID）
+    """
+    groups = _group_objects(valid_objects)
+    inserted_keys, updated_keys = _diff_object_groups(groups, existing)
+    diff.seen.update(groups)
+    diff.inserted += len(inserted_keys)
+    diff.updated += len(updated_keys)
+    
+    updated_ids = [existing[key][0] for key in updated_keys]
+    if updated_ids:
+        session.execute(text("""
+            DELETE FROM rds_aspects
+            WHERE file_id = :file_id AND object_id = ANY(CAST(:ids AS uuid[]))
+        """), {'file_id': file_id, 'ids': updated_ids})
+    
+    changed_keys = set(inserted_keys) | set(updated_keys)
+    changed_objects = [obj for key in groups if key in changed_keys for obj in groups[key].rows]
+    changed_ids = _bulk_load_objects(session, file_id, changed_objects)
+    result.aspects_created += _bulk_load_aspects(session, file_id, changed_objects, changed_ids)
+    result.objects_created += len(changed_keys)
+    
+    id_map = {key: existing[key][0] for key in groups if key in existing}
+    for obj_data, object_id in zip(changed_objects, changed_ids):
+        id_map[_object_key(obj_data)] = object_id
+    return [id_map[_object_key(obj_data)] for obj_data in valid_objects]
+
+
+def _delete_objects(session, file_id: int, object_ids: List[str]) -> None:
+    """删除对象及其方面编码与关系"""
+    session.execute(text("""
+        DELETE FROM rds_relations
+        WHERE source_obj_id = ANY(CAST(:ids AS uuid[]))
+           OR target_obj_id = ANY(CAST(:ids AS uuid[]))
+    """), {'ids': object_ids})
+    session.execute(text("""
+        DELETE FROM rds_aspects
+        WHERE file_id = :file_id AND object_id = ANY(CAST(:ids AS uuid[]))
+    """), {'file_id': file_id, 'ids': object_ids})
+    session.execute(text("""
+        DELETE FROM rds_objects
+        WHERE file_id = :file_id AND id = ANY(CAST(:ids AS uuid[]))
+    """), {'file_id': file_id, 'ids': object_ids})
+
+
+def _apply_relations_delta(session, file_id: int, context: ImportContext) -> Dict[str, int]:
+    """比较 FEEDS_POWER_TO 关系，插入缺失的、删除多余的"""
+    desired = _power_relation_pairs(context.power_code_to_object)
+    desired_set = set(desired)
+    
+    existing_rows = session.execute(text("""
+        SELECT r.id, r.source_obj_id, r.target_obj_id
+        FROM rds_relations r
+        JOIN rds_objects o ON o.id = r.source_obj_id
+        WHERE o.file_id = :file_id AND r.relation_type = 'FEEDS_POWER_TO'
+    """), {'file_id': file_id}).fetchall()
+    existing_pairs = {(str(row.source_obj_id), str(row.target_obj_id)) for row in existing_rows}
+    
+    stale_ids = [
+        str(row.id) for row in existing_rows
+        if (str(row.source_obj_id), str(row.target_obj_id)) not in desired_set
+    ]
+    if stale_ids:
+        session.execute(text("""
+            DELETE FROM rds_relations WHERE id = ANY(CAST(:ids AS uuid[]))
+        """), {'ids': stale_ids})
+    
+    missing = [pair for pair in desired if pair not in existing_pairs]
+    return {
+        'relations_inserted': _insert_power_relations(session, missing) if missing else 0,
+        'relations_deleted': len(stale_ids)
+    }
+
+
+def _apply_power_graph_delta(session, file_id: int, plan: PowerGraphPlan) -> Dict[str, int]:
     """
-    # 确定对象类型
-    object_type = _determine_object_type(obj_data)
+    比较电源图，只写入差异
+    
+    节点按 full_code 比较全部属性，标签直接取本次计算结果；边按 (源, 目标, 类型) 比较。
+    """
+    existing_nodes = {
+        row.full_code: row
+        for row in session.execute(text("""
+            SELECT id, object_id, full_code, short_code, parent_code, label, level, node_type
+            FROM rds_power_nodes
+            WHERE file_id = :file_id
+        """), {'file_id': file_id})
+    }
+    existing_edges = {
+        (str(row.source_node_id), str(row.target_node_id), row.relation_type): str(row.id)
+        for row in session.execute(text("""
+            SELECT id, source_node_id, target_node_id, relation_type
+            FROM rds_power_edges
+            WHERE file_id = :file_id
+        """), {'file_id': file_id})
+    }
+    
+    inserted_nodes, updated_nodes = [], []
+    for full_code, node in plan.nodes.items():
+        row = existing_nodes.get(full_code)
+        if row is None:
+            inserted_nodes.append(node)
+        elif (
+            str(row.id) != node.id
+            or (str(row.object_id) if row.object_id else None) != node.object_id
+            or row.short_code != node.short_code
+            or row.parent_code != node.parent_code
+            or row.label != node.label
+            or row.level != node.level
+            or row.node_type != node.node_type
+        ):
+            updated_nodes.append(node)
+    stale_node_ids = [str(row.id) for code, row in existing_nodes.items() if code not in plan.nodes]
+    stale_edge_ids = [edge_id for key, edge_id in existing_edges.items() if key not in plan.edges]
+    missing_edges = [(key, edge_id) for key, edge_id in plan.edges.items() if key not in existing_edges]
+    
+    # 先删边再删节点
+    if stale_edge_ids:
+        session.execute(text("""
+            DELETE FROM rds_power_edges
+            WHERE file_id = :file_id AND id = ANY(CAST(:ids AS uuid[]))
+        """), {'file_id': file_id, 'ids': stale_edge_ids})
+    if stale_node_ids:
+        session.execute(text("""
+            DELETE FROM rds_power_nodes
+            WHERE file_id = :file_id AND id = ANY(CAST(:ids AS uuid[]))
+        """), {'file_id': file_id, 'ids': stale_node_ids})
     
-    # 生成参考编码（优先使用传入的 ref_code，否则尝试 asset_code 或 name）
-    ref_code = obj_data.get('ref_code') or obj_data.get('asset_code', '') or obj_data.get('name', '')
+    changed_nodes = inserted_nodes + updated_nodes
+    if changed_nodes:
+        session.execute(text("""
+            INSERT INTO rds_power_nodes (
+                id, file_id, object_id, full_code, short_code, parent_code, label, level, node_type
+            )
+            SELECT n.id, :file_id, n.object_id, n.full_code, n.short_code, n.parent_code, n.label, n.level, n.node_type
+            FROM unnest(
+                CAST(:ids AS uuid[]), CAST(:object_ids AS uuid[]), CAST(:full_codes AS varchar[]),
+                CAST(:short_codes AS varchar[]), CAST(:parent_codes AS varchar[]), CAST(:labels AS varchar[]),
+                CAST(:levels AS integer[]), CAST(:node_types AS varchar[])
+            ) AS n(id, object_id, full_code, short_code, parent_code, label, level, node_type)
+            ON CONFLICT (file_id, full_code) DO UPDATE SET
+                id = EXCLUDED.id,
+                object_id = EXCLUDED.object_id,
+                short_code = EXCLUDED.short_code,
+                parent_code = EXCLUDED.parent_code,
+                label = EXCLUDED.label,
+                level = EXCLUDED.level,
+                node_type = EXCLUDED.node_type
+        """), {
+            'file_id': file_id,
+            'ids': [n.id for n in changed_nodes],
+            'object_ids': [n.object_id for n in changed_nodes],
+            'full_codes': [n.full_code for n in changed_nodes],
+            'short_codes': [n.short_code for n in changed_nodes],
+            'parent_codes': [n.parent_code for n in changed_nodes],
+            'labels': [n.label for n in changed_nodes],
+            'levels': [n.level for n in changed_nodes],
+            'node_types': [n.node_type for n in changed_nodes]
+        })
+    
+    if missing_edges:
+        session.execute(text("""
+            INSERT INTO rds_power_edges (
+                id, file_id, source_node_id, target_node_id, relation_type
+            )
+            SELECT e.id, :file_id, e.source_id, e.target_id, e.relation_type
+            FROM unnest(
+                CAST(:ids AS uuid[]), CAST(:source_ids AS uuid[]), CAST(:target_ids AS uuid[]),
+                CAST(:relation_types AS varchar[])
+            ) AS e(id, source_id, target_id, relation_type)
+            ON CONFLICT DO NOTHING
+        """), {
+            'file_id': file_id,
+            'ids': [edge_id for _, edge_id in missing_edges],
+            'source_ids': [key[0] for key, _ in missing_edges],
+            'target_ids': [key[1] for key, _ in missing_edges],
+            'relation_types': [key[2] for key, _ in missing_edges]
+        })
+    
+    return {
+        'power_nodes_inserted': len(inserted_nodes),
+        'power_nodes_updated': len(updated_nodes),
+        'power_nodes_deleted': len(stale_node_ids),
+        'power_edges_inserted': len(missing_edges),
+        'power_edges_deleted': len(stale_edge_ids)
+    }
+
+
+# ==================== 分阶段导入（供异步导入任务使用） ====================
+#
+# 每个阶段使用独立事务并且可重复执行（upsert / ON CONFLICT DO NOTHING），
+# 任务在阶段之间保存检查点，进程崩溃后从最后一个完成的阶段继续。
+
+def import_objects_phase(file_id: int, object_batches: ObjectBatches) -> Tuple[ImportResult, ImportContext]:
+    """阶段：创建 rds_objects / rds_aspects 记录（数据库错误直接抛出）"""
+    result = ImportResult(
+        success=True,
+        objects_created=0,
+        aspects_created=0,
+        relations_created=0,
+        errors=[]
+    )
+    
+    with SessionLocal() as session:
+        context = _load_objects(session, file_id, object_batches, result)
+        refresh_paths(session, file_id)
+        session.commit()
+    
+    graph_cache.invalidate(file_id)
+    return result, context
+
+
+def import_relations_phase(file_id: int, context: ImportContext) -> int:
+    """阶段：创建 FEEDS_POWER_TO 供电关系，返回关系数量"""
+    if not context.power_code_to_object:
+        return 0
+    with SessionLocal() as session:
+        relations_count = _create_power_relations(session, context.power_code_to_object)
+        session.commit()
+    
+    graph_cache.invalidate(file_id)
+    return relations_count
+
+
+def import_power_graph_phase(file_id: int, context: ImportContext) -> Dict[str, int]:
+    """阶段：创建电源图节点与边"""
+    if not context.power_aspects:
+        return {'nodes_created': 0, 'edges_created': 0}
+    with SessionLocal() as session:
+        graph_result = _create_power_graph_data(
+            session,
+            file_id,
+            context.power_aspects,
+            context.asset_code_to_object_id
+        )
+        refresh_paths(session, file_id)
+        session.commit()
+    
+    graph_cache.invalidate(file_id)
+    return graph_result
+
+
+def _validate_objects(parsed_objects: List[Dict], result: ImportResult) -> List[Dict]:
+    """导入前逐行校验，校验失败的行单独报错，不影响其他行"""
+    valid_objects: List[Dict] = []
+    for obj_data in parsed_objects:
+        error = _validate_object(obj_data)
+        if error:
+            result.errors.append(
+                f"对象 '{obj_data.get('name', 'unknown')}': {error}"
+            )
+        else:
+            valid_objects.append(obj_data)
+    return valid_objects
+
+
+def _load_objects(
+    session,
+    file_id: int,
+    object_batches: ObjectBatches,
+    result: ImportResult
+) -> ImportContext:
+    """批量创建对象与方面编码（按合并后的对象分批写入），并收集后续阶段需要的映射"""
+    # 分区表结构下先确保该文件的分区存在
+    ensure_file_partitions(session, file_id)
+    _stage_rows(session, object_batches)
+    
+    context = ImportContext()
+    for chunk in _iter_merged_chunks(session):
+        valid_objects = _validate_objects(chunk, result)
+        
+        # 1. 批量创建 rds_objects 记录
+        object_ids = _bulk_load_objects(session, file_id, valid_objects)
+        
+        # 2. 批量创建 rds_aspects 记录
+        result.aspects_created += _bulk_load_aspects(
+            session, file_id, valid_objects, object_ids
+        )
+        result.objects_created += len(object_ids)
+        
+        _extend_context(context, valid_objects, object_ids)
+    
+    return context
+
+
+def _stage_rows(session, object_batches: ObjectBatches) -> int:
+    """
+    将解析批次逐批 COPY 到暂存表 _stage_rds_rows（同一 ref_code 的行尚未合并）
+    
+    解析在迭代 object_batches 时进行，内存中只保留当前批次。
+    
+    Returns:
+        暂存的行数
+    """
+    session.execute(text("""
+        CREATE TEMP TABLE _stage_rds_rows (
+            seq INTEGER,
+            ref_code TEXT,
+            is_virtual BOOLEAN,
+            data TEXT
+        ) ON COMMIT DROP
+    """))
+    
+    seq = 0
+    for batch in object_batches:
+        rows = []
+        for obj_data in batch:
+            rows.append((
+                seq,
+                _resolve_ref_code(obj_data),
+                obj_data.get('object_type') == 'system',
+                json.dumps(obj_data, ensure_ascii=False)
+            ))
+            seq += 1
+        if rows:
+            _copy_rows(session, '_stage_rds_rows', ['seq', 'ref_code', 'is_virtual', 'data'], rows)
+    return seq
+
+
+def _iter_staged_objects(session) -> Iterator[Dict]:
+    """
+    按 ref_code 合并暂存行，逐个产出合并后的对象
+    
+    合并规则与逐行解析时的一物多面合并相同：名称、工作表与行号取最后一行，方面编码按行顺序追加；
+    虚拟对象不与显式对象合并。对象按 ref_code 首次出现的顺序产出，同一 ref_code 的对象相邻。
+    使用服务端游标分批读取。
+    """
+    rows = session.execute(text("""
+        SELECT ref_code, is_virtual, data
+        FROM _stage_rds_rows
+        ORDER BY min(seq) OVER (PARTITION BY ref_code), is_virtual, seq
+    """).execution_options(stream_results=True, max_row_buffer=IMPORT_BATCH_OBJECTS))
+    
+    current_key = None
+    current: Optional[Dict] = None
+    for row in rows:
+        obj_data = json.loads(row.data)
+        key = (row.ref_code, row.is_virtual)
+        if key == current_key:
+            current['aspects'].extend(obj_data.get('aspects', []))
+            current['name'] = obj_data.get('name', '')
+            current['sheet'] = obj_data.get('sheet', '')
+            current['row_index'] = obj_data.get('row_index', 0)
+            continue
+        if current is not None:
+            yield current
+        current_key, current = key, obj_data
+        current.setdefault('aspects', [])
+    if current is not None:
+        yield current
+
+
+def _iter_merged_chunks(session, size: int = IMPORT_BATCH_OBJECTS) -> Iterator[List[Dict]]:
+    """
+    将合并后的对象分批（约 size 个一批）
+    
+    同一 ref_code 的对象不跨批：行哈希与 (object_type, ref_code) 合并需要同一对象的全部行。
+    """
+    chunk: List[Dict] = []
+    for obj_data in _iter_staged_objects(session):
+        if len(chunk) >= size and _resolve_ref_code(obj_data) != _resolve_ref_code(chunk[-1]):
+            yield chunk
+            chunk = []
+        chunk.append(obj_data)
+    if chunk:
+        yield chunk
+
+
+def _extend_context(context: ImportContext, valid_objects: List[Dict], object_ids: List[str]) -> None:
+    """根据一批对象与其 ID 追加后续阶段需要的映射（后出现的对象覆盖同一编码的映射）"""
+    for obj_data, object_id in zip(valid_objects, object_ids):
+        # 记录资产编码映射
+        asset_code = obj_data.get('asset_code', '')
+        if asset_code:
+            context.asset_code_to_object_id[asset_code] = object_id
+        
+        for aspect in obj_data.get('aspects', []):
+            # 记录电源编码映射 (用于旧的 rds_relations)
+            if aspect.get('aspect_type') == 'power':
+                context.power_code_to_object[aspect['full_code']] = object_id
+                
+                # 新增：收集电源方面用于图数据
+                context.power_aspects.append({
+                    'full_code': aspect['full_code'],
+                    'asset_code': asset_code,
+                    'name': obj_data.get('name', '')
+                })
+
+
+# 列长度限制，与 008_rds_iec_81346.sql 中的定义保持一致
+_MAX_REF_CODE_LENGTH = 255
+_MAX_NAME_LENGTH = 500
+_MAX_MC_CODE_LENGTH = 255
+_MAX_FULL_CODE_LENGTH = 512
+_MAX_PREFIX_LENGTH = 5
+_VALID_ASPECT_TYPES = ('function', 'location', 'power')
+
+
+def _resolve_ref_code(obj_data: Dict) -> str:
+    """生成参考编码（优先使用传入的 ref_code，否则尝试 asset_code 或 name）"""
+    return obj_data.get('ref_code') or obj_data.get('asset_code', '') or obj_data.get('name', '')
+
+
+def _object_key(obj_data: Dict) -> Tuple[str, str]:
+    """rds_objects 的唯一键 (object_type, ref_code)"""
+    return _determine_object_type(obj_data), _resolve_ref_code(obj_data)
+
+
+def _validate_object(obj_data: Dict) -> Optional[str]:
+    """
+    导入前校验单个对象
+    
+    批量加载无法再依赖 savepoint 定位出错的行，
+    因此在写库前按数据库约束逐项检查。
+    
+    Returns:
+        错误描述，校验通过返回 None
+    """
+    ref_code = _resolve_ref_code(obj_data)
+    if not ref_code:
+        return "缺少参考编码"
+    if len(ref_code) > _MAX_REF_CODE_LENGTH:
+        return f"参考编码超过 {_MAX_REF_CODE_LENGTH} 个字符"
+    if len(obj_data.get('name') or '') > _MAX_NAME_LENGTH:
+        return f"名称超过 {_MAX_NAME_LENGTH} 个字符"
+    if len(obj_data.get('asset_code') or '') > _MAX_MC_CODE_LENGTH:
+        return f"设备编码超过 {_MAX_MC_CODE_LENGTH} 个字符"
+    
+    for aspect in obj_data.get('aspects', []):
+        full_code = aspect.get('full_code') or ''
+        if not full_code:
+            return "方面编码为空"
+        if len(full_code) > _MAX_FULL_CODE_LENGTH:
+            return f"方面编码 '{full_code[:50]}...' 超过 {_MAX_FULL_CODE_LENGTH} 个字符"
+        if aspect.get('aspect_type', 'function') not in _VALID_ASPECT_TYPES:
+            return f"未知的方面类型: {aspect.get('aspect_type')}"
+        if len(aspect.get('prefix') or '') > _MAX_PREFIX_LENGTH:
+            return f"编码前缀无效: {aspect.get('prefix')}"
+        if len(aspect.get('parent_code') or '') > _MAX_FULL_CODE_LENGTH:
+            return f"父级编码超过 {_MAX_FULL_CODE_LENGTH} 个字符"
+        try:
+            int(aspect.get('hierarchy_level', 1))
+        except (TypeError, ValueError):
+            return f"层级深度无效: {aspect.get('hierarchy_level')}"
+    
+    return None
+
+
+def _copy_value(value) -> str:
+    """将单个值转换为 COPY 文本格式"""
+    if value is None:
+        return '\\N'
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace('\t', '\\t')
+        .replace('\n', '\\n')
+        .replace('\r', '\\r')
+    )
+
+
+def _copy_rows(session, table: str, columns: List[str], rows: List[Tuple]) -> None:
+    """使用 COPY FROM STDIN 将行批量写入表（通常是临时表）"""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join(_copy_value(v) for v in row))
+        buffer.write('\n')
+    buffer.seek(0)
+    
+    # COPY 需要直接使用 psycopg2 游标，与当前会话共享同一连接和事务
+    cursor = session.connection().connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer)
+    finally:
+        cursor.close()
+
+
+def _create_stage_table(session, table: str, columns: str) -> None:
+    """创建事务内的临时暂存表；同一事务中分批写入时复用并清空"""
+    session.execute(text(f"CREATE TEMP TABLE IF NOT EXISTS {table} ({columns}) ON COMMIT DROP"))
+    session.execute(text(f"TRUNCATE {table}"))
+
+
+def _bulk_load_objects(session, file_id: int, objects: List[Dict]) -> List[str]:
+    """
+    批量创建 rds_objects 记录
+    
+    同一 (object_type, ref_code) 的多行合并为一次写入，后出现的行覆盖名称等属性，
+    与逐行 upsert 的结果一致（单条 INSERT ... ON CONFLICT 不允许同一行被更新两次）。
+    
+    Returns:
+        与 objects 一一对应的对象 ID 列表
+    """
+    if not objects:
+        return []
+    
+    groups = _group_objects(objects)
+    staged: Dict[Tuple[str, str], Tuple] = {}
+    keys: List[Tuple[str, str]] = []
+    for obj_data in objects:
+        key = _object_key(obj_data)
+        keys.append(key)
+        metadata = json.dumps({
+            'sheet': obj_data.get('sheet', ''),
+            'row_index': obj_data.get('row_index', 0),
+            'original_asset_code': obj_data.get('asset_code', ''),
+            'source': 'excel_import',
+            'row_hash': groups[key].row_hash
+        })
+        # 重新插入以保持最后一次出现的顺序
+        staged.pop(key, None)
+        staged[key] = (
+            key[0],
+            key[1],
+            obj_data.get('name', ''),
+            obj_data.get('asset_code', ''),
+            metadata
+        )
+    
+    _create_stage_table(session, '_stage_rds_objects', """
+        object_type VARCHAR(20),
+        ref_code VARCHAR(255),
+        name VARCHAR(500),
+        mc_code VARCHAR(255),
+        metadata JSONB
+    """)
+    _copy_rows(
+        session,
+        '_stage_rds_objects',
+        ['object_type', 'ref_code', 'name', 'mc_code', 'metadata'],
+        list(staged.values())
+    )
     
     # 使用 upsert 语法处理重复记录
-    insert_query = text("""
+    rows = session.execute(text("""
         INSERT INTO rds_objects (file_id, object_type, ref_code, name, mc_code, metadata)
-        VALUES (:file_id, :object_type, :ref_code, :name, :mc_code, CAST(:metadata AS jsonb))
+        SELECT :file_id, object_type, ref_code, name, mc_code, metadata
+        FROM _stage_rds_objects
         ON CONFLICT (file_id, object_type, ref_code) DO UPDATE SET
             name = EXCLUDED.name,
             mc_code = EXCLUDED.mc_code,
             metadata = EXCLUDED.metadata,
             updated_at = NOW()
-        RETURNING id
-    """)
+        RETURNING id, object_type, ref_code
+    """), {'file_id': file_id}).fetchall()
     
-    import json
-    metadata = json.dumps({
-        'sheet': obj_data.get('sheet', ''),
-        'row_index': obj_data.get('row_index', 0),
-        'original_asset_code': obj_data.get('asset_code', ''),
-        'source': 'excel_import'
-    })
+    id_map = {(row.object_type, row.ref_code): str(row.id) for row in rows}
+    return [id_map[key] for key in keys]
+
+
+@dataclass
+class _ObjectGroup:
+    """同一 (object_type, ref_code) 的所有输入行"""
+    rows: List[Dict] = field(default_factory=list)
+    row_hash: str = ''
+
+
+def _group_objects(objects: List[Dict]) -> Dict[Tuple[str, str], _ObjectGroup]:
+    """按 (object_type, ref_code) 分组并计算每组的内容哈希（保持首次出现顺序）"""
+    groups: Dict[Tuple[str, str], _ObjectGroup] = {}
+    for obj_data in objects:
+        groups.setdefault(_object_key(obj_data), _ObjectGroup()).rows.append(obj_data)
+    for key, group in groups.items():
+        group.row_hash = _row_hash(key, group.rows)
+    return groups
+
+
+def _row_hash(key: Tuple[str, str], rows: List[Dict]) -> str:
+    """
+    对象内容哈希（增量导入用于判断对象是否变化）
     
-    result = session.execute(insert_query, {
-        'file_id': file_id,
-        'object_type': object_type,
-        'ref_code': ref_code,
-        'name': obj_data.get('name', ''),
-        'mc_code': obj_data.get('asset_code', ''),
-        'metadata': metadata
+    与写库结果保持同一口径：名称和设备编码取最后一行，方面编码取所有行的并集。
+    工作表名、行号等位置信息不参与计算。
+    """
+    last = rows[-1]
+    aspects = sorted({
+        (
+            aspect.get('aspect_type', 'function'),
+            aspect.get('full_code', ''),
+            aspect.get('prefix', ''),
+            aspect.get('parent_code', '') or '',
+            int(aspect.get('hierarchy_level', 1))
+        )
+        for obj_data in rows
+        for aspect in obj_data.get('aspects', [])
     })
+    payload = json.dumps(
+        [key[0], key[1], last.get('name', '') or '', last.get('asset_code', '') or '', aspects],
+        ensure_ascii=False
+    )
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def _bulk_load_aspects(session, file_id: int, objects: List[Dict], object_ids: List[str]) -> int:
+    """
+    批量创建 rds_aspects 记录
+    
+    冲突处理不指定约束列：普通表结构的唯一约束为 (object_id, aspect_type, full_code)，
+    分区表结构下为 (file_id, object_id, aspect_type, full_code)。
+    
+    Returns:
+        写入的方面编码行数（与逐行导入的统计口径一致，包含已存在的编码）
+    """
+    rows = []
+    for obj_data, object_id in zip(objects, object_ids):
+        for aspect in obj_data.get('aspects', []):
+            rows.append((
+                object_id,
+                aspect.get('aspect_type', 'function'),
+                aspect.get('full_code', ''),
+                aspect.get('prefix', ''),
+                aspect.get('parent_code', ''),
+                int(aspect.get('hierarchy_level', 1))
+            ))
+    
+    if not rows:
+        return 0
+    
+    _create_stage_table(session, '_stage_rds_aspects', """
+        object_id UUID,
+        aspect_type VARCHAR(20),
+        full_code VARCHAR(512),
+        prefix VARCHAR(5),
+        parent_code VARCHAR(512),
+        hierarchy_level INTEGER
+    """)
+    _copy_rows(
+        session,
+        '_stage_rds_aspects',
+        ['object_id', 'aspect_type', 'full_code', 'prefix', 'parent_code', 'hierarchy_level'],
+        rows
+    )
+    
+    session.execute(text("""
+        INSERT INTO rds_aspects (
+            file_id, object_id, aspect_type, full_code, prefix, 
+            parent_code, hierarchy_level
+        )
+        SELECT :file_id, object_id, aspect_type, full_code, prefix, parent_code, hierarchy_level
+        FROM _stage_rds_aspects
+        ON CONFLICT DO NOTHING
+    """), {'file_id': file_id})
     
-    return result.fetchone()[0]
+    return len(rows)
 
 
 def _determine_object_type(obj_data: Dict) -> str:
@@ -219,33 +1098,9 @@ def _determine_object_type(obj_data: Dict) -> str:
     return 'equipment'  # 默认类型
 
 
-def _create_aspect(session, object_id: int, aspect: Dict) -> None:
-    """创建 rds_aspects 记录"""
-    insert_query = text("""
-        INSERT INTO rds_aspects (
-            object_id, aspect_type, full_code, prefix, 
-            parent_code, hierarchy_level
-        )
-        VALUES (
-            :object_id, :aspect_type, :full_code, :prefix,
-            :parent_code, :hierarchy_level
-        )
-        ON CONFLICT (object_id, aspect_type, full_code) DO NOTHING
-    """)
-    
-    session.execute(insert_query, {
-        'object_id': object_id,
-        'aspect_type': aspect.get('aspect_type', 'function'),
-        'full_code': aspect.get('full_code', ''),
-        'prefix': aspect.get('prefix', ''),
-        'parent_code': aspect.get('parent_code', ''),
-        'hierarchy_level': aspect.get('hierarchy_level', 1)
-    })
-
-
 def _create_power_relations(
     session, 
-    power_code_to_object: Dict[str, int]
+    power_code_to_object: Dict[str, str]
 ) -> int:
     """
     根据电源编码的层级关系创建供电链路
@@ -258,8 +1113,22 @@ def _create_power_relations(
                 └── ===DY1.AH1.H01.ZB1.C1DP1.3.DP4O.1 (终端设备)
     
     上级节点 FEEDS_POWER_TO 下级节点
+    
+    所有父子对在内存中一次计算，然后用一条批量插入写入。
+    
+    Returns:
+        实际新增的关系数量（已存在的关系不计入）
     """
-    relations_created = 0
+    pairs = _power_relation_pairs(power_code_to_object)
+    if not pairs:
+        return 0
+    return _insert_power_relations(session, pairs)
+
+
+def _power_relation_pairs(power_code_to_object: Dict[str, str]) -> List[Tuple[str, str]]:
+    """计算全部 (父对象, 子对象) 供电关系对（去重，保持顺序）"""
+    pairs = []
+    seen = set()
     
     for code, object_id in power_code_to_object.items():
         # 找父级编码对应的对象
@@ -271,24 +1140,31 @@ def _create_power_relations(
             if parent_object_id == object_id:
                 continue
             
-            # 创建供电关系：父级 -> 当前
-            insert_query = text("""
-                INSERT INTO rds_relations (
-                    source_obj_id, target_obj_id, relation_type
-                )
-                VALUES (
-                    :source_id, :target_id, 'FEEDS_POWER_TO'
-                )
-                ON CONFLICT (source_obj_id, target_obj_id, relation_type) DO NOTHING
-            """)
-            
-            session.execute(insert_query, {
-                'source_id': parent_object_id,
-                'target_id': object_id
-            })
-            relations_created += 1
+            # 供电关系：父级 -> 当前
+            pair = (parent_object_id, object_id)
+            if pair not in seen:
+                seen.add(pair)
+                pairs.append(pair)
+    
+    return pairs
+
+
+def _insert_power_relations(session, pairs: List[Tuple[str, str]]) -> int:
+    """一条语句批量写入 FEEDS_POWER_TO 关系，返回实际新增数量"""
+    inserted = session.execute(text("""
+        INSERT INTO rds_relations (
+            source_obj_id, target_obj_id, relation_type
+        )
+        SELECT p.source_id, p.target_id, 'FEEDS_POWER_TO'
+        FROM unnest(CAST(:source_ids AS uuid[]), CAST(:target_ids AS uuid[])) AS p(source_id, target_id)
+        ON CONFLICT (source_obj_id, target_obj_id, relation_type) DO NOTHING
+        RETURNING id
+    """), {
+        'source_ids': [str(source_id) for source_id, _ in pairs],
+        'target_ids': [str(target_id) for _, target_id in pairs]
+    }).fetchall()
     
-    return relations_created
+    return len(inserted)
 
 
 def _get_parent_power_code(code: str) -> Optional[str]:
@@ -323,6 +1199,8 @@ def clear_file_rds_data(file_id: int) -> Dict:
     """
     清除指定文件的所有 RDS 数据（用于重新导入）
     
+    分区表结构下直接删除该文件的分区；普通表结构下逐表 DELETE。
+    
     Args:
         file_id: 模型文件 ID
         
@@ -331,43 +1209,14 @@ def clear_file_rds_data(file_id: int) -> Dict:
     """
     try:
         with SessionLocal() as session:
-            # 先删除关系
-            relations_deleted = session.execute(text("""
-                DELETE FROM rds_relations 
-                WHERE source_obj_id IN (SELECT id FROM rds_objects WHERE file_id = :file_id)
-                   OR target_obj_id IN (SELECT id FROM rds_objects WHERE file_id = :file_id)
-            """), {'file_id': file_id}).rowcount
-            
-            # 删除方面
-            aspects_deleted = session.execute(text("""
-                DELETE FROM rds_aspects 
-                WHERE object_id IN (SELECT id FROM rds_objects WHERE file_id = :file_id)
-            """), {'file_id': file_id}).rowcount
-            
-            # 删除对象
-            objects_deleted = session.execute(text("""
-                DELETE FROM rds_objects WHERE file_id = :file_id
-            """), {'file_id': file_id}).rowcount
-            
-            # 新增：删除电源图边（先删边，因为有外键约束）
-            power_edges_deleted = session.execute(text("""
-                DELETE FROM rds_power_edges WHERE file_id = :file_id
-            """), {'file_id': file_id}).rowcount
-            
-            # 新增：删除电源图节点
-            power_nodes_deleted = session.execute(text("""
-                DELETE FROM rds_power_nodes WHERE file_id = :file_id
-            """), {'file_id': file_id}).rowcount
-            
+            deleted = _delete_file_rds_data(session, file_id)
             session.commit()
             
+            graph_cache.invalidate(file_id)
+            
             return {
                 'success': True,
-                'objects_deleted': objects_deleted,
-                'aspects_deleted': aspects_deleted,
-                'relations_deleted': relations_deleted,
-                'power_nodes_deleted': power_nodes_deleted,
-                'power_edges_deleted': power_edges_deleted
+                **deleted
             }
     except Exception as e:
         return {
@@ -376,6 +1225,55 @@ def clear_file_rds_data(file_id: int) -> Dict:
         }
 
 
+def _delete_file_rds_data(session, file_id: int) -> Dict[str, int]:
+    """在当前事务中删除文件的 RDS 数据（不提交）"""
+    # 先删除关系（rds_relations 不分区，分区表结构下也没有指向 rds_objects 的外键）
+    relations_deleted = session.execute(text("""
+        DELETE FROM rds_relations 
+        WHERE source_obj_id IN (SELECT id FROM rds_objects WHERE file_id = :file_id)
+           OR target_obj_id IN (SELECT id FROM rds_objects WHERE file_id = :file_id)
+    """), {'file_id': file_id}).rowcount
+    
+    if is_partitioned(session):
+        dropped = drop_file_partitions(session, file_id)
+        return {
+            'objects_deleted': dropped['rds_objects'],
+            'aspects_deleted': dropped['rds_aspects'],
+            'relations_deleted': relations_deleted,
+            'power_nodes_deleted': dropped['rds_power_nodes'],
+            'power_edges_deleted': dropped['rds_power_edges']
+        }
+    
+    # 删除方面
+    aspects_deleted = session.execute(text("""
+        DELETE FROM rds_aspects 
+        WHERE object_id IN (SELECT id FROM rds_objects WHERE file_id = :file_id)
+    """), {'file_id': file_id}).rowcount
+    
+    # 删除对象
+    objects_deleted = session.execute(text("""
+        DELETE FROM rds_objects WHERE file_id = :file_id
+    """), {'file_id': file_id}).rowcount
+    
+    # 删除电源图边（先删边，因为有外键约束）
+    power_edges_deleted = session.execute(text("""
+        DELETE FROM rds_power_edges WHERE file_id = :file_id
+    """), {'file_id': file_id}).rowcount
+    
+    # 删除电源图节点
+    power_nodes_deleted = session.execute(text("""
+        DELETE FROM rds_power_nodes WHERE file_id = :file_id
+    """), {'file_id': file_id}).rowcount
+    
+    return {
+        'objects_deleted': objects_deleted,
+        'aspects_deleted': aspects_deleted,
+        'relations_deleted': relations_deleted,
+        'power_nodes_deleted': power_nodes_deleted,
+        'power_edges_deleted': power_edges_deleted
+    }
+
+
 def _create_power_graph_data(
     session,
     file_id: int,
@@ -385,8 +1283,8 @@ def _create_power_graph_data(
     """
     将电源编码数据导入到 rds_power_nodes 和 rds_power_edges 表
     
-    支持双电源设备：同一 asset_code 的设备只创建一个节点，
-    但会从多个不同的电源路径创建边指向它。
+    先在内存中计算完整的节点与边集合（见 services.power_graph_builder），
+    再用三条批量 upsert 写入：层级节点、设备节点、边。
     
     Args:
         session: 数据库会话
@@ -395,343 +1293,103 @@ def _create_power_graph_data(
         object_id_map: 资产编码到 rds_objects.id 的映射
         
     Returns:
-        统计 {'nodes_created': N, 'edges_created': M}
-    """
-    import uuid
-    
-    nodes_created = 0
-    edges_created = 0
-    
-    # 用于追踪已创建的节点 (full_code -> node_id) - 用于层级节点
-    created_nodes: Dict[str, str] = {}
-    
-    # 用于追踪设备节点 (asset_code -> node_id) - 用于末端设备节点去重
-    device_nodes: Dict[str, str] = {}
-    
-    # 追踪逻辑节点到实体引用节点的映射 (logic_code -> entity_node_id)
-    # 例如：===...1.1 -> 5#雨水泵按钮箱 GK5 的设备节点 ID
-    # 这样当 ===...1.1.1 需要连接到父节点时，会优先连接到实体引用节点
-    entity_reference_map: Dict[str, str] = {}
-    
-    # 收集所有需要创建的设备边 (parent_node_id, device_node_id, relation_type)
-    device_edges_to_create: List[tuple] = []
-    
-    # ========== 预处理：对电源编码排序 ==========
-    # 
-    # 同一个 asset_code 可能有多个电源编码（如逻辑节点和实体引用）。
-    # 确保逻辑节点（无末尾点）在实体引用（有末尾点）之前处理，
-    # 这样当处理实体引用时，它的父逻辑节点已经存在。
-    #
-    # 排序规则：
-    # 1. 按编码长度升序（层级浅的优先）
-    # 2. 无末尾点的优先于有末尾点的（逻辑节点优先于实体引用）
-    #
-    def sort_key(aspect):
-        code = aspect.get('full_code', '')
-        has_dot = code.endswith('.')
-        return (len(code), has_dot)
-    
-    sorted_power_aspects = sorted(power_aspects, key=sort_key)
-    
-    for aspect in sorted_power_aspects:
-        full_code = aspect.get('full_code', '')
-        if not full_code or not full_code.startswith('==='):
-            continue
-        
-        asset_code = aspect.get('asset_code', '')
-        device_name = aspect.get('name', '')
-        
-        # 解析层级：===DY1.AH1.H01 -> ['DY1', 'AH1', 'H01']
-        # 
-        # 末尾点号的语义 (IEC 81346-12):
-        # - 不带末尾点 (===DY2...DP9O.1.1) = 逻辑节点，仅存在于电源功能维度
-        # - 带末尾点 (===DY2...DP9O.1.1.) = 实体对象，引用上述逻辑节点
-        # 
-        # 因此：===DY2...DP9O.1.1. 的父节点是 ===DY2...DP9O.1.1
-        #
-        prefix = '==='
-        body = full_code[len(prefix):]
-        
-        # 检测是否有末尾点号 (表示实体引用)
-        has_trailing_dot = body.endswith('.')
-        if has_trailing_dot:
-            body_without_dot = body[:-1]
-        else:
-            body_without_dot = body
-        
-        parts = [p for p in body_without_dot.split('.') if p]
-        
-        if not parts:
-            continue
-        
-        # ========== 阶段 1: 创建层级路径上的所有逻辑节点 ==========
-        # 
-        # 首先创建整个层级路径上的逻辑节点 (不带末尾点)
-        # 例如：===DY1, ===DY1.AH1, ===DY1.AH1.H01 ...
-        #
-        current_full_code = prefix
-        parent_node_id = None
-        last_hierarchy_node_id = None  # 最后一个层级节点 (设备的直接父节点)
-        
-        # 判断是否需要单独创建设备节点 (有 asset_code 的才创建独立设备节点)
-        create_separate_device = bool(asset_code)
-        
-        for i, part in enumerate(parts):
-            level = i + 1
-            is_last_part = (i == len(parts) - 1)
-            
-            if i == 0:
-                current_full_code = prefix + part
-            else:
-                current_full_code = current_full_code + '.' + part
-            
-            # 如果是最后一段且有 asset_code，这是一个设备节点，稍后单独处理
-            # 但如果有末尾点号，需要先创建逻辑父节点
-            if is_last_part and create_separate_device and not has_trailing_dot:
-                last_hierarchy_node_id = parent_node_id
-                break
-            
-            # 检查层级节点是否已存在
-            if current_full_code in created_nodes:
-                existing_node_id = created_nodes[current_full_code]
-                
-                # 即使节点已存在，也需要确保与父节点之间的边存在
-                # 这修复了当不同层级深度的编码处理时，中间层级边被跳过的问题
-                if parent_node_id:
-                    # 计算父编码
-                    parent_code_for_edge = None
-                    if i > 0:
-                        parent_code_for_edge = prefix + '.'.join(parts[:i])
-                    
-                    # 检查是否需要连接到实体引用节点
-                    if parent_code_for_edge and parent_code_for_edge in entity_reference_map:
-                        actual_parent_for_edge = entity_reference_map[parent_code_for_edge]
-                    else:
-                        actual_parent_for_edge = parent_node_id
-                    
-                    # 创建边（如果不存在）
-                    edge_id = str(uuid.uuid5(uuid.NAMESPACE_DNS, f"POWER_EDGE_{actual_parent_for_edge}_{existing_node_id}_hierarchy"))
-                    insert_edge = text("""
-                        INSERT INTO rds_power_edges (
-                            id, file_id, source_node_id, target_node_id, relation_type
-                        )
-                        VALUES (
-                            :id, :file_id, :source_id, :target_id, 'hierarchy'
-                        )
-                        ON CONFLICT (source_node_id, target_node_id, relation_type) DO NOTHING
-                    """)
-                    session.execute(insert_edge, {
-                        'id': edge_id,
-                        'file_id': file_id,
-                        'source_id': actual_parent_for_edge,
-                        'target_id': existing_node_id
-                    })
-                
-                # 更新 parent_node_id 为当前节点，供下一层使用
-                parent_node_id = existing_node_id
-                
-                # 更新 last_hierarchy_node_id（用于后续设备节点连接）
-                if is_last_part:
-                    last_hierarchy_node_id = existing_node_id
-                    
-                # 如果是最后一段且有名称，尝试更新这个已存在节点的 label
-                if is_last_part and device_name and not device_name.strip().startswith('='):
-                    update_label = text("""
-                        UPDATE rds_power_nodes 
-                        SET label = :label 
-                        WHERE file_id = :file_id AND full_code = :full_code 
-                        AND (label = short_code OR label IS NULL OR label = '')
-                    """)
-                    session.execute(update_label, {
-                        'label': device_name,
-                        'file_id': file_id,
-                        'full_code': current_full_code
-                    })
-                continue
-            
-            # 生成确定性 UUID (基于 full_code)
-            node_id = str(uuid.uuid5(uuid.NAMESPACE_DNS, f"POWER_NODE_{file_id}_{current_full_code}"))
-            
-            # 确定节点类型 (基于编码规则增强)
-            # 默认：层级1为Source，其他默认为Feeder或Device
-            # 规则：
-            # - Source: 包含 DY (变压器), TE (变压器)
-            # - Bus: 包含 AH (高压柜), W (母线), GP (柜/盘)
-            # - Feeder: 包含 QF (断路器), QS (隔离开关), FU (熔断器)
-            # - Device: 末端且不符合上述规则
-            
-            upper_part = part.upper()
-            upper_full = current_full_code.upper()
-            
-            if 'DY' in upper_part or 'TE' in upper_part or level == 1:
-                node_type = 'source'
-            elif 'AH' in upper_part or 'W' in upper_part or 'GP' in upper_part:
-                node_type = 'bus'
-            elif 'QF' in upper_part or 'QS' in upper_part or 'FU' in upper_part:
-                node_type = 'feeder'
-            elif is_last_part:
-                node_type = 'device'
-            else:
-                node_type = 'feeder' # 中间节点默认为 feeder/bus 类
-            
-            # 对于末端节点，使用名称作为 label；中间节点使用短码
-            if is_last_part and device_name and not device_name.strip().startswith('='):
-                label = device_name
-            else:
-                label = part
-            
-            # 父级编码
-            parent_code = None
-            if i > 0:
-                parent_code = prefix + '.'.join(parts[:i])
-            
-            # 插入层级节点
-            insert_node = text("""
-                INSERT INTO rds_power_nodes (
-                    id, file_id, object_id, full_code, short_code, parent_code, label, level, node_type
-                )
-                VALUES (
-                    :id, :file_id, NULL, :full_code, :short_code, :parent_code, :label, :level, :node_type
-                )
-                ON CONFLICT (file_id, full_code) DO UPDATE SET
-                    label = CASE 
-                        WHEN EXCLUDED.label != EXCLUDED.short_code THEN EXCLUDED.label 
-                        ELSE rds_power_nodes.label 
-                    END,
-                    node_type = EXCLUDED.node_type
-            """)
-            
-            session.execute(insert_node, {
-                'id': node_id,
-                'file_id': file_id,
-                'full_code': current_full_code,
-                'short_code': part,
-                'parent_code': parent_code,
-                'label': label,
-                'level': level,
-                'node_type': node_type
-            })
-            nodes_created += 1
-            created_nodes[current_full_code] = node_id
-            
-            # 创建层级边
-            # 关键逻辑：如果父节点有对应的实体引用节点，优先连接到实体引用节点
-            # 例如：===...1.1.1 应该从 ===...1.1. 的实体设备供电，而不是从 ===...1.1 的逻辑节点
-            if parent_node_id:
-                # 检查父节点对应的逻辑编码是否有实体引用
-                if parent_code and parent_code in entity_reference_map:
-                    actual_parent_id = entity_reference_map[parent_code]
-                else:
-                    actual_parent_id = parent_node_id
-                
-                edge_id = str(uuid.uuid5(uuid.NAMESPACE_DNS, f"POWER_EDGE_{actual_parent_id}_{node_id}_hierarchy"))
-                insert_edge = text("""
-                    INSERT INTO rds_power_edges (
-                        id, file_id, source_node_id, target_node_id, relation_type
-                    )
-                    VALUES (
-                        :id, :file_id, :source_id, :target_id, 'hierarchy'
-                    )
-                    ON CONFLICT (source_node_id, target_node_id, relation_type) DO NOTHING
-                """)
-                session.execute(insert_edge, {
-                    'id': edge_id,
-                    'file_id': file_id,
-                    'source_id': actual_parent_id,
-                    'target_id': node_id
-                })
-                edges_created += 1
-            
-            parent_node_id = node_id
-            last_hierarchy_node_id = node_id
-        
-        # ========== 特殊处理：末尾点号的实体引用 ==========
-        # 
-        # 如果编码有末尾点号 (如 ===DY2...DP9O.1.1.)，表示这是一个实体对象，
-        # 它引用了逻辑节点 (===DY2...DP9O.1.1)。
-        # 此时 last_hierarchy_node_id 应该是完整逻辑路径的最后一个节点。
-        #
-        if has_trailing_dot and last_hierarchy_node_id is None:
-            # 如果循环结束后 last_hierarchy_node_id 仍为 None，
-            # 说明所有层级节点都已创建，最后一个就是父节点
-            last_hierarchy_node_id = parent_node_id
-        
-        # ========== 阶段 2: 创建设备节点（基于 asset_code 去重） ==========
-        if asset_code:
-            # 检查设备节点是否已存在
-            if asset_code not in device_nodes:
-                # 基于 asset_code 生成确定性 UUID
-                device_node_id = str(uuid.uuid5(uuid.NAMESPACE_DNS, f"POWER_DEVICE_{file_id}_{asset_code}"))
-                
-                # 设备标签优先使用名称
-                device_label = device_name if device_name and not device_name.strip().startswith('=') else asset_code
-                
-                # 获取关联的 object_id
-                object_id = object_id_map.get(asset_code)
-                
-                # 插入设备节点 (full_code 使用 asset_code 作为标识)
-                insert_device = text("""
-                    INSERT INTO rds_power_nodes (
-                        id, file_id, object_id, full_code, short_code, parent_code, label, level, node_type
-                    )
-                    VALUES (
-                        :id, :file_id, :object_id, :full_code, :short_code, NULL, :label, 99, 'device'
-                    )
-                    ON CONFLICT (file_id, full_code) DO UPDATE SET
-                        label = CASE 
-                            WHEN EXCLUDED.label != EXCLUDED.short_code THEN EXCLUDED.label 
-                            ELSE rds_power_nodes.label 
-                        END,
-                        object_id = COALESCE(EXCLUDED.object_id, rds_power_nodes.object_id)
-                """)
-                
-                session.execute(insert_device, {
-                    'id': device_node_id,
-                    'file_id': file_id,
-                    'object_id': object_id,
-                    'full_code': f"DEVICE:{asset_code}",  # 使用特殊前缀区分设备节点
-                    'short_code': asset_code,
-                    'label': device_label
-                })
-                nodes_created += 1
-                device_nodes[asset_code] = device_node_id
-                
-                # 如果这是一个实体引用（有末尾点），注册到 entity_reference_map
-                # 这样后续层级节点（如 ===...1.1.1）会连接到这个实体设备而不是逻辑节点
-                if has_trailing_dot:
-                    # 逻辑编码 = 当前编码去掉末尾点
-                    logic_code = prefix + body_without_dot
-                    entity_reference_map[logic_code] = device_node_id
-            else:
-                device_node_id = device_nodes[asset_code]
-            
-            # 记录需要创建的边 (从父馈线柜到设备)
-            if last_hierarchy_node_id:
-                device_edges_to_create.append((last_hierarchy_node_id, device_node_id, 'power_supply'))
-    
-    # ========== 阶段 3: 创建设备边（支持多电源） ==========
-    for source_id, target_id, rel_type in device_edges_to_create:
-        edge_id = str(uuid.uuid5(uuid.NAMESPACE_DNS, f"POWER_EDGE_{source_id}_{target_id}_{rel_type}"))
-        insert_edge = text("""
+        统计 {'nodes_created': N, 'edges_created': M}，取自计算出的电源图（去重后的节点与边数量），
+        包含重复导入时已存在、仅被更新或跳过的记录，不再是实际新插入的行数
+    """
+    plan = build_power_graph(file_id, power_aspects, object_id_map)
+    return _write_power_graph(session, file_id, plan)
+
+
+def _write_power_graph(session, file_id: int, plan: PowerGraphPlan) -> Dict[str, int]:
+    """
+    批量写入电源图（每类记录一次往返）
+
+    返回的统计来自 plan 而非数据库的受影响行数：upsert 不区分新插入与已存在的记录。
+    """
+    ensure_file_partitions(session, file_id)
+    
+    hierarchy_nodes = [n for n in plan.nodes.values() if not n.is_device]
+    device_nodes = [n for n in plan.nodes.values() if n.is_device]
+    
+    # 层级节点：重复导入时名称优先于短码，节点类型以本次计算为准
+    if hierarchy_nodes:
+        session.execute(text("""
+            INSERT INTO rds_power_nodes (
+                id, file_id, object_id, full_code, short_code, parent_code, label, level, node_type
+            )
+            SELECT n.id, :file_id, NULL, n.full_code, n.short_code, n.parent_code, n.label, n.level, n.node_type
+            FROM unnest(
+                CAST(:ids AS uuid[]), CAST(:full_codes AS varchar[]), CAST(:short_codes AS varchar[]),
+                CAST(:parent_codes AS varchar[]), CAST(:labels AS varchar[]), CAST(:levels AS integer[]),
+                CAST(:node_types AS varchar[])
+            ) AS n(id, full_code, short_code, parent_code, label, level, node_type)
+            ON CONFLICT (file_id, full_code) DO UPDATE SET
+                label = CASE 
+                    WHEN EXCLUDED.label != EXCLUDED.short_code THEN EXCLUDED.label 
+                    ELSE rds_power_nodes.label 
+                END,
+                node_type = EXCLUDED.node_type
+        """), {
+            'file_id': file_id,
+            'ids': [n.id for n in hierarchy_nodes],
+            'full_codes': [n.full_code for n in hierarchy_nodes],
+            'short_codes': [n.short_code for n in hierarchy_nodes],
+            'parent_codes': [n.parent_code for n in hierarchy_nodes],
+            'labels': [n.label for n in hierarchy_nodes],
+            'levels': [n.level for n in hierarchy_nodes],
+            'node_types': [n.node_type for n in hierarchy_nodes]
+        })
+    
+    # 设备节点 (full_code 使用 DEVICE: 前缀区分)：保留已有的 object_id 关联
+    if device_nodes:
+        session.execute(text("""
+            INSERT INTO rds_power_nodes (
+                id, file_id, object_id, full_code, short_code, parent_code, label, level, node_type
+            )
+            SELECT n.id, :file_id, n.object_id, n.full_code, n.short_code, NULL, n.label, :level, 'device'
+            FROM unnest(
+                CAST(:ids AS uuid[]), CAST(:object_ids AS uuid[]), CAST(:full_codes AS varchar[]),
+                CAST(:short_codes AS varchar[]), CAST(:labels AS varchar[])
+            ) AS n(id, object_id, full_code, short_code, label)
+            ON CONFLICT (file_id, full_code) DO UPDATE SET
+                label = CASE 
+                    WHEN EXCLUDED.label != EXCLUDED.short_code THEN EXCLUDED.label 
+                    ELSE rds_power_nodes.label 
+                END,
+                object_id = COALESCE(EXCLUDED.object_id, rds_power_nodes.object_id)
+        """), {
+            'file_id': file_id,
+            'level': DEVICE_LEVEL,
+            'ids': [n.id for n in device_nodes],
+            'object_ids': [n.object_id for n in device_nodes],
+            'full_codes': [n.full_code for n in device_nodes],
+            'short_codes': [n.short_code for n in device_nodes],
+            'labels': [n.label for n in device_nodes]
+        })
+    
+    # 边：层级边 + 设备边（支持多电源）
+    # 冲突处理不指定约束列，兼容普通表与分区表两种唯一约束
+    if plan.edges:
+        keys = list(plan.edges.keys())
+        session.execute(text("""
             INSERT INTO rds_power_edges (
                 id, file_id, source_node_id, target_node_id, relation_type
             )
-            VALUES (
-                :id, :file_id, :source_id, :target_id, :rel_type
-            )
-            ON CONFLICT (source_node_id, target_node_id, relation_type) DO NOTHING
-        """)
-        session.execute(insert_edge, {
-            'id': edge_id,
+            SELECT e.id, :file_id, e.source_id, e.target_id, e.relation_type
+            FROM unnest(
+                CAST(:ids AS uuid[]), CAST(:source_ids AS uuid[]), CAST(:target_ids AS uuid[]),
+                CAST(:relation_types AS varchar[])
+            ) AS e(id, source_id, target_id, relation_type)
+            ON CONFLICT DO NOTHING
+        """), {
             'file_id': file_id,
-            'source_id': source_id,
-            'target_id': target_id,
-            'rel_type': rel_type
+            'ids': list(plan.edges.values()),
+            'source_ids': [k[0] for k in keys],
+            'target_ids': [k[1] for k in keys],
+            'relation_types': [k[2] for k in keys]
         })
-        edges_created += 1
     
     return {
-        'nodes_created': nodes_created,
-        'edges_created': edges_created
+        'nodes_created': len(plan.nodes),
+        'edges_created': len(plan.edges)
     }
-
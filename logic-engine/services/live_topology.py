@@ -0,0 +1,262 @@
+"""
+开关状态感知的实时拓扑
+
+在缓存的电源图之上，为每个文件在内存中维护：
+- 断开的边（开关 / 断路器状态），初始值来自 rds_power_edges.properties 中的 switch_state
+- 带电节点集合：从电源根节点沿闭合边可达的节点
+
+开关变位通过批量接口写入，带电状态增量更新：
+- 断开：只在断开边下游仍闭合连通的带电区域内重新判定，区域外的节点不受影响
+- 闭合：从新闭合边的带电上游出发，只遍历新获得供电的节点
+
+开关状态只保存在内存中。图缓存失效（重新导入）后按边的 (源节点 ID, 目标节点 ID, 类型)
+把当前开关状态迁移到新图，并重新计算带电状态。
+"""
+
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+
+from services.graph_cache import POWER_EDGE_TYPES, POWER_SOURCE, TopologyGraph, graph_cache
+from services.power_analysis import supply_roots
+
+
+# properties 中表示开关状态的键与断开状态取值
+SWITCH_STATE_KEY = 'switch_state'
+OPEN_STATE = 'open'
+CLOSED_STATE = 'closed'
+SWITCH_STATES = (OPEN_STATE, CLOSED_STATE)
+_OPEN_VALUES = {'open', 'off', 'opened', '分', '分闸'}
+
+# 边键：下游方向的 (源节点编号, 目标节点编号, 类型编号)
+EdgeKey = Tuple[int, int, int]
+
+
+@dataclass
+class SwitchUpdate:
+    """单个开关变位"""
+    state: str
+    edge_id: Optional[str] = None
+    source: Optional[str] = None            # 源节点键（节点 ID、对象 ID、MC 编码或 full_code）
+    target: Optional[str] = None            # 目标节点键
+    relation_type: Optional[str] = None     # 按端点定位时限定边类型，不传表示两点间全部边
+
+
+@dataclass
+class SwitchResult:
+    """一批开关变位的结果"""
+    applied: int = 0
+    unchanged: int = 0
+    unresolved: List[str] = field(default_factory=list)
+    energized: List[int] = field(default_factory=list)      # 新获得供电的节点
+    deenergized: List[int] = field(default_factory=list)    # 失去供电的节点
+
+
+class LiveTopology:
+    """单个文件的实时拓扑状态（线程安全）"""
+
+    def __init__(self, graph: TopologyGraph, edge_keys: Dict[str, EdgeKey], open_edges: set):
+        self.graph = graph
+        self.edge_keys = edge_keys
+        self.open_edges = open_edges
+        self.lock = threading.Lock()
+        self.type_codes = graph.type_codes(POWER_EDGE_TYPES)
+        self.roots = supply_roots(graph, self.type_codes)
+        self.energized = bytearray(len(graph.node_ids))
+        self._energize(self.roots)
+
+    def is_energized(self, node: int) -> bool:
+        return bool(self.energized[node])
+
+    def blocked_edges(self) -> set:
+        """当前断开的边的快照，作为追溯的 blocked 参数（跳过断开的开关）"""
+        with self.lock:
+            return set(self.open_edges)
+
+    def edges_between(self, source: int, target: int, relation_type: Optional[str] = None) -> List[EdgeKey]:
+        """两个节点之间的下游方向边"""
+        graph = self.graph
+        type_codes = graph.type_codes(relation_type) if relation_type else self.type_codes
+        return [
+            (source, target, graph.down_types[pos])
+            for pos in range(graph.down_offsets[source], graph.down_offsets[source + 1])
+            if graph.down_targets[pos] == target and graph.down_types[pos] in type_codes
+        ]
+
+    def apply(self, updates: Sequence[SwitchUpdate]) -> SwitchResult:
+        """批量应用开关变位，并增量更新带电节点"""
+        result = SwitchResult()
+        opened: List[EdgeKey] = []
+        closed: List[EdgeKey] = []
+
+        with self.lock:
+            for update in updates:
+                keys = self._resolve(update)
+                if not keys:
+                    result.unresolved.append(update.edge_id or f"{update.source}->{update.target}")
+                    continue
+                for key in keys:
+                    is_open = key in self.open_edges
+                    if update.state == OPEN_STATE and not is_open:
+                        self.open_edges.add(key)
+                        opened.append(key)
+                    elif update.state == CLOSED_STATE and is_open:
+                        self.open_edges.discard(key)
+                        closed.append(key)
+                    else:
+                        result.unchanged += 1
+            result.applied = len(opened) + len(closed)
+
+            # 同一批内先断开后闭合的边不影响结果，按最终状态处理
+            opened = [key for key in opened if key in self.open_edges]
+            closed = [key for key in closed if key not in self.open_edges]
+            region, restored = self._deenergize([target for _, target, _ in opened])
+            gained = restored - region
+            gained.update(self._energize([target for source, target, _ in closed if self.energized[source]]))
+
+            # 同一批中先失电后又恢复供电的节点不出现在结果中
+            lost = region - restored
+            result.deenergized = sorted(lost - gained)
+            result.energized = sorted(gained - lost)
+        return result
+
+    def _resolve(self, update: SwitchUpdate) -> List[EdgeKey]:
+        if update.edge_id:
+            key = self.edge_keys.get(update.edge_id)
+            return [key] if key is not None else []
+        if update.source is None or update.target is None:
+            return []
+        source = self.graph.resolve(update.source)
+        target = self.graph.resolve(update.target)
+        if source is None or target is None:
+            return []
+        return self.edges_between(source, target, update.relation_type)
+
+    def _closed_children(self, node: int):
+        return self.graph.neighbors(node, 'downstream', self.type_codes, self.open_edges)
+
+    def _energize(self, starts: Sequence[int]) -> List[int]:
+        """从起点沿闭合边标记新获得供电的节点"""
+        energized = self.energized
+        changed = []
+        stack = []
+        for start in starts:
+            if not energized[start]:
+                energized[start] = 1
+                changed.append(start)
+                stack.append(start)
+        while stack:
+            node = stack.pop()
+            for child in self._closed_children(node):
+                if not energized[child]:
+                    energized[child] = 1
+                    changed.append(child)
+                    stack.append(child)
+        return changed
+
+    def _deenergize(self, heads: Sequence[int]) -> Tuple[set, set]:
+        """
+        断开边后重新判定下游带电区域
+
+        候选区域为断开边下游沿闭合边可达的带电节点；区域外的带电节点不经过这些断开边供电，
+        状态不变。区域内仍由电源根节点或区域外带电节点经闭合边供电的节点重新标记为带电。
+
+        Returns:
+            (候选区域, 重新标记为带电的节点)，后者可能包含经同批新闭合边供电的区域外节点
+        """
+        energized = self.energized
+        region = set()
+        stack = [head for head in heads if energized[head]]
+        region.update(stack)
+        while stack:
+            node = stack.pop()
+            for child in self._closed_children(node):
+                if energized[child] and child not in region:
+                    region.add(child)
+                    stack.append(child)
+        if not region:
+            return region, set()
+
+        root_set = set(self.roots)
+        for node in region:
+            energized[node] = 0
+        seeds = [
+            node for node in region
+            if node in root_set or any(
+                energized[parent]
+                for parent in self.graph.neighbors(node, 'upstream', self.type_codes, self.open_edges)
+            )
+        ]
+        return region, set(self._energize(seeds))
+
+
+def load_switch_states(session, graph: TopologyGraph) -> Tuple[Dict[str, EdgeKey], set]:
+    """读取电源图边的 ID 与初始开关状态"""
+    rows = session.execute(text("""
+        SELECT id, source_node_id, target_node_id, relation_type,
+               properties ->> :key AS switch_state
+        FROM rds_power_edges
+        WHERE file_id = :file_id
+    """), {'file_id': graph.file_id, 'key': SWITCH_STATE_KEY}).fetchall()
+
+    edge_keys: Dict[str, EdgeKey] = {}
+    open_edges = set()
+    for row in rows:
+        source = graph.index.get(str(row.source_node_id))
+        target = graph.index.get(str(row.target_node_id))
+        type_code = graph.type_code(row.relation_type)
+        if source is None or target is None or type_code is None:
+            continue
+        key = (source, target, type_code)
+        edge_keys[str(row.id)] = key
+        if row.switch_state and row.switch_state.strip().lower() in _OPEN_VALUES:
+            open_edges.add(key)
+    return edge_keys, open_edges
+
+
+def _edge_identity(graph: TopologyGraph, key: EdgeKey) -> Tuple[str, str, str]:
+    source, target, type_code = key
+    return graph.node_ids[source], graph.node_ids[target], graph.relation_types[type_code]
+
+
+class LiveTopologyManager:
+    """按文件管理实时拓扑状态，图版本变化时迁移开关状态"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._states: Dict[int, LiveTopology] = {}
+
+    def get(self, session, file_id: int) -> LiveTopology:
+        graph = graph_cache.get_graph(session, file_id, POWER_SOURCE)
+        with self._lock:
+            live = self._states.get(file_id)
+            if live is not None and live.graph is graph:
+                return live
+
+            edge_keys, open_edges = load_switch_states(session, graph)
+            if live is not None:
+                # 重新导入后按边的端点与类型迁移内存中的开关状态
+                with live.lock:
+                    previous = {_edge_identity(live.graph, key) for key in live.open_edges}
+                    known = {_edge_identity(live.graph, key) for key in live.edge_keys.values()}
+                for key in edge_keys.values():
+                    identity = _edge_identity(graph, key)
+                    if identity in previous:
+                        open_edges.add(key)
+                    elif identity in known:
+                        open_edges.discard(key)
+
+            live = LiveTopology(graph, edge_keys, open_edges)
+            self._states[file_id] = live
+            return live
+
+    def reset(self, file_id: int) -> bool:
+        """丢弃文件的内存开关状态，下次访问时从 properties 重新加载"""
+        with self._lock:
+            return self._states.pop(file_id, None) is not None
+
+
+# 进程内共享的实时拓扑状态
+live_topology = LiveTopologyManager()
@@ -0,0 +1,651 @@
+"""
+电源图分析索引
+
+在缓存的电源图 (services/graph_cache.py) 上一次性计算只读分析索引，通过
+TopologyGraph.derived 按图版本缓存：导入使图缓存失效后，下次查询随新图重新计算。
+
+- 支配树：X 的必经上游节点、Y 故障后失电的节点
+- 下游影响：每个节点下游可达的设备数（及可选的属性合计），用于关键节点排名
+- 可达性索引：生成森林先序区间标注，O(log k) 判断 A 是否为 B 的上游
+- 最近公共上游：支配树上的倍增 LCA，求一组节点最近的共同必经上游
+- N-1 故障扫描：全部单节点故障的失电设备，以支配树区间形式紧凑存储
+
+电源侧为图中没有入边的节点（变压器等根节点），分析时用一个虚拟总电源连接全部根节点。
+hierarchy / power_supply / backup 边都视为可供电路径，因此有备用电源的设备不依赖单一上游。
+"""
+
+import re
+import threading
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import text
+
+from services.graph_cache import POWER_EDGE_TYPES, TopologyGraph
+
+
+def supply_roots(graph: TopologyGraph, type_codes) -> List[int]:
+    """没有入边的节点（电源侧根节点）"""
+    return [
+        node for node in range(len(graph.node_ids))
+        if next(graph.neighbors(node, 'upstream', type_codes), None) is None
+    ]
+
+
+# ==================== 支配树 ====================
+
+@dataclass
+class DominatorTree:
+    """
+    电源图的支配树（根为连接全部电源根节点的虚拟总电源）
+
+    节点 Y 支配节点 X 表示从任何电源到 X 的每条路径都经过 Y，即 Y 故障时 X 失电。
+    """
+    idom: array     # 节点 -> 直接支配节点，-1 表示只依赖虚拟总电源或不可达
+    depth: array    # 节点在支配树中的深度（电源根节点为 1，不可达为 -1）
+    order: array    # 支配树先序序列（不含虚拟总电源）
+    enter: array    # 节点在 order 中的位置，不可达为 -1
+    exit: array     # 节点子树在 order 中的结束位置（不含）
+
+    def reachable(self, node: int) -> bool:
+        """节点是否可从电源到达"""
+        return self.enter[node] >= 0
+
+    def dominates(self, upstream: int, node: int) -> bool:
+        """upstream 是否为 node 的必经上游（含自身）"""
+        if not self.reachable(upstream) or not self.reachable(node):
+            return False
+        return self.enter[upstream] <= self.enter[node] < self.exit[upstream]
+
+    def critical_upstream(self, node: int) -> List[Tuple[int, int]]:
+        """
+        节点的全部必经上游节点
+
+        Returns:
+            (节点编号, 距查询节点的支配层数) 列表，从最近的必经节点开始
+        """
+        result = []
+        level = 0
+        current = self.idom[node]
+        while current >= 0:
+            level += 1
+            result.append((current, level))
+            current = self.idom[current]
+        return result
+
+    def dependents(self, node: int) -> List[Tuple[int, int]]:
+        """
+        节点故障后失去全部供电路径的节点（不含自身）
+
+        Returns:
+            (节点编号, 相对查询节点的支配层数) 列表，按支配树先序排列
+        """
+        if not self.reachable(node):
+            return []
+        base = self.depth[node]
+        depth = self.depth
+        return [
+            (dependent, depth[dependent] - base)
+            for dependent in self.order[self.enter[node] + 1:self.exit[node]]
+        ]
+
+
+def build_dominator_tree(graph: TopologyGraph) -> DominatorTree:
+    """
+    计算电源图的支配树（Cooper-Harvey-Kennedy 迭代算法）
+
+    按逆后序迭代求直接支配节点直至收敛；电源图接近树形，通常两轮即可收敛。
+    """
+    node_count = len(graph.node_ids)
+    root = node_count
+    type_codes = graph.type_codes(POWER_EDGE_TYPES)
+    roots = supply_roots(graph, type_codes)
+
+    def successors(node: int):
+        return iter(roots) if node == root else graph.neighbors(node, 'downstream', type_codes)
+
+    # 1. 从虚拟总电源深度优先遍历，得到后序编号
+    postorder = array('i', [-1]) * (node_count + 1)
+    post_sequence: List[int] = []
+    visited = bytearray(node_count + 1)
+    visited[root] = 1
+    stack = [(root, successors(root))]
+    while stack:
+        node, children = stack[-1]
+        for child in children:
+            if not visited[child]:
+                visited[child] = 1
+                stack.append((child, successors(child)))
+                break
+        else:
+            stack.pop()
+            postorder[node] = len(post_sequence)
+            post_sequence.append(node)
+
+    root_set = set(roots)
+    predecessors = {
+        node: ([root] if node in root_set else []) + [
+            pred for pred in graph.neighbors(node, 'upstream', type_codes) if visited[pred]
+        ]
+        for node in post_sequence if node != root
+    }
+
+    # 2. 按逆后序迭代求直接支配节点
+    idom = array('i', [-1]) * (node_count + 1)
+    idom[root] = root
+    reverse_postorder = post_sequence[-2::-1]
+
+    def intersect(a: int, b: int) -> int:
+        while a != b:
+            while postorder[a] < postorder[b]:
+                a = idom[a]
+            while postorder[b] < postorder[a]:
+                b = idom[b]
+        return a
+
+    changed = True
+    while changed:
+        changed = False
+        for node in reverse_postorder:
+            new_idom = -1
+            for pred in predecessors[node]:
+                if idom[pred] == -1:
+                    continue
+                new_idom = pred if new_idom == -1 else intersect(pred, new_idom)
+            if idom[node] != new_idom:
+                idom[node] = new_idom
+                changed = True
+
+    # 3. 支配树先序编号，子树即 order 中的连续区间
+    children: List[List[int]] = [[] for _ in range(node_count + 1)]
+    for node in sorted(predecessors):
+        children[idom[node]].append(node)
+
+    depth = array('i', [-1]) * node_count
+    enter = array('i', [-1]) * node_count
+    exit_ = array('i', [-1]) * node_count
+    order = array('i')
+    stack = [(child, 1) for child in reversed(children[root])]
+    while stack:
+        node, level = stack.pop()
+        if node < 0:
+            exit_[~node] = len(order)
+            continue
+        depth[node] = level
+        enter[node] = len(order)
+        order.append(node)
+        stack.append((~node, level))
+        stack.extend((child, level + 1) for child in reversed(children[node]))
+
+    for node in predecessors:
+        if idom[node] == root:
+            idom[node] = -1
+
+    return DominatorTree(
+        idom=idom[:node_count],
+        depth=depth,
+        order=order,
+        enter=enter,
+        exit=exit_
+    )
+
+
+def dominator_tree(graph: TopologyGraph) -> DominatorTree:
+    """电源图的支配树（按图版本缓存）"""
+    return graph.derived('dominator_tree', build_dominator_tree)
+
+
+# ==================== 下游影响统计 ====================
+
+@dataclass
+class DownstreamImpact:
+    """每个节点下游可达的设备数与属性合计（双电源设备只计一次）"""
+    device_counts: array            # 节点 -> 下游可达的设备数（设备节点计入自身）
+    ranking: array                  # 按设备数降序的节点编号
+    property_key: Optional[str] = None
+    totals: Optional[array] = None  # 节点 -> 下游设备的属性合计
+    total_ranking: Optional[array] = None   # 按属性合计降序的节点编号
+
+    def top(self, graph: TopologyGraph, limit: int, node_types=None, by_property: bool = False) -> List[int]:
+        """排名前 limit 的节点（可按节点类型过滤）"""
+        ranking = self.total_ranking if by_property and self.total_ranking is not None else self.ranking
+        result = []
+        for node in ranking:
+            if node_types and graph.node_types[node] not in node_types:
+                continue
+            result.append(node)
+            if len(result) >= limit:
+                break
+        return result
+
+
+def build_downstream_impact(graph: TopologyGraph, weights: Optional[Dict[int, float]] = None,
+                            property_key: Optional[str] = None) -> DownstreamImpact:
+    """
+    一次逆拓扑序遍历计算全部节点的下游设备集合
+
+    子节点先于父节点处理，父节点复用最大的子节点集合并合并其余子节点（小集合并入大集合），
+    子节点集合在最后一个父节点处理完后释放。环上及环上游的少量节点退化为逐个广度优先遍历。
+
+    Args:
+        weights: 设备节点编号 -> 属性数值，提供时同时计算属性合计
+    """
+    node_count = len(graph.node_ids)
+    type_codes = graph.type_codes(POWER_EDGE_TYPES)
+    is_device = [node_type == 'device' for node_type in graph.node_types]
+    children = [sorted(set(graph.neighbors(node, 'downstream', type_codes))) for node in range(node_count)]
+
+    pending_children = array('i', (len(kids) for kids in children))
+    pending_parents = array('i', [0]) * node_count
+    parents: List[List[int]] = [[] for _ in range(node_count)]
+    for node, kids in enumerate(children):
+        for child in kids:
+            parents[child].append(node)
+            pending_parents[child] += 1
+
+    counts = array('i', [0]) * node_count
+    totals = array('d', [0.0]) * node_count if weights is not None else None
+    sets: List[Optional[set]] = [None] * node_count
+    sums = [0.0] * node_count
+    done = bytearray(node_count)
+
+    ready = [node for node in range(node_count) if pending_children[node] == 0]
+    while ready:
+        node = ready.pop()
+        kids = children[node]
+
+        # 复用最大且本节点为最后使用者的子节点集合
+        base = None
+        for child in kids:
+            if pending_parents[child] == 1 and (base is None or len(sets[child]) > len(sets[base])):
+                base = child
+        if base is None:
+            reach, total = set(), 0.0
+        else:
+            reach, total = sets[base], sums[base]
+        for child in kids:
+            if child != base:
+                if weights is None:
+                    reach |= sets[child]
+                else:
+                    for device in sets[child]:
+                        if device not in reach:
+                            reach.add(device)
+                            total += weights.get(device, 0.0)
+            pending_parents[child] -= 1
+            if pending_parents[child] == 0:
+                sets[child] = None
+        if is_device[node] and node not in reach:
+            reach.add(node)
+            if weights is not None:
+                total += weights.get(node, 0.0)
+
+        counts[node] = len(reach)
+        if totals is not None:
+            totals[node] = total
+        sets[node], sums[node] = reach, total
+        done[node] = 1
+        if not parents[node]:
+            sets[node] = None
+        for parent in parents[node]:
+            pending_children[parent] -= 1
+            if pending_children[parent] == 0:
+                ready.append(parent)
+
+    # 环上及其上游的节点
+    for node in range(node_count):
+        if done[node]:
+            continue
+        seen = {node}
+        queue = [node]
+        while queue:
+            current = queue.pop()
+            for child in children[current]:
+                if child not in seen:
+                    seen.add(child)
+                    queue.append(child)
+        devices = [device for device in seen if is_device[device]]
+        counts[node] = len(devices)
+        if totals is not None:
+            totals[node] = sum(weights.get(device, 0.0) for device in devices)
+
+    nodes = range(node_count)
+    return DownstreamImpact(
+        device_counts=counts,
+        ranking=array('i', sorted(nodes, key=lambda node: (-counts[node], node))),
+        property_key=property_key,
+        totals=totals,
+        total_ranking=array('i', sorted(nodes, key=lambda node: (-totals[node], node))) if totals is not None else None
+    )
+
+
+_NUMBER_PATTERN = re.compile(r'^\s*([-+]?\d+(?:\.\d+)?)')
+
+
+def load_device_weights(session, graph: TopologyGraph, property_key: str) -> Dict[int, float]:
+    """
+    读取设备节点 properties 中的数值属性
+
+    属性值可以带单位（如 "630A"、"15kW"），取开头的数值；无法解析的值忽略。
+    """
+    rows = session.execute(text("""
+        SELECT id, properties ->> :key AS value
+        FROM rds_power_nodes
+        WHERE file_id = :file_id AND node_type = 'device' AND properties ->> :key IS NOT NULL
+    """), {'file_id': graph.file_id, 'key': property_key}).fetchall()
+
+    weights = {}
+    for row in rows:
+        node = graph.index.get(str(row.id))
+        match = _NUMBER_PATTERN.match(row.value)
+        if node is not None and match:
+            weights[node] = float(match.group(1))
+    return weights
+
+
+# 每个图最多缓存多少个属性的下游合计（属性名来自请求参数，按最近使用淘汰）
+IMPACT_PROPERTY_CACHE_SIZE = 4
+
+
+class _PropertyTotalsCache:
+    """单个图的属性合计 LRU 缓存：属性名 -> (合计, 按合计降序的节点编号)"""
+
+    def __init__(self, max_size: int = IMPACT_PROPERTY_CACHE_SIZE):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._items: "OrderedDict[str, Tuple[array, array]]" = OrderedDict()
+
+    def get(self, property_key: str) -> Optional[Tuple[array, array]]:
+        with self._lock:
+            value = self._items.get(property_key)
+            if value is not None:
+                self._items.move_to_end(property_key)
+            return value
+
+    def put(self, property_key: str, value: Tuple[array, array]) -> None:
+        with self._lock:
+            self._items[property_key] = value
+            self._items.move_to_end(property_key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+
+def downstream_impact(graph: TopologyGraph, session=None, property_key: Optional[str] = None) -> DownstreamImpact:
+    """
+    电源图的下游影响统计
+
+    设备数按图版本缓存；属性合计只为最近使用的 IMPACT_PROPERTY_CACHE_SIZE 个属性缓存，
+    避免任意属性名在图上累积完整的统计结果。导入使图缓存失效后，下次查询随新图重新计算；
+    指定 property_key 时需要传入 session 读取属性。
+    """
+    impact = graph.derived('downstream_impact', build_downstream_impact)
+    if property_key is None:
+        return impact
+
+    cache = graph.derived('downstream_property_totals', lambda g: _PropertyTotalsCache())
+    cached = cache.get(property_key)
+    if cached is None:
+        weighted = build_downstream_impact(graph, load_device_weights(session, graph, property_key), property_key)
+        cached = (weighted.totals, weighted.total_ranking)
+        cache.put(property_key, cached)
+
+    totals, total_ranking = cached
+    return DownstreamImpact(
+        device_counts=impact.device_counts,
+        ranking=impact.ranking,
+        property_key=property_key,
+        totals=totals,
+        total_ranking=total_ranking
+    )
+
+
+# ==================== 可达性索引 ====================
+
+@dataclass
+class ReachabilityIndex:
+    """
+    区间标注的可达性索引
+
+    沿下游方向深度优先遍历得到生成森林，森林子树对应一段连续的先序编号区间。
+    双电源 power_supply、backup 等非树边带来的额外可达范围，按逆拓扑序合并为
+    每个节点的有序区间列表（电源图接近树形，绝大多数节点只有一个区间）。
+    """
+    pre: array      # 节点 -> 先序编号
+    offsets: array  # 节点 -> 区间列表在 lows/highs 中的范围
+    lows: array
+    highs: array
+
+    def reaches(self, upstream: int, node: int) -> bool:
+        """upstream 沿下游方向能否到达 node（节点自身视为可达）"""
+        position = self.pre[node]
+        start, end = self.offsets[upstream], self.offsets[upstream + 1]
+        i = bisect_right(self.lows, position, start, end) - 1
+        return i >= start and position <= self.highs[i]
+
+    def is_ancestor(self, upstream: int, node: int) -> bool:
+        """upstream 是否为 node 的上游节点（不含自身）"""
+        return upstream != node and self.reaches(upstream, node)
+
+
+def _merge_intervals(parts: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """合并重叠或相邻的闭区间"""
+    parts.sort()
+    merged: List[Tuple[int, int]] = []
+    for low, high in parts:
+        if merged and low <= merged[-1][1] + 1:
+            if high > merged[-1][1]:
+                merged[-1] = (merged[-1][0], high)
+        else:
+            merged.append((low, high))
+    return merged
+
+
+def build_reachability_index(graph: TopologyGraph, edge_types: Sequence[str] = POWER_EDGE_TYPES) -> ReachabilityIndex:
+    """构建可达性区间标注（生成森林先序编号 + 逆拓扑序区间合并，环上节点逐个遍历）"""
+    node_count = len(graph.node_ids)
+    type_codes = graph.type_codes(edge_types)
+    children = [sorted(set(graph.neighbors(node, 'downstream', type_codes))) for node in range(node_count)]
+
+    # 1. 生成森林先序编号，树子树为 [pre, last]
+    pre = array('i', [-1]) * node_count
+    last = array('i', [-1]) * node_count
+    counter = 0
+    for start in supply_roots(graph, type_codes) + list(range(node_count)):
+        if pre[start] != -1:
+            continue
+        pre[start] = counter
+        counter += 1
+        stack = [(start, iter(children[start]))]
+        while stack:
+            node, kids = stack[-1]
+            for child in kids:
+                if pre[child] == -1:
+                    pre[child] = counter
+                    counter += 1
+                    stack.append((child, iter(children[child])))
+                    break
+            else:
+                stack.pop()
+                last[node] = counter - 1
+
+    # 2. 逆拓扑序合并子节点区间
+    intervals: List[Optional[List[Tuple[int, int]]]] = [None] * node_count
+    pending_children = array('i', (len(kids) for kids in children))
+    parents: List[List[int]] = [[] for _ in range(node_count)]
+    for node, kids in enumerate(children):
+        for child in kids:
+            parents[child].append(node)
+
+    ready = [node for node in range(node_count) if pending_children[node] == 0]
+    while ready:
+        node = ready.pop()
+        parts = [(pre[node], last[node])]
+        for child in children[node]:
+            # 树子节点的区间已包含在自身区间中，只有它带有额外区间时才需要合并
+            child_intervals = intervals[child]
+            if len(child_intervals) > 1 or not pre[node] <= child_intervals[0][0] <= last[node]:
+                parts.extend(child_intervals)
+        intervals[node] = _merge_intervals(parts) if len(parts) > 1 else parts
+        for parent in parents[node]:
+            pending_children[parent] -= 1
+            if pending_children[parent] == 0:
+                ready.append(parent)
+
+    # 3. 环上及其上游的节点
+    for node in range(node_count):
+        if intervals[node] is not None:
+            continue
+        seen = {node}
+        queue = [node]
+        while queue:
+            current = queue.pop()
+            for child in children[current]:
+                if child not in seen:
+                    seen.add(child)
+                    queue.append(child)
+        intervals[node] = _merge_intervals([(pre[reached], pre[reached]) for reached in seen])
+
+    offsets = array('i', [0]) * (node_count + 1)
+    lows = array('i')
+    highs = array('i')
+    for node, node_intervals in enumerate(intervals):
+        for low, high in node_intervals:
+            lows.append(low)
+            highs.append(high)
+        offsets[node + 1] = len(lows)
+
+    return ReachabilityIndex(pre=pre, offsets=offsets, lows=lows, highs=highs)
+
+
+def reachability_index(graph: TopologyGraph, edge_types: Sequence[str] = POWER_EDGE_TYPES) -> ReachabilityIndex:
+    """电源图的可达性索引（按图版本和边类型缓存）"""
+    edge_types = tuple(sorted(set(edge_types)))
+    return graph.derived(
+        f"reachability:{','.join(edge_types)}",
+        lambda g: build_reachability_index(g, edge_types)
+    )
+
+
+# ==================== 最近公共上游 ====================
+
+@dataclass
+class CommonUpstreamIndex:
+    """
+    支配树上的倍增 LCA 索引
+
+    支配树中两个节点的最近公共祖先，即两者所有供电路径都经过的最近节点（共同馈线 / 母线）；
+    电源图为树形的部分，支配树与 hierarchy 层级树相同。
+    """
+    depth: array        # 支配树深度（电源根节点为 1，不可达为 -1）
+    jumps: List[array]  # jumps[k][v] 为 v 向上 2^k 层的祖先，-1 表示超出根节点
+
+    def lca(self, a: int, b: int) -> int:
+        """两个节点的最近公共祖先（可为其中一个节点本身），无公共祖先时为 -1"""
+        depth = self.depth
+        if depth[a] < 0 or depth[b] < 0:
+            return -1
+        if depth[a] < depth[b]:
+            a, b = b, a
+        diff = depth[a] - depth[b]
+        k = 0
+        while diff:
+            if diff & 1:
+                a = self.jumps[k][a]
+            diff >>= 1
+            k += 1
+        if a == b:
+            return a
+        for jump in reversed(self.jumps):
+            if jump[a] != jump[b]:
+                a, b = jump[a], jump[b]
+        return self.jumps[0][a]
+
+    def lca_many(self, nodes: Sequence[int]) -> int:
+        """一组节点的最近公共祖先，无公共祖先或包含不可达节点时为 -1"""
+        result = -1
+        for i, node in enumerate(nodes):
+            result = node if i == 0 else self.lca(result, node)
+            if result < 0 or self.depth[result] < 0:
+                return -1
+        return result
+
+
+def build_common_upstream_index(graph: TopologyGraph) -> CommonUpstreamIndex:
+    """由支配树构建倍增跳转表"""
+    tree = dominator_tree(graph)
+    max_depth = max(tree.depth, default=0)
+    jumps = [array('i', tree.idom)]
+    for _ in range(1, max(max_depth, 1).bit_length()):
+        previous = jumps[-1]
+        jumps.append(array('i', (previous[up] if up >= 0 else -1 for up in previous)))
+    return CommonUpstreamIndex(depth=tree.depth, jumps=jumps)
+
+
+def common_upstream_index(graph: TopologyGraph) -> CommonUpstreamIndex:
+    """电源图的最近公共上游索引（按图版本缓存）"""
+    return graph.derived('common_upstream', build_common_upstream_index)
+
+
+# ==================== N-1 故障扫描 ====================
+
+@dataclass
+class ContingencyResult:
+    """
+    全部单节点故障（N-1）的失电设备矩阵
+
+    节点 Y 故障后失电的设备恰为支配树中 Y 的子孙设备。按支配树先序排列设备后，
+    每个故障节点的失电设备是一段连续区间，因此"故障节点 × 设备"矩阵只需存储
+    设备序列与每行的 [start, stop)。
+    """
+    device_order: np.ndarray    # 设备节点按支配树先序排列（int32）
+    starts: np.ndarray          # 节点 -> 失电设备在 device_order 中的起始位置（int32）
+    stops: np.ndarray           # 节点 -> 结束位置（不含）
+    lost_counts: np.ndarray     # 节点 -> 失电设备数（int32）
+    ranking: np.ndarray         # 按失电设备数降序的节点编号
+    unsupplied_devices: int     # 无论何种故障都不可从电源到达的设备数
+
+    def lost_devices(self, node: int) -> np.ndarray:
+        """节点故障后失电的设备（不含自身）"""
+        return self.device_order[self.starts[node]:self.stops[node]]
+
+
+def build_contingency(graph: TopologyGraph) -> ContingencyResult:
+    """由支配树一次性得到全部单节点故障的失电设备（numpy 前缀和向量化计算每行区间）"""
+    tree = dominator_tree(graph)
+    node_count = len(graph.node_ids)
+
+    order = np.frombuffer(tree.order, dtype=np.int32)
+    is_device = np.fromiter(
+        (node_type == 'device' for node_type in graph.node_types), dtype=bool, count=node_count
+    )
+    device_in_order = is_device[order]
+    # prefix[i] 为先序前 i 个节点中的设备数
+    prefix = np.zeros(len(order) + 1, dtype=np.int32)
+    np.cumsum(device_in_order, out=prefix[1:])
+
+    enter = np.frombuffer(tree.enter, dtype=np.int32)
+    exit_ = np.frombuffer(tree.exit, dtype=np.int32)
+    reachable = enter >= 0
+    starts = np.zeros(node_count, dtype=np.int32)
+    stops = np.zeros(node_count, dtype=np.int32)
+    starts[reachable] = prefix[enter[reachable] + 1]
+    stops[reachable] = prefix[exit_[reachable]]
+    lost_counts = stops - starts
+
+    return ContingencyResult(
+        device_order=order[device_in_order],
+        starts=starts,
+        stops=stops,
+        lost_counts=lost_counts,
+        ranking=np.lexsort((np.arange(node_count), -lost_counts)).astype(np.int32),
+        unsupplied_devices=int(np.count_nonzero(is_device & ~reachable))
+    )
+
+
+def contingency(graph: TopologyGraph) -> ContingencyResult:
+    """电源图的 N-1 故障扫描结果（按图版本缓存）"""
+    return graph.derived('contingency', build_contingency)
@@ -0,0 +1,254 @@
+"""
+电源图构建（纯 Python，不访问数据库）
+
+根据电源方面编码 (===) 计算 rds_power_nodes / rds_power_edges 的完整节点与边集合，
+包括实体引用映射 (entity_reference_map) 的解析和节点标签优先级。
+importer 随后用少量批量 upsert 写入数据库。
+"""
+
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+
+POWER_PREFIX = '==='
+
+# 设备节点的层级固定为 99，full_code 使用 DEVICE: 前缀与层级节点区分
+DEVICE_LEVEL = 99
+DEVICE_CODE_PREFIX = 'DEVICE:'
+
+
+@dataclass
+class PowerNode:
+    """电源图节点"""
+    id: str
+    full_code: str
+    short_code: str
+    parent_code: Optional[str]
+    label: str
+    level: int
+    node_type: str
+    object_id: Optional[str] = None
+
+    @property
+    def is_device(self) -> bool:
+        return self.level == DEVICE_LEVEL and self.full_code.startswith(DEVICE_CODE_PREFIX)
+
+
+@dataclass
+class PowerGraphPlan:
+    """待写入的电源图（节点按 full_code 去重，边按 (源, 目标, 类型) 去重，均保持创建顺序）"""
+    nodes: Dict[str, PowerNode] = field(default_factory=dict)
+    edges: Dict[Tuple[str, str, str], str] = field(default_factory=dict)   # (source_id, target_id, relation_type) -> edge_id
+
+    def add_edge(self, source_id: str, target_id: str, relation_type: str) -> None:
+        key = (source_id, target_id, relation_type)
+        if key not in self.edges:
+            self.edges[key] = edge_id(source_id, target_id, relation_type)
+
+
+def node_id(file_id: int, full_code: str) -> str:
+    """层级节点的确定性 UUID（基于 full_code）"""
+    return str(uuid.uuid5(uuid.NAMESPACE_DNS, f"POWER_NODE_{file_id}_{full_code}"))
+
+
+def device_node_id(file_id: int, asset_code: str) -> str:
+    """设备节点的确定性 UUID（基于 asset_code）"""
+    return str(uuid.uuid5(uuid.NAMESPACE_DNS, f"POWER_DEVICE_{file_id}_{asset_code}"))
+
+
+def edge_id(source_id: str, target_id: str, relation_type: str) -> str:
+    """边的确定性 UUID"""
+    return str(uuid.uuid5(uuid.NAMESPACE_DNS, f"POWER_EDGE_{source_id}_{target_id}_{relation_type}"))
+
+
+def _is_usable_name(name: str) -> bool:
+    """名称可以作为标签（非空且不是编码本身）"""
+    return bool(name) and not name.strip().startswith('=')
+
+
+def _node_type(part: str, level: int, is_last_part: bool) -> str:
+    """
+    确定节点类型 (基于编码规则增强)
+
+    - Source: 包含 DY (变压器), TE (变压器)，或层级 1
+    - Bus: 包含 AH (高压柜), W (母线), GP (柜/盘)
+    - Feeder: 包含 QF (断路器), QS (隔离开关), FU (熔断器)
+    - Device: 末端且不符合上述规则
+    """
+    upper_part = part.upper()
+    if 'DY' in upper_part or 'TE' in upper_part or level == 1:
+        return 'source'
+    if 'AH' in upper_part or 'W' in upper_part or 'GP' in upper_part:
+        return 'bus'
+    if 'QF' in upper_part or 'QS' in upper_part or 'FU' in upper_part:
+        return 'feeder'
+    if is_last_part:
+        return 'device'
+    return 'feeder'  # 中间节点默认为 feeder/bus 类
+
+
+def _sort_key(aspect: Dict) -> Tuple[int, bool]:
+    """
+    电源编码排序规则
+
+    同一个 asset_code 可能有多个电源编码（如逻辑节点和实体引用）。
+    确保逻辑节点（无末尾点）在实体引用（有末尾点）之前处理，
+    这样当处理实体引用时，它的父逻辑节点已经存在。
+
+    1. 按编码长度升序（层级浅的优先）
+    2. 无末尾点的优先于有末尾点的（逻辑节点优先于实体引用）
+    """
+    code = aspect.get('full_code', '')
+    return (len(code), code.endswith('.'))
+
+
+def build_power_graph(
+    file_id: int,
+    power_aspects: List[Dict],
+    object_id_map: Dict[str, str]
+) -> PowerGraphPlan:
+    """
+    计算电源图的节点与边
+
+    支持双电源设备：同一 asset_code 的设备只创建一个节点，
+    但会从多个不同的电源路径创建边指向它。
+
+    末尾点号的语义 (IEC 81346-12):
+    - 不带末尾点 (===DY2...DP9O.1.1) = 逻辑节点，仅存在于电源功能维度
+    - 带末尾点 (===DY2...DP9O.1.1.) = 实体对象，引用上述逻辑节点
+
+    Args:
+        file_id: 模型文件 ID
+        power_aspects: 电源方面列表 [{'full_code': '===DY1.AH1', 'asset_code': 'HSC001', 'name': 'AH5柜出线'}, ...]
+        object_id_map: 资产编码到 rds_objects.id 的映射
+
+    Returns:
+        PowerGraphPlan
+    """
+    plan = PowerGraphPlan()
+
+    # 设备节点 (asset_code -> node_id) - 用于末端设备节点去重
+    device_nodes: Dict[str, str] = {}
+
+    # 逻辑节点到实体引用节点的映射 (logic_code -> entity_node_id)
+    # 例如：===...1.1 -> 5#雨水泵按钮箱 GK5 的设备节点 ID
+    # 这样当 ===...1.1.1 需要连接到父节点时，会优先连接到实体引用节点
+    entity_reference_map: Dict[str, str] = {}
+
+    # 设备边在全部层级边之后创建 (parent_node_id, device_node_id)
+    device_edges: List[Tuple[str, str]] = []
+
+    for aspect in sorted(power_aspects, key=_sort_key):
+        full_code = aspect.get('full_code', '')
+        if not full_code or not full_code.startswith(POWER_PREFIX):
+            continue
+
+        asset_code = aspect.get('asset_code', '')
+        device_name = aspect.get('name', '')
+
+        # 解析层级：===DY1.AH1.H01 -> ['DY1', 'AH1', 'H01']
+        body = full_code[len(POWER_PREFIX):]
+        has_trailing_dot = body.endswith('.')
+        body_without_dot = body[:-1] if has_trailing_dot else body
+
+        parts = [p for p in body_without_dot.split('.') if p]
+        if not parts:
+            continue
+
+        # ========== 阶段 1: 层级路径上的所有逻辑节点 ==========
+        current_full_code = POWER_PREFIX
+        parent_node_id = None
+        last_hierarchy_node_id = None  # 最后一个层级节点 (设备的直接父节点)
+
+        # 有 asset_code 的才创建独立设备节点
+        create_separate_device = bool(asset_code)
+
+        for i, part in enumerate(parts):
+            level = i + 1
+            is_last_part = (i == len(parts) - 1)
+            current_full_code = POWER_PREFIX + part if i == 0 else current_full_code + '.' + part
+
+            # 最后一段且有 asset_code 时是设备节点，稍后单独处理
+            # 但如果有末尾点号，需要先创建逻辑父节点
+            if is_last_part and create_separate_device and not has_trailing_dot:
+                last_hierarchy_node_id = parent_node_id
+                break
+
+            parent_code = POWER_PREFIX + '.'.join(parts[:i]) if i > 0 else None
+
+            # 父节点对应的逻辑编码如有实体引用，优先连接到实体引用节点
+            # 例如：===...1.1.1 应该从 ===...1.1. 的实体设备供电，而不是从 ===...1.1 的逻辑节点
+            if parent_node_id and parent_code and parent_code in entity_reference_map:
+                actual_parent_id = entity_reference_map[parent_code]
+            else:
+                actual_parent_id = parent_node_id
+
+            node = plan.nodes.get(current_full_code)
+            if node is not None:
+                # 节点已存在时也要确保与父节点之间的边存在
+                # (不同层级深度的编码处理时，中间层级边不能被跳过)
+                if actual_parent_id:
+                    plan.add_edge(actual_parent_id, node.id, 'hierarchy')
+
+                # 最后一段且有名称：仅当标签仍是短码时用名称替换
+                if is_last_part and _is_usable_name(device_name):
+                    if not node.label or node.label == node.short_code:
+                        node.label = device_name
+            else:
+                # 末端节点使用名称作为 label；中间节点使用短码
+                label = device_name if is_last_part and _is_usable_name(device_name) else part
+                node = PowerNode(
+                    id=node_id(file_id, current_full_code),
+                    full_code=current_full_code,
+                    short_code=part,
+                    parent_code=parent_code,
+                    label=label,
+                    level=level,
+                    node_type=_node_type(part, level, is_last_part)
+                )
+                plan.nodes[current_full_code] = node
+                if actual_parent_id:
+                    plan.add_edge(actual_parent_id, node.id, 'hierarchy')
+
+            parent_node_id = node.id
+            last_hierarchy_node_id = node.id
+
+        # ========== 特殊处理：末尾点号的实体引用 ==========
+        # 有末尾点号时，所有层级节点都已处理，最后一个逻辑节点就是父节点
+        if has_trailing_dot and last_hierarchy_node_id is None:
+            last_hierarchy_node_id = parent_node_id
+
+        # ========== 阶段 2: 设备节点（基于 asset_code 去重） ==========
+        if asset_code:
+            if asset_code not in device_nodes:
+                device_id = device_node_id(file_id, asset_code)
+                plan.nodes[DEVICE_CODE_PREFIX + asset_code] = PowerNode(
+                    id=device_id,
+                    full_code=DEVICE_CODE_PREFIX + asset_code,
+                    short_code=asset_code,
+                    parent_code=None,
+                    # 设备标签优先使用名称
+                    label=device_name if _is_usable_name(device_name) else asset_code,
+                    level=DEVICE_LEVEL,
+                    node_type='device',
+                    object_id=object_id_map.get(asset_code)
+                )
+                device_nodes[asset_code] = device_id
+
+                # 实体引用（有末尾点）注册到 entity_reference_map，
+                # 后续层级节点（如 ===...1.1.1）会连接到这个实体设备而不是逻辑节点
+                if has_trailing_dot:
+                    entity_reference_map[POWER_PREFIX + body_without_dot] = device_id
+            else:
+                device_id = device_nodes[asset_code]
+
+            # 从父馈线柜到设备
+            if last_hierarchy_node_id:
+                device_edges.append((last_hierarchy_node_id, device_id))
+
+    # ========== 阶段 3: 设备边（支持多电源） ==========
+    for source_id, target_id in device_edges:
+        plan.add_edge(source_id, target_id, 'power_supply')
+
+    return plan
@@ -0,0 +1,228 @@
+"""
+RDS 表分区管理
+
+执行可选的 server/scripts/rds-partition-by-file.sql 之后，rds_objects / rds_aspects /
+rds_power_nodes / rds_power_edges 按 file_id 做 LIST 分区，每个文件一个分区（<表名>_f<file_id>）：
+- 导入前调用 ensure_file_partitions 创建分区（数据库函数 rds_ensure_file_partitions）
+- 清除文件数据时直接删除分区，不再逐行 DELETE
+- 替换整个文件的数据时先写入影子表，再在短事务中切换分区（见下方影子表部分）
+
+未执行该脚本的数据库（普通表结构）下，各函数退化为原有行为，调用方无需区分。
+"""
+
+import os
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+
+
+# 按 file_id 分区的表（顺序即删除顺序：先边后节点，先方面后对象）
+PARTITIONED_TABLES = ('rds_power_edges', 'rds_power_nodes', 'rds_aspects', 'rds_objects')
+
+# 表结构在进程生命周期内只会因迁移而改变，检测结果缓存在进程内
+_layout_lock = threading.Lock()
+_partitioned: Optional[bool] = None
+
+
+def partition_name(table: str, file_id: int) -> str:
+    """文件分区表名，与 rds_ensure_file_partitions 的命名规则一致"""
+    return f"{table}_f{int(file_id)}"
+
+
+def is_partitioned(session) -> bool:
+    """数据库是否已使用分区表结构"""
+    global _partitioned
+    if _partitioned is None:
+        row = session.execute(text("""
+            SELECT relkind FROM pg_class WHERE oid = to_regclass('rds_objects')
+        """)).fetchone()
+        with _layout_lock:
+            _partitioned = bool(row and row.relkind == 'p')
+    return _partitioned
+
+
+def reset_layout_cache() -> None:
+    """丢弃表结构检测结果（执行迁移后调用）"""
+    global _partitioned
+    with _layout_lock:
+        _partitioned = None
+
+
+def ensure_file_partitions(session, file_id: int) -> None:
+    """为文件创建分区（幂等，普通表结构或写入影子表时不做任何事）"""
+    if not in_shadow(session) and is_partitioned(session):
+        session.execute(text("SELECT rds_ensure_file_partitions(:file_id)"), {'file_id': file_id})
+
+
+def drop_file_partitions(session, file_id: int) -> Dict[str, int]:
+    """
+    删除文件的全部分区
+
+    删除前统计各分区行数用于返回；DEFAULT 分区中残留的同文件数据一并删除。
+    调用方负责提交事务，并在此之前删除 rds_relations 中引用这些对象的关系。
+
+    Returns:
+        {表名: 删除行数}
+    """
+    deleted: Dict[str, int] = {}
+    for table in PARTITIONED_TABLES:
+        partition = partition_name(table, file_id)
+        count = 0
+        exists = session.execute(
+            text("SELECT to_regclass(:name) IS NOT NULL AS present"), {'name': partition}
+        ).fetchone().present
+        if exists:
+            # 分区名只由表名常量和整数 file_id 组成，可以安全拼接
+            count = session.execute(text(f'SELECT COUNT(*) AS n FROM "{partition}"')).fetchone().n
+            session.execute(text(f'DROP TABLE "{partition}"'))
+        count += session.execute(
+            text(f"DELETE FROM {table} WHERE file_id = :file_id"), {'file_id': file_id}
+        ).rowcount
+        deleted[table] = count
+    return deleted
+
+
+# ==================== 影子表导入与切换 ====================
+#
+# 分区表结构下的原子替换：
+# 1. 在独立 schema（rds_shadow_<file_id>_<创建时间戳>_<token>）中创建与分区结构相同的影子表，
+#    将 search_path 指向该 schema，导入代码无需修改即写入影子表（含全部索引）
+# 2. 短事务中卸载旧分区（移入 rds_retired_* schema），挂载影子表为新分区
+# 3. 旧分区所在 schema 由后台删除
+# 导入期间读者始终看到完整的旧数据。
+
+SHADOW_SCHEMA_KEY = 'rds_shadow_schema'
+SHADOW_SCHEMA_PREFIX = 'rds_shadow_'
+RETIRED_SCHEMA_PREFIX = 'rds_retired_'
+
+# 切换时等待表锁的最长时间，避免排队的排他锁长时间阻塞其他查询
+SWAP_LOCK_TIMEOUT = '10s'
+
+# 超过该时长仍未切换的影子 schema 视为导入中断后的残留，由后台清理删除
+SHADOW_SCHEMA_MAX_AGE_HOURS = float(os.getenv('RDS_SHADOW_MAX_AGE_HOURS', '12'))
+
+
+def in_shadow(session) -> bool:
+    """当前事务是否正在向影子表写入"""
+    return bool(session.info.get(SHADOW_SCHEMA_KEY))
+
+
+def create_shadow_tables(session, file_id: int) -> str:
+    """
+    创建影子表并将当前事务的 search_path 指向影子 schema
+
+    影子表以 DEFAULT 分区为模板（LIKE ... INCLUDING ALL），带有与分区相同的索引，
+    并附加 file_id 检查约束，挂载为分区时无需再扫描校验。
+
+    Returns:
+        影子 schema 名称
+    """
+    file_id = int(file_id)
+    schema = f"{SHADOW_SCHEMA_PREFIX}{file_id}_{int(time.time())}_{uuid.uuid4().hex[:8]}"
+    session.execute(text(f'CREATE SCHEMA "{schema}"'))
+    for table in PARTITIONED_TABLES:
+        session.execute(text(f'CREATE TABLE "{schema}"."{table}" (LIKE "{table}_default" INCLUDING ALL)'))
+        session.execute(text(
+            f'ALTER TABLE "{schema}"."{table}" ADD CONSTRAINT "{table}_file_check" CHECK (file_id = {file_id})'
+        ))
+
+    search_path = session.execute(text("SELECT current_setting('search_path') AS path")).fetchone().path
+    session.execute(text(f'SET LOCAL search_path TO "{schema}", {search_path}'))
+    session.info[SHADOW_SCHEMA_KEY] = schema
+    return schema
+
+
+def swap_shadow_tables(session, file_id: int, schema: str) -> str:
+    """
+    用影子表替换文件的现有分区（调用方负责提交事务）
+
+    Returns:
+        存放旧分区的 schema 名称，提交后由 drop_schema 删除
+    """
+    file_id = int(file_id)
+    session.info.pop(SHADOW_SCHEMA_KEY, None)
+    session.execute(text(f"SET LOCAL lock_timeout = '{SWAP_LOCK_TIMEOUT}'"))
+
+    retired = RETIRED_SCHEMA_PREFIX + schema[len(SHADOW_SCHEMA_PREFIX):]
+    session.execute(text(f'CREATE SCHEMA "{retired}"'))
+
+    for table in PARTITIONED_TABLES:
+        partition = partition_name(table, file_id)
+        parent_schema = session.execute(text("""
+            SELECT n.nspname AS name
+            FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE c.oid = to_regclass(:table)
+        """), {'table': table}).fetchone().name
+
+        # 影子表索引按分区命名（rds_objects_pkey -> rds_objects_f12_pkey），移入后不与其他分区冲突
+        index_rows = session.execute(text("""
+            SELECT c.relname AS name
+            FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE i.indrelid = to_regclass(:table)
+        """), {'table': f'"{schema}"."{table}"'}).fetchall()
+        for row in index_rows:
+            suffix = row.name[len(table):] if row.name.startswith(table) else f'_{row.name}'
+            session.execute(text(f'ALTER INDEX "{schema}"."{row.name}" RENAME TO "{(partition + suffix)[:63]}"'))
+
+        # 卸载旧分区
+        exists = session.execute(
+            text("SELECT to_regclass(:name) IS NOT NULL AS present"), {'name': f'"{parent_schema}"."{partition}"'}
+        ).fetchone().present
+        if exists:
+            session.execute(text(f'ALTER TABLE "{table}" DETACH PARTITION "{parent_schema}"."{partition}"'))
+            session.execute(text(f'ALTER TABLE "{parent_schema}"."{partition}" SET SCHEMA "{retired}"'))
+        session.execute(text(f"DELETE FROM {table} WHERE file_id = :file_id"), {'file_id': file_id})
+
+        # 挂载影子表
+        session.execute(text(f'ALTER TABLE "{schema}"."{table}" RENAME TO "{partition}"'))
+        session.execute(text(f'ALTER TABLE "{schema}"."{partition}" SET SCHEMA "{parent_schema}"'))
+        session.execute(text(
+            f'ALTER TABLE "{table}" ATTACH PARTITION "{parent_schema}"."{partition}" FOR VALUES IN ({file_id})'
+        ))
+
+    session.execute(text(f'DROP SCHEMA "{schema}"'))
+    return retired
+
+
+def drop_schema(session, schema: str) -> None:
+    """删除影子或已退役的 schema（含其中的表）"""
+    if not schema.startswith((SHADOW_SCHEMA_PREFIX, RETIRED_SCHEMA_PREFIX)):
+        raise ValueError(f"不是 RDS 影子 schema: {schema}")
+    session.execute(text(f'DROP SCHEMA IF EXISTS "{schema}" CASCADE'))
+
+
+def list_retired_schemas(session) -> List[str]:
+    """列出尚未删除的旧分区 schema（后台删除失败或进程中断时残留）"""
+    rows = session.execute(text("""
+        SELECT nspname AS name FROM pg_namespace WHERE nspname LIKE :pattern
+    """), {'pattern': RETIRED_SCHEMA_PREFIX + '%'}).fetchall()
+    return [row.name for row in rows]
+
+
+def shadow_schema_created_at(schema: str) -> Optional[float]:
+    """影子 schema 的创建时间（从名称中解析），旧格式名称无法解析时返回 None"""
+    parts = schema[len(SHADOW_SCHEMA_PREFIX):].split('_')
+    if len(parts) != 3 or not parts[1].isdigit():
+        return None
+    return float(parts[1])
+
+
+def list_stale_shadow_schemas(session, max_age_hours: float = SHADOW_SCHEMA_MAX_AGE_HOURS) -> List[str]:
+    """
+    列出超时未切换的影子 schema（导入在写入影子表后、切换前中断时残留）
+
+    名称中没有创建时间的旧格式影子 schema 来自本次变更之前的版本，同样视为残留。
+    """
+    cutoff = time.time() - max_age_hours * 3600
+    rows = session.execute(text("""
+        SELECT nspname AS name FROM pg_namespace WHERE nspname LIKE :pattern
+    """), {'pattern': SHADOW_SCHEMA_PREFIX + '%'}).fetchall()
+    stale = []
+    for row in rows:
+        created_at = shadow_schema_created_at(row.name)
+        if created_at is None or created_at < cutoff:
+            stale.append(row.name)
+    return stale
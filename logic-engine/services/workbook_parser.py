@@ -0,0 +1,360 @@
+"""
+MC 工作簿解析
+
+将 Excel 行解析为导入数据库所需的对象列表：
+- 逐批产出解析出的行，同一设备的多行定义（一物多面）由导入阶段按 ref_code 合并
+- 为缺失的父级编码补全虚拟系统对象（只需要编码索引）
+- 多个工作表在解析进程池中并行解析（每个工作表由一个进程顺序读取）
+
+同步导入接口与异步导入任务共用此模块。
+"""
+
+import itertools
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from services.iec_parser import IECParser, ParsedCodeColumns
+from services.code_trie import CodeTrie
+from services.excel_reader import iter_sheet_batches, list_sheets
+from services.executor import PARSE_WORKERS, parse_process_pool, reset_parse_process_pool
+
+
+parser = IECParser()
+
+# 列名映射（支持中英文列名）
+COLUMN_MAPPING = {
+    '工艺功能': 'function',
+    '位置': 'location', 
+    '电源功能': 'power',
+    'ProcessFunction': 'function',
+    'Location': 'location',
+    'PowerFunction': 'power'
+}
+
+
+# 名称与设备编码列（按顺序取第一个存在的列）
+NAME_COLUMNS = ('名称', 'Name')
+ASSET_CODE_COLUMNS = ('设备编码', 'DeviceCode')
+
+
+def text_column(df: pd.DataFrame, names: Sequence[str]) -> Optional[pd.Series]:
+    """按顺序返回第一个存在的列，都不存在时返回 None"""
+    for column in names:
+        if column in df.columns:
+            return df[column]
+    return None
+
+
+def normalized_text_column(df: pd.DataFrame, names: Sequence[str]) -> pd.Series:
+    """
+    文本列的规范化值：缺失值和 'nan' 字符串视为空串，其余转为字符串并去除首尾空白
+
+    列不存在时整列为空串。
+    """
+    column = text_column(df, names)
+    if column is None:
+        return pd.Series('', index=df.index, dtype=object)
+    values = column.astype(object).where(column.notna(), '').astype(str).str.strip()
+    return values.where(values.str.lower() != 'nan', '')
+
+
+def parse_aspect_columns(df: pd.DataFrame) -> Iterator[Tuple[str, ParsedCodeColumns]]:
+    """按 COLUMN_MAPPING 顺序批量解析存在的方面编码列，返回 (列名, 列式解析结果)"""
+    for column in COLUMN_MAPPING:
+        if column in df.columns:
+            yield column, parser.parse_many(df[column].astype(object))
+
+
+class WorkbookStream:
+    """
+    工作簿的流式解析结果
+    
+    batches() 按工作表顺序逐批产出解析出的行（对象字典，aspects 只含该行的方面编码），
+    同一 ref_code 的多行（一物多面）不在这里合并，由导入阶段按 ref_code 合并；
+    显式行全部产出后，最后一批为补全的虚拟父节点对象。
+    
+    内存中只保留编码索引（全部方面编码与显式对象的 ref_code），不保留已产出的对象，
+    峰值内存与批次大小相关。total_rows / errors / 对象数量在 batches() 迭代结束后完整。
+    """
+
+    def __init__(self, path: str, on_batch: Optional[Callable[[int], None]] = None):
+        self.path = path
+        self.on_batch = on_batch
+        self.errors: List[str] = []
+        self.virtual_objects = 0
+        # 读取或解析工作簿本身失败时的异常（区别于调用方处理批次时的错误）
+        self.read_error: Optional[Exception] = None
+        # 全部方面编码（按首次出现顺序），用于补全虚拟父节点
+        self._known_codes: Dict[str, None] = {}
+        self._ref_codes: Set[str] = set()
+        # 工作表 -> 已读到的行数（最后一个非空行号 + 1，与 pandas 忽略末尾空行一致）
+        self._sheet_rows: Dict[str, int] = {}
+
+    @property
+    def total_rows(self) -> int:
+        return sum(self._sheet_rows.values())
+
+    @property
+    def parsed_objects(self) -> int:
+        """显式对象数量（按 ref_code 合并后）"""
+        return len(self._ref_codes)
+
+    def batches(self) -> Iterator[List[Dict]]:
+        """逐批产出解析出的行，读取失败时记录到 read_error 后抛出"""
+        for batch in self._parsed_batches():
+            yield self._to_objects(batch)
+            if self.on_batch is not None:
+                self.on_batch(self.total_rows)
+        
+        virtual_objects = build_virtual_objects(self._known_codes)
+        self.virtual_objects = len(virtual_objects)
+        if virtual_objects:
+            yield virtual_objects
+
+    def _parsed_batches(self) -> Iterator['_ParsedBatch']:
+        """
+        各工作表分发到解析进程池并行解析，各进程自行打开文件，只返回精简的解析结果；
+        按工作表顺序产出，与逐行顺序解析完全一致。同时最多有 PARSE_WORKERS 个工作表在解析或等待取用。
+        未启用进程池或只有一个工作表时在当前线程内逐批解析。
+        
+        单个工作表不拆分为行块：只读模式下 openpyxl 读取 min_row 之后的行时仍要解析之前的全部行，
+        按行块拆分会使总解析量随块数平方增长。
+        """
+        try:
+            sheet_names = list_sheets(self.path)
+            pool = parse_process_pool() if len(sheet_names) > 1 else None
+            
+            if pool is None:
+                for sheet_name in sheet_names:
+                    yield from _parse_batches(self.path, sheet_name)
+                return
+            
+            futures: Deque[Future] = deque()
+            pending = iter(sheet_names)
+            try:
+                for sheet_name in itertools.islice(pending, PARSE_WORKERS):
+                    futures.append(pool.submit(_parse_sheet, self.path, sheet_name))
+                # 按提交顺序取结果，每取走一个工作表再提交下一个
+                while futures:
+                    batch = futures.popleft().result()
+                    for sheet_name in itertools.islice(pending, 1):
+                        futures.append(pool.submit(_parse_sheet, self.path, sheet_name))
+                    yield batch
+            except BrokenProcessPool:
+                reset_parse_process_pool()
+                raise
+            finally:
+                for future in futures:
+                    future.cancel()
+        except Exception as e:
+            self.read_error = e
+            raise
+
+    def _to_objects(self, batch: '_ParsedBatch') -> List[Dict]:
+        """将批次转换为对象字典，并更新编码索引与统计"""
+        self._sheet_rows[batch.sheet] = max(self._sheet_rows.get(batch.sheet, 0), batch.last_row + 1)
+        self._known_codes.update(dict.fromkeys(batch.known_codes))
+        self.errors.extend(batch.errors)
+        
+        objects = []
+        for row_index, name, asset_code, ref_code, aspects in batch.rows:
+            self._ref_codes.add(ref_code)
+            objects.append({
+                'sheet': batch.sheet,
+                'row_index': row_index,
+                'name': name,
+                'asset_code': asset_code,
+                'ref_code': ref_code,
+                'aspects': [
+                    {
+                        'full_code': full_code,
+                        'prefix': prefix,
+                        'aspect_type': aspect_type,
+                        'hierarchy_level': hierarchy_level,
+                        'parent_code': parent_code
+                    }
+                    for full_code, prefix, aspect_type, hierarchy_level, parent_code in aspects
+                ]
+            })
+        return objects
+
+
+def parse_workbook_for_import(
+    path: str,
+    on_batch: Optional[Callable[[int], None]] = None
+) -> WorkbookStream:
+    """
+    流式解析已落盘的 MC 工作簿（解析在迭代 batches() 时进行）
+    
+    Args:
+        path: Excel 文件路径
+        on_batch: 每处理完一个批次调用一次，参数为已处理的行数（用于进度上报和取消检查）
+        
+    Returns:
+        流式解析结果；读取文件本身失败时，迭代 batches() 会抛出异常并记录到 read_error
+    """
+    return WorkbookStream(path, on_batch)
+
+
+# ==================== 分工作表解析 ====================
+
+@dataclass
+class _ParsedBatch:
+    """
+    一个批次的解析结果（在进程间传递，只包含合并所需的最少数据）
+
+    rows 中每项为 (row_index, name, asset_code, ref_code, aspects)，
+    aspects 为 (full_code, prefix, aspect_type, hierarchy_level, parent_code) 元组列表，
+    只包含解析出方面编码的行。
+    """
+    sheet: str
+    rows: List[Tuple]
+    known_codes: List[str]
+    errors: List[str]
+    last_row: int = -1      # 批次中最后一个非空行的行号（用于统计总行数）
+
+
+def _parse_sheet(path: str, sheet_name: str) -> _ParsedBatch:
+    """解析进程入口：解析一个工作表，合并为一个批次返回"""
+    sheet = _ParsedBatch(sheet=sheet_name, rows=[], known_codes=[], errors=[])
+    for batch in _parse_batches(path, sheet_name):
+        sheet.rows.extend(batch.rows)
+        sheet.known_codes.extend(batch.known_codes)
+        sheet.errors.extend(batch.errors)
+        sheet.last_row = max(sheet.last_row, batch.last_row)
+    return sheet
+
+
+def _parse_batches(path: str, sheet_name: str) -> Iterator[_ParsedBatch]:
+    """逐批读取并解析一个工作表"""
+    for sheet, df in iter_sheet_batches(path, sheet_name=sheet_name):
+        batch = _ParsedBatch(
+            sheet=sheet, rows=[], known_codes=[], errors=[],
+            last_row=int(df.index[-1]) if len(df) else -1
+        )
+        
+        try:
+            _parse_frame(batch, df)
+        except Exception:
+            # 列式解析失败时逐行重新解析，只有出错的行被跳过并报告
+            batch.rows.clear()
+            batch.known_codes.clear()
+            _parse_rows(batch, df)
+        
+        yield batch
+
+
+def _parse_rows(batch: _ParsedBatch, df: pd.DataFrame) -> None:
+    """逐行解析一个批次（列式解析失败时的回退路径），每行的错误单独记录"""
+    for position in range(len(df)):
+        row = df.iloc[position:position + 1]
+        row_batch = _ParsedBatch(sheet=batch.sheet, rows=[], known_codes=[], errors=[])
+        try:
+            _parse_frame(row_batch, row)
+        except Exception as e:
+            batch.errors.append(f"Sheet '{batch.sheet}' 行 {row.index[0]}: {str(e)}")
+            continue
+        batch.rows.extend(row_batch.rows)
+        batch.known_codes.extend(row_batch.known_codes)
+
+
+def _parse_frame(batch: _ParsedBatch, df: pd.DataFrame) -> None:
+    """
+    列式解析一个批次
+
+    名称、设备编码、ref_code 和方面编码都按列计算，逐行的 Python 工作只剩最后的分组。
+    """
+    sheet = batch.sheet
+    name = normalized_text_column(df, NAME_COLUMNS)
+    asset_code = normalized_text_column(df, ASSET_CODE_COLUMNS)
+    # 特殊补丁：如果设备编码等于名称，视为无效编码（可能是误填），强制分离
+    asset_code = asset_code.where(asset_code != name, '')
+    
+    # 生成唯一标识 ref_code
+    # - 有设备编码：严格使用设备编码作为 ID，允许重复（意味着同一设备的多行定义）
+    # - 无设备编码：使用 Name + Sheet + RowIndex 确保物理独立性
+    #   (这是为了解决 115 个开关如果没有编码会被错误合并成 1 个的问题)
+    # - 两者都没有：跳过空行
+    has_asset_code = asset_code != ''
+    keep = (has_asset_code | (name != '')).to_numpy()
+    ref_code = asset_code.where(has_asset_code, name + f'_{sheet}_' + df.index.to_series(index=df.index).astype(str))
+    
+    kept = df[keep]
+    if kept.empty:
+        return
+    
+    # 解析三种方面编码（只取当前对象的直接编码，不展开层级），按列顺序追加到各行
+    row_aspects: List[List[Tuple]] = [[] for _ in range(len(kept))]
+    for _, parsed in parse_aspect_columns(kept):
+        valid = parsed.valid.to_numpy()
+        if not valid.any():
+            continue
+        columns = zip(
+            np.flatnonzero(valid).tolist(),
+            parsed.full_code[valid].tolist(),
+            parsed.prefix[valid].tolist(),
+            parsed.aspect_type[valid].tolist(),
+            parsed.hierarchy_level[valid].tolist(),
+            parsed.parent_code[valid].tolist()
+        )
+        for position, *aspect in columns:
+            row_aspects[position].append(tuple(aspect))
+            batch.known_codes.append(aspect[0])
+    
+    for row_index, row_name, row_asset_code, row_ref_code, aspects in zip(
+        kept.index.tolist(),
+        name[keep].tolist(),
+        asset_code[keep].tolist(),
+        ref_code[keep].tolist(),
+        row_aspects
+    ):
+        if aspects:
+            batch.rows.append((int(row_index), row_name, row_asset_code, row_ref_code, aspects))
+
+
+def build_virtual_objects(known_codes: Iterable[str]) -> List[Dict]:
+    """
+    为缺失的父级编码创建虚拟系统对象
+    
+    Args:
+        known_codes: 显式对象的全部方面编码（按首次出现顺序）
+        
+    Returns:
+        虚拟对象列表
+    """
+    # 前缀树中已插入全部显式编码，缺失的中间节点可在 O(depth) 内找出
+    codes = list(known_codes)
+    code_trie = CodeTrie()
+    code_trie.insert_many(codes)
+    virtual_objects = []
+
+    for full_code in codes:
+        for missing_code in code_trie.missing_ancestors(full_code):
+            p = parser.parse_code(missing_code)
+            
+            # 创建虚拟系统对象
+            virtual_obj = {
+                'sheet': 'SYSTEM_GENERATED',
+                'row_index': -1,
+                'name': p.full_code,  # 虚拟对象默认用编码作为名称
+                'asset_code': p.full_code, # 用 full_code 作为 ref_code
+                'object_type': 'system',
+                'aspects': [{
+                    'full_code': p.full_code,
+                    'prefix': p.prefix,
+                    'aspect_type': p.aspect_type,
+                    'hierarchy_level': p.hierarchy_level,
+                    'parent_code': p.parent_code
+                }]
+            }
+            virtual_objects.append(virtual_obj)
+            # 插入前缀树，后续编码不会重复创建同一虚拟节点
+            code_trie.insert(p.full_code)
+    
+    return virtual_objects
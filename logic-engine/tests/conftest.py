@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 测试直接导入 services.* 模块，与服务运行时的工作目录一致
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,74 @@
+"""编码前缀树（CodeTrie）的祖先、子树计数与子孙枚举"""
+
+import random
+
+from services.code_trie import CodeTrie
+from services.hierarchy import summarize_code
+
+
+CODES = ['=A', '=A.', '=A.B', '=A.B.', '=A.B.C', '=A.D', '===DY1.AH1', '++X.Y']
+
+
+def _trie(codes=CODES):
+    trie = CodeTrie()
+    trie.insert_many(codes)
+    return trie
+
+
+def test_ancestors_are_structural():
+    trie = _trie()
+    assert trie.ancestors('=A.B.C') == ['=A', '=A.', '=A.B', '=A.B.']
+    assert trie.ancestors('=A.B.') == ['=A', '=A.', '=A.B']
+    assert trie.ancestors('=Z.Q') == ['=Z', '=Z.']
+    assert trie.ancestors('not-a-code') == []
+
+
+def test_missing_ancestors_and_find_missing():
+    trie = _trie()
+    assert trie.missing_ancestors('=A.B.C') == []
+    assert trie.missing_ancestors('===DY1.AH1') == ['===DY1', '===DY1.']
+    assert trie.missing_ancestors('++X.Y') == ['++X', '++X.']
+    assert trie.find_missing() == ['===DY1', '===DY1.', '++X', '++X.']
+
+
+def test_subtree_size_and_descendants():
+    trie = _trie()
+    assert trie.subtree_size('=A') == 6
+    assert list(trie.descendants('=A')) == ['=A.', '=A.B', '=A.B.', '=A.B.C', '=A.D']
+    assert trie.subtree_size('=A.') == 5
+    assert list(trie.descendants('=A.')) == ['=A.B', '=A.B.', '=A.B.C', '=A.D']
+    assert trie.subtree_size('=A.B') == 3
+    assert trie.subtree_size('===DY1') == 1     # 缺失的中间节点本身不计数
+    assert trie.subtree_size('=Z') == 0
+    assert list(trie.descendants('=Z')) == []
+
+
+def test_subtree_size_matches_descendants_on_random_codes():
+    rng = random.Random(7)
+    codes = set()
+    for _ in range(300):
+        segments = [rng.choice('ABC') for _ in range(rng.randint(1, 4))]
+        codes.add(rng.choice(['=', '===']) + '.'.join(segments) + rng.choice(['', '.']))
+    trie = _trie(sorted(codes))
+    assert len(trie) == len(codes)
+
+    for code in sorted(codes):
+        descendants = list(trie.descendants(code))
+        assert trie.subtree_size(code) == len(descendants) + 1
+        # 子孙即以编码本身（容器形式）为结构祖先的全部已插入编码
+        expected = {other for other in codes if other != code and code in trie.ancestors(other)}
+        assert set(descendants) == expected
+
+
+def test_summarize_code():
+    summary = summarize_code(_trie(), '=A.B', limit=1)
+    assert summary == {
+        'exists': True,
+        'ancestors': [{'code': '=A', 'exists': True}, {'code': '=A.', 'exists': True}],
+        'subtree_size': 3,
+        'descendants': ['=A.B.'],
+        'truncated': True
+    }
+    missing = summarize_code(_trie(), '===DY1.AH1')
+    assert [ancestor['exists'] for ancestor in missing['ancestors']] == [False, False]
+    assert missing['descendants'] == [] and not missing['truncated']
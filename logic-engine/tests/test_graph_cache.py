@@ -0,0 +1,100 @@
+"""图缓存（GraphCache）的 LRU 淘汰、失效与构建锁清理"""
+
+import pytest
+
+from services import graph_cache as graph_cache_module
+from services.graph_cache import POWER_SOURCE, RELATIONS_SOURCE, GraphCache, _build_graph
+
+
+def _stub_graph(file_id, source):
+    return _build_graph(file_id, source, ['a', 'b'], ['A', 'B'], ['', ''], [('a', 'b', 'FEEDS')], 0.0)
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    """替换图加载函数，记录每次加载的 (file_id, 来源)；hooks 中的函数在加载过程中调用"""
+    calls = []
+    hooks = {}
+
+    def loader(source):
+        def load(session, file_id):
+            calls.append((file_id, source))
+            hook = hooks.pop((file_id, source), None)
+            if hook is not None:
+                hook()
+            return _stub_graph(file_id, source)
+        return load
+
+    monkeypatch.setattr(graph_cache_module, '_LOADERS', {
+        RELATIONS_SOURCE: loader(RELATIONS_SOURCE),
+        POWER_SOURCE: loader(POWER_SOURCE),
+    })
+    return calls, hooks
+
+
+def _cached(cache):
+    return sorted(key for key in cache._graphs)
+
+
+def test_hits_reuse_graph(loads):
+    calls, _ = loads
+    cache = GraphCache(max_files=2)
+    graph = cache.get_graph(None, 1)
+    assert cache.get_graph(None, 1) is graph
+    assert calls == [(1, RELATIONS_SOURCE)]
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['builds']) == (1, 1, 1)
+
+
+def test_evicts_least_recently_used_file(loads):
+    calls, _ = loads
+    cache = GraphCache(max_files=2)
+    cache.get_graph(None, 1)
+    cache.get_graph(None, 1, POWER_SOURCE)
+    cache.get_graph(None, 2)
+    cache.get_graph(None, 1)        # 命中后文件 1 成为最近使用
+    cache.get_graph(None, 3)
+
+    # 淘汰最久未使用的文件 2；文件 1 的两个来源图一起保留
+    assert _cached(cache) == [(1, POWER_SOURCE), (1, RELATIONS_SOURCE), (3, RELATIONS_SOURCE)]
+    assert cache.stats()['evictions'] == 1
+    assert (2, RELATIONS_SOURCE) not in cache._build_locks
+
+    cache.get_graph(None, 2)
+    # 文件 1 的各来源图作为一个整体淘汰
+    assert _cached(cache) == [(2, RELATIONS_SOURCE), (3, RELATIONS_SOURCE)]
+    assert cache.stats()['evictions'] == 3
+    assert calls.count((2, RELATIONS_SOURCE)) == 2
+
+
+def test_invalidate_drops_graphs_and_build_locks(loads):
+    calls, _ = loads
+    cache = GraphCache(max_files=2)
+    cache.get_graph(None, 1)
+    cache.get_graph(None, 1, POWER_SOURCE)
+    cache.invalidate(1)
+
+    assert _cached(cache) == []
+    assert cache._build_locks == {}
+    assert cache.stats()['invalidations'] == 2
+    cache.get_graph(None, 1)
+    assert calls.count((1, RELATIONS_SOURCE)) == 2
+
+
+def test_build_during_invalidate_is_not_cached(loads):
+    calls, hooks = loads
+    cache = GraphCache(max_files=2)
+    # 构建过程中文件被重新导入：本次结果照常返回，但不写入缓存
+    hooks[(1, RELATIONS_SOURCE)] = lambda: cache.invalidate(1)
+    graph = cache.get_graph(None, 1)
+
+    assert graph.file_id == 1
+    assert _cached(cache) == []
+    assert cache._build_locks == {}
+    assert list(cache._recent) == []
+
+    # 下一次查询重新加载并缓存
+    again = cache.get_graph(None, 1)
+    assert again is not graph
+    assert cache.get_graph(None, 1) is again
+    assert calls == [(1, RELATIONS_SOURCE), (1, RELATIONS_SOURCE)]
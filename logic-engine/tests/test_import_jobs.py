@@ -0,0 +1,104 @@
+"""导入任务的状态文件写入与取消竞争"""
+
+import json
+import os
+import threading
+
+import pytest
+
+from services.import_jobs import (
+    STATUS_CANCELLED,
+    STATUS_QUEUED,
+    STATUS_RUNNING,
+    ImportJob,
+    ImportJobManager,
+)
+
+
+@pytest.fixture
+def manager(tmp_path):
+    return ImportJobManager(str(tmp_path))
+
+
+def _queued_job(manager):
+    job = ImportJob(job_id='00000000-0000-4000-8000-000000000001', file_id=1, status=STATUS_QUEUED,
+                    clear_existing=False, create_relations=True)
+    os.makedirs(manager._path(job.job_id))
+    manager._save(job)
+    return job
+
+
+def test_concurrent_writes_use_distinct_temp_files(manager, tmp_path):
+    path = str(tmp_path / 'state.json')
+
+    def write(i):
+        for n in range(50):
+            manager._write_json(path, {'writer': i, 'n': n, 'payload': 'x' * 1000})
+
+    threads = [threading.Thread(target=write, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with open(path, encoding='utf-8') as f:
+        assert json.load(f)['n'] == 49
+    assert os.listdir(tmp_path) == ['state.json']
+
+
+def test_failed_write_keeps_previous_file(manager, tmp_path):
+    path = str(tmp_path / 'parsed.jsonl')
+    manager._write_json_lines(path, [[{'a': 1}], [{'a': 2}]])
+
+    def broken():
+        yield [{'a': 3}]
+        raise RuntimeError('解析失败')
+
+    with pytest.raises(RuntimeError):
+        manager._write_json_lines(path, broken())
+    assert list(manager._read_json_lines(path, batch_size=1)) == [[{'a': 1}], [{'a': 2}]]
+    assert os.listdir(tmp_path) == ['parsed.jsonl']
+
+
+def test_cancelled_queued_job_is_not_run(manager, monkeypatch):
+    job = _queued_job(manager)
+    assert manager.cancel(job.job_id).status == STATUS_CANCELLED
+    monkeypatch.setattr(manager, '_run_phase', lambda job, phase: pytest.fail('已取消的任务不应执行'))
+
+    manager._run(job.job_id)
+    stored = manager.get(job.job_id)
+    assert (stored.status, stored.attempts) == (STATUS_CANCELLED, 0)
+
+
+def test_cancel_while_starting_is_not_overwritten(manager, monkeypatch):
+    job = _queued_job(manager)
+    statuses = []
+    original_save, original_get, original_check = manager._save, manager.get, manager._check_cancelled
+    canceller = []
+
+    def save(saved):
+        statuses.append(saved.status)
+        original_save(saved)
+
+    def get(job_id):
+        found = original_get(job_id)
+        # _run 读取到排队状态后立即发起取消；取消应等待 _run 标记为执行中之后再读取状态
+        if not canceller:
+            canceller.append(threading.Thread(target=manager.cancel, args=(job_id,)))
+            canceller[0].start()
+            canceller[0].join(0.2)
+        return found
+
+    def check_cancelled(job_id):
+        canceller[0].join()
+        original_check(job_id)
+
+    monkeypatch.setattr(manager, '_save', save)
+    monkeypatch.setattr(manager, 'get', get)
+    monkeypatch.setattr(manager, '_check_cancelled', check_cancelled)
+    monkeypatch.setattr(manager, '_run_phase', lambda job, phase: pytest.fail('已取消的任务不应执行'))
+
+    manager._run(job.job_id)
+    # 状态只会从执行中变为已取消，不会出现“已取消 -> 执行中”的覆盖
+    assert statuses == [STATUS_RUNNING, STATUS_CANCELLED]
+    assert original_get(job.job_id).status == STATUS_CANCELLED
@@ -0,0 +1,78 @@
+"""增量导入的对象差异计算（按内容哈希区分新增、变化、未变化与删除的对象）"""
+
+from services.importer import _diff_object_groups, _group_objects, _removed_object_ids
+
+
+def _obj(ref_code, name='1号泵', aspects=(), sheet='设备', row=2, asset_code=''):
+    return {
+        'ref_code': ref_code,
+        'name': name,
+        'asset_code': asset_code,
+        'sheet': sheet,
+        'row': row,
+        'aspects': [
+            {'aspect_type': aspect_type, 'full_code': code, 'prefix': code[:1], 'parent_code': None, 'hierarchy_level': 1}
+            for aspect_type, code in aspects
+        ],
+    }
+
+
+def _existing(objects):
+    """模拟上一次导入写入的记录：键 -> (对象 ID, 内容哈希)"""
+    return {key: (f"id-{key[1]}", group.row_hash) for key, group in _group_objects(objects).items()}
+
+
+PREVIOUS = [
+    _obj('P1', aspects=[('function', '=A')]),
+    _obj('P2', aspects=[('power', '===DY1')]),
+    _obj('P2', aspects=[('location', '++R1')], sheet='位置', row=9),
+    _obj('P3'),
+]
+
+
+def _diff(objects, existing):
+    groups = _group_objects(objects)
+    inserted, updated = _diff_object_groups(groups, existing)
+    return inserted, updated, _removed_object_ids(existing, set(groups))
+
+
+def test_unchanged_rows_ignore_position_and_row_order():
+    existing = _existing(PREVIOUS)
+    # 行号、工作表变化或同一对象方面编码行顺序变化都不算内容变化
+    current = [
+        _obj('P3', row=40),
+        _obj('P2', aspects=[('location', '++R1')], sheet='其他', row=3),
+        _obj('P2', aspects=[('power', '===DY1')], row=5),
+        _obj('P1', aspects=[('function', '=A')], sheet='新表'),
+    ]
+    assert _diff(current, existing) == ([], [], [])
+
+
+def test_changed_inserted_and_removed_rows():
+    existing = _existing(PREVIOUS)
+    current = [
+        _obj('P1', aspects=[('function', '=A'), ('function', '=B')]),      # 新增方面编码
+        _obj('P2', aspects=[('power', '===DY1')]),                           # 丢失一行方面编码
+        _obj('P4'),                                                          # 新对象
+    ]
+    inserted, updated, removed = _diff(current, existing)
+    assert [key[1] for key in inserted] == ['P4']
+    assert sorted(key[1] for key in updated) == ['P1', 'P2']
+    assert removed == ['id-P3']
+
+
+def test_name_and_asset_code_use_last_row():
+    existing = _existing([_obj('P1', name='1号泵'), _obj('P1', name='1号泵', asset_code='MC-1')])
+    # 合并后取最后一行的名称和设备编码：只改前面的行不算变化，改最后一行算变化
+    assert _diff([_obj('P1', name='旧泵'), _obj('P1', name='1号泵', asset_code='MC-1')], existing) == ([], [], [])
+    _, updated, _ = _diff([_obj('P1', name='1号泵'), _obj('P1', name='1号泵', asset_code='MC-2')], existing)
+    assert [key[1] for key in updated] == ['P1']
+
+
+def test_type_change_is_insert_plus_remove():
+    existing = _existing([_obj('X1', name='1号泵')])
+    # 名称决定对象类型，类型变化后唯一键 (object_type, ref_code) 也变化
+    inserted, updated, removed = _diff([_obj('X1', name='1号配电柜')], existing)
+    assert inserted == [('panel', 'X1')]
+    assert updated == []
+    assert removed == ['id-X1']
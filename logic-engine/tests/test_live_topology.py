@@ -0,0 +1,78 @@
+"""实时拓扑：开关变位后增量更新的带电状态与重新计算的结果对照"""
+
+import random
+
+from services.graph_cache import POWER_EDGE_TYPES, POWER_SOURCE, _build_graph
+from services.live_topology import CLOSED_STATE, OPEN_STATE, LiveTopology, SwitchUpdate
+
+
+def _live(node_count, edges, open_ids=()):
+    """节点 ID 为 '0'..'n-1'，边 ID 为 'e0'..；edges 为 (源, 目标, 类型)"""
+    node_ids = [str(i) for i in range(node_count)]
+    graph = _build_graph(1, POWER_SOURCE, node_ids, node_ids, node_ids,
+                         ((str(source), str(target), type_) for source, target, type_ in edges), 0.0)
+    edge_keys = {
+        f"e{i}": (source, target, graph.type_code(type_))
+        for i, (source, target, type_) in enumerate(edges)
+        if type_ in POWER_EDGE_TYPES
+    }
+    return LiveTopology(graph, edge_keys, {edge_keys[edge_id] for edge_id in open_ids})
+
+
+def _energized(live):
+    return {node for node in range(len(live.graph.node_ids)) if live.energized[node]}
+
+
+def _random_update(rng, live, node_count):
+    state = rng.choice((OPEN_STATE, CLOSED_STATE))
+    if rng.random() < 0.8:
+        return SwitchUpdate(state=state, edge_id=rng.choice(list(live.edge_keys)))
+    # 按端点定位（可能不存在这样的边）
+    return SwitchUpdate(state=state, source=str(rng.randrange(node_count)), target=str(rng.randrange(node_count)),
+                        relation_type=rng.choice((None,) + POWER_EDGE_TYPES))
+
+
+def test_open_then_close_in_same_batch():
+    # 0 -> 1 -> 2，3 经 backup 备供 2
+    live = _live(4, [(0, 1, 'power_supply'), (1, 2, 'power_supply'), (3, 2, 'backup')], open_ids=['e2'])
+    result = live.apply([SwitchUpdate(state=OPEN_STATE, edge_id='e0'), SwitchUpdate(state=CLOSED_STATE, edge_id='e0')])
+    assert (result.applied, result.energized, result.deenergized) == (2, [], [])
+    assert _energized(live) == {0, 1, 2, 3}
+
+    result = live.apply([SwitchUpdate(state=OPEN_STATE, edge_id='e1'), SwitchUpdate(state=CLOSED_STATE, edge_id='e2')])
+    assert (result.energized, result.deenergized) == ([], [])
+
+    result = live.apply([SwitchUpdate(state=OPEN_STATE, edge_id='e2'), SwitchUpdate(state=CLOSED_STATE, edge_id='e1'),
+                         SwitchUpdate(state=OPEN_STATE, edge_id='e0'), SwitchUpdate(state=OPEN_STATE, edge_id='missing')])
+    assert (result.energized, result.deenergized, result.unresolved) == ([], [1, 2], ['missing'])
+
+
+def test_random_batches_match_fresh_topology():
+    rng = random.Random(23)
+    for _ in range(150):
+        node_count = rng.randint(1, 10)
+        edges = [
+            (rng.randrange(node_count), rng.randrange(node_count), rng.choice(POWER_EDGE_TYPES + ('FEEDS',)))
+            for _ in range(rng.randint(1, 3 * node_count))
+        ]
+        edge_ids = [f"e{i}" for i, edge in enumerate(edges) if edge[2] in POWER_EDGE_TYPES]
+        if not edge_ids:
+            continue
+        live = _live(node_count, edges, rng.sample(edge_ids, rng.randint(0, len(edge_ids))))
+
+        for _ in range(8):
+            updates = [_random_update(rng, live, node_count) for _ in range(rng.randint(1, 6))]
+            # 同一批内先断开再闭合（或相反）的边
+            edge_id = rng.choice(edge_ids)
+            first, second = rng.sample((OPEN_STATE, CLOSED_STATE), 2)
+            position = rng.randint(0, len(updates))
+            updates[position:position] = [SwitchUpdate(state=first, edge_id=edge_id), SwitchUpdate(state=second, edge_id=edge_id)]
+
+            before = _energized(live)
+            result = live.apply(updates)
+            after = _energized(live)
+
+            fresh = LiveTopology(live.graph, live.edge_keys, set(live.open_edges))
+            assert live.energized == fresh.energized
+            assert result.energized == sorted(after - before)
+            assert result.deenergized == sorted(before - after)
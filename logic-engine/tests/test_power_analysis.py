@@ -0,0 +1,250 @@
+"""电源图分析索引与暴力计算（删除节点后重新判断可达性）的对照"""
+
+import random
+from collections import deque
+
+import pytest
+
+from services.graph_cache import POWER_EDGE_TYPES, POWER_SOURCE, _build_graph
+from services.power_analysis import (
+    build_common_upstream_index,
+    build_contingency,
+    build_dominator_tree,
+    build_reachability_index,
+)
+
+
+def _graph(node_count, edges, node_types=None):
+    """节点 ID 为 '0'..'n-1'，与节点编号一致；edges 为 (源, 目标, 类型)"""
+    node_ids = [str(i) for i in range(node_count)]
+    graph = _build_graph(1, POWER_SOURCE, node_ids, node_ids, node_ids,
+                         ((str(source), str(target), type_) for source, target, type_ in edges), 0.0)
+    graph.node_types = node_types or ['bus'] * node_count
+    return graph
+
+
+def _random_graph(rng, max_nodes=12):
+    """随机电源图：混合三种供电边与一种不参与分析的边，可能含环、自环与不可达的部分"""
+    node_count = rng.randint(1, max_nodes)
+    edges = [
+        (rng.randrange(node_count), rng.randrange(node_count), rng.choice(POWER_EDGE_TYPES + ('FEEDS',)))
+        for _ in range(rng.randint(0, 2 * node_count))
+    ]
+    node_types = [rng.choice(['device', 'bus', 'source']) for _ in range(node_count)]
+    return node_count, edges, node_types
+
+
+def _adjacency(node_count, edges):
+    adjacency = [set() for _ in range(node_count)]
+    for source, target, type_ in edges:
+        if type_ in POWER_EDGE_TYPES:
+            adjacency[source].add(target)
+    return adjacency
+
+
+def _roots(adjacency):
+    has_parent = {target for targets in adjacency for target in targets}
+    return [node for node in range(len(adjacency)) if node not in has_parent]
+
+
+def _supplied(adjacency, removed=None):
+    """从电源根节点出发可到达的节点（removed 为故障节点，不可通过）"""
+    seen = {root for root in _roots(adjacency) if root != removed}
+    queue = deque(seen)
+    while queue:
+        node = queue.popleft()
+        for child in adjacency[node]:
+            if child != removed and child not in seen:
+                seen.add(child)
+                queue.append(child)
+    return seen
+
+
+def _brute_dependents(adjacency, node):
+    """节点故障后失电的节点（不含自身）"""
+    supplied = _supplied(adjacency)
+    if node not in supplied:
+        return set()
+    return supplied - _supplied(adjacency, removed=node) - {node}
+
+
+def _cases(seed, count):
+    rng = random.Random(seed)
+    return [_random_graph(rng) for _ in range(count)]
+
+
+# ==================== 支配树 ====================
+
+def test_dominators_multiple_roots_and_backup_supply():
+    # 0 与 5 为两个电源；3 由 1 主供并由 5 经 backup 备供，4 只经 3 供电；6 -> 7 -> 6 为无电源的环
+    edges = [(0, 1, 'hierarchy'), (1, 2, 'hierarchy'), (1, 3, 'power_supply'), (3, 4, 'power_supply'),
+             (5, 3, 'backup'), (6, 7, 'power_supply'), (7, 6, 'power_supply')]
+    tree = build_dominator_tree(_graph(8, edges))
+
+    assert tree.critical_upstream(2) == [(1, 1), (0, 2)]
+    assert tree.critical_upstream(3) == []
+    assert tree.critical_upstream(4) == [(3, 1)]
+    assert sorted(tree.dependents(0)) == [(1, 1), (2, 2)]
+    assert tree.dependents(3) == [(4, 1)]
+    assert tree.dependents(5) == []
+    assert not tree.reachable(6) and not tree.reachable(7)
+    assert tree.dependents(6) == [] and tree.critical_upstream(7) == []
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_dominators_match_brute_force(seed):
+    for node_count, edges, _ in _cases(seed, 60):
+        adjacency = _adjacency(node_count, edges)
+        tree = build_dominator_tree(_graph(node_count, edges))
+        supplied = _supplied(adjacency)
+        brute = {node: _brute_dependents(adjacency, node) for node in range(node_count)}
+
+        for node in range(node_count):
+            assert tree.reachable(node) == (node in supplied)
+
+            dependents = tree.dependents(node)
+            assert {dependent for dependent, _ in dependents} == brute[node]
+            assert len(dependents) == len(brute[node])
+
+            # 必经上游即“故障后 node 失电”的全部节点，从最近的开始，层数逐个递增
+            critical = tree.critical_upstream(node)
+            assert {upstream for upstream, _ in critical} == {y for y in range(node_count) if node in brute[y]}
+            assert [level for _, level in critical] == list(range(1, len(critical) + 1))
+            for upstream, level in critical:
+                assert (node, level) in tree.dependents(upstream)
+                assert tree.dominates(upstream, node)
+
+
+# ==================== 可达性索引 ====================
+
+def _descendants(adjacency, node):
+    """node 沿下游方向可到达的节点（含自身）"""
+    seen = {node}
+    queue = deque([node])
+    while queue:
+        current = queue.popleft()
+        for child in adjacency[current]:
+            if child not in seen:
+                seen.add(child)
+                queue.append(child)
+    return seen
+
+
+def _assert_reachability(index, adjacency):
+    node_count = len(adjacency)
+    for upstream in range(node_count):
+        reached = _descendants(adjacency, upstream)
+        for node in range(node_count):
+            assert index.reaches(upstream, node) == (node in reached), (upstream, node)
+            assert index.is_ancestor(upstream, node) == (node != upstream and node in reached)
+
+
+def test_reachability_cross_edges_and_cycles():
+    # 树边 0->1->2、0->3；横跨边 3->2 与 1->3；2 <-> 4 成环；环 5 <-> 6 挂在 3 下游；7 只有自环
+    edges = [(0, 1, 'hierarchy'), (1, 2, 'hierarchy'), (0, 3, 'hierarchy'), (3, 2, 'backup'),
+             (1, 3, 'power_supply'), (2, 4, 'power_supply'), (4, 2, 'power_supply'),
+             (3, 5, 'power_supply'), (5, 6, 'power_supply'), (6, 5, 'backup'), (7, 7, 'power_supply')]
+    index = build_reachability_index(_graph(8, edges))
+    _assert_reachability(index, _adjacency(8, edges))
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_reachability_matches_bfs(seed):
+    for node_count, edges, _ in _cases(200 + seed, 60):
+        index = build_reachability_index(_graph(node_count, edges))
+        _assert_reachability(index, _adjacency(node_count, edges))
+
+
+def test_reachability_edge_type_filter():
+    rng = random.Random(9)
+    for _ in range(60):
+        node_count, edges, _ = _random_graph(rng)
+        # 只沿 hierarchy 边判断时，其余供电边视为不存在
+        hierarchy_edges = [edge for edge in edges if edge[2] == 'hierarchy']
+        index = build_reachability_index(_graph(node_count, edges), ('hierarchy',))
+        _assert_reachability(index, _adjacency(node_count, hierarchy_edges))
+
+
+# ==================== 最近公共上游 ====================
+
+def _brute_common_upstream(adjacency, nodes):
+    """一组节点共同的必经上游（含节点自身）中最深的一个：其余共同必经上游的故障范围都覆盖它"""
+    supplied = _supplied(adjacency)
+    if not nodes or any(node not in supplied for node in nodes):
+        return -1
+    common = None
+    for node in nodes:
+        dominators = {y for y in supplied if y == node or node in _brute_dependents(adjacency, y)}
+        common = dominators if common is None else common & dominators
+    # 共同必经上游构成一条支配链，最深的节点被链上其余节点支配
+    for y in common:
+        if all(y in _brute_dependents(adjacency, other) for other in common if other != y):
+            return y
+    return -1
+
+
+def test_common_upstream_roots_unreachable_and_ancestors():
+    # 两个电源 0、5；0 -> 1 -> {2, 3}；3 -> 4；5 -> 6；8 -> 9 -> 8 为无电源的环
+    edges = [(0, 1, 'hierarchy'), (1, 2, 'hierarchy'), (1, 3, 'hierarchy'), (3, 4, 'power_supply'),
+             (5, 6, 'hierarchy'), (8, 9, 'power_supply'), (9, 8, 'power_supply')]
+    index = build_common_upstream_index(_graph(10, edges))
+
+    assert index.lca(2, 4) == 1
+    assert index.lca(4, 3) == 3            # 节点与自身的祖先
+    assert index.lca(0, 4) == 0
+    assert index.lca(4, 4) == 4
+    assert index.lca(2, 6) == -1           # 不同电源
+    assert index.lca(0, 5) == -1
+    assert index.lca(2, 8) == -1           # 不可达
+    assert index.lca(8, 9) == -1
+    assert index.lca_many([2, 4, 3]) == 1
+    assert index.lca_many([4]) == 4
+    assert index.lca_many([2, 6]) == -1
+    assert index.lca_many([8]) == -1
+    assert index.lca_many([]) == -1
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_common_upstream_matches_brute_force(seed):
+    rng = random.Random(300 + seed)
+    for node_count, edges, _ in _cases(300 + seed, 40):
+        adjacency = _adjacency(node_count, edges)
+        index = build_common_upstream_index(_graph(node_count, edges))
+        for a in range(node_count):
+            for b in range(node_count):
+                assert index.lca(a, b) == _brute_common_upstream(adjacency, [a, b]), (a, b)
+        for _ in range(5):
+            nodes = rng.sample(range(node_count), rng.randint(1, node_count))
+            assert index.lca_many(nodes) == _brute_common_upstream(adjacency, nodes)
+
+
+# ==================== N-1 故障扫描 ====================
+
+def test_contingency_excludes_failed_device_itself():
+    # 0 -> 1(设备) -> 2(设备)：设备 1 故障只影响 2，不把自身计入失电设备
+    graph = _graph(3, [(0, 1, 'power_supply'), (1, 2, 'power_supply')], ['source', 'device', 'device'])
+    result = build_contingency(graph)
+    assert list(result.lost_devices(0)) == [1, 2]
+    assert list(result.lost_devices(1)) == [2]
+    assert list(result.lost_devices(2)) == []
+    assert list(result.lost_counts) == [2, 1, 0]
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_contingency_matches_brute_force(seed):
+    for node_count, edges, node_types in _cases(100 + seed, 60):
+        adjacency = _adjacency(node_count, edges)
+        result = build_contingency(_graph(node_count, edges, node_types))
+        devices = {node for node in range(node_count) if node_types[node] == 'device'}
+
+        for node in range(node_count):
+            expected = _brute_dependents(adjacency, node) & devices
+            lost = list(result.lost_devices(node))
+            assert sorted(lost) == sorted(expected)
+            assert len(lost) == len(set(lost))
+            assert result.lost_counts[node] == len(expected)
+
+        counts = [int(result.lost_counts[node]) for node in result.ranking]
+        assert counts == sorted(counts, reverse=True)
+        assert sorted(result.ranking) == list(range(node_count))
+        assert result.unsupplied_devices == len(devices - _supplied(adjacency))
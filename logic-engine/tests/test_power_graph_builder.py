@@ -0,0 +1,105 @@
+"""电源图构建（build_power_graph）的节点与边计算"""
+
+from services.power_graph_builder import (
+    DEVICE_CODE_PREFIX,
+    DEVICE_LEVEL,
+    build_power_graph,
+    device_node_id,
+    edge_id,
+    node_id,
+)
+
+
+FILE_ID = 7
+
+
+def _edges(plan):
+    """以 full_code 表示的边集合 {(源, 目标, 类型)}"""
+    codes = {node.id: code for code, node in plan.nodes.items()}
+    return {(codes[source], codes[target], relation_type) for source, target, relation_type in plan.edges}
+
+
+def test_hierarchy_and_device_nodes():
+    plan = build_power_graph(FILE_ID, [
+        {'full_code': '===DY1.AH1.H01', 'asset_code': 'HSC001', 'name': 'AH5柜出线'},
+    ], {'HSC001': 'obj-1'})
+
+    # 末段有设备编码时不创建逻辑节点，设备直接挂在上一级层级节点下
+    assert list(plan.nodes) == ['===DY1', '===DY1.AH1', DEVICE_CODE_PREFIX + 'HSC001']
+    assert _edges(plan) == {
+        ('===DY1', '===DY1.AH1', 'hierarchy'),
+        ('===DY1.AH1', DEVICE_CODE_PREFIX + 'HSC001', 'power_supply'),
+    }
+
+    root = plan.nodes['===DY1']
+    assert (root.level, root.node_type, root.parent_code, root.label) == (1, 'source', None, 'DY1')
+    bus = plan.nodes['===DY1.AH1']
+    assert (bus.level, bus.node_type, bus.parent_code) == (2, 'bus', '===DY1')
+
+    device = plan.nodes[DEVICE_CODE_PREFIX + 'HSC001']
+    assert device.is_device and device.level == DEVICE_LEVEL
+    assert (device.label, device.object_id) == ('AH5柜出线', 'obj-1')
+
+
+def test_ids_are_deterministic():
+    aspects = [{'full_code': '===DY1.AH1.H01', 'asset_code': 'HSC001', 'name': ''}]
+    plan = build_power_graph(FILE_ID, aspects, {})
+
+    assert plan.nodes['===DY1'].id == node_id(FILE_ID, '===DY1')
+    device_id = device_node_id(FILE_ID, 'HSC001')
+    assert plan.nodes[DEVICE_CODE_PREFIX + 'HSC001'].id == device_id
+    parent_id = node_id(FILE_ID, '===DY1.AH1')
+    assert plan.edges[(parent_id, device_id, 'power_supply')] == edge_id(parent_id, device_id, 'power_supply')
+    assert build_power_graph(FILE_ID, aspects, {}) == plan
+    # 无名称时设备标签回退为设备编码
+    assert plan.nodes[DEVICE_CODE_PREFIX + 'HSC001'].label == 'HSC001'
+
+
+def test_dual_supply_device_has_one_node_and_two_edges():
+    plan = build_power_graph(FILE_ID, [
+        {'full_code': '===DY1.AH1.H01', 'asset_code': 'P1', 'name': '水泵'},
+        {'full_code': '===DY2.AH2.H02', 'asset_code': 'P1', 'name': '水泵'},
+    ], {})
+
+    devices = [node for node in plan.nodes.values() if node.is_device]
+    assert len(devices) == 1
+    supply = {edge for edge in _edges(plan) if edge[2] == 'power_supply'}
+    assert supply == {
+        ('===DY1.AH1', DEVICE_CODE_PREFIX + 'P1', 'power_supply'),
+        ('===DY2.AH2', DEVICE_CODE_PREFIX + 'P1', 'power_supply'),
+    }
+
+
+def test_entity_reference_feeds_child_nodes():
+    # 输入顺序打乱：按编码长度排序后实体引用 (末尾点) 先于其子节点处理
+    plan = build_power_graph(FILE_ID, [
+        {'full_code': '===DY1.AH1.1.1', 'asset_code': '', 'name': '1回路'},
+        {'full_code': '===DY1.AH1.1.', 'asset_code': 'GK5', 'name': '5#雨水泵按钮箱'},
+    ], {})
+
+    edges = _edges(plan)
+    # 带末尾点的实体引用：逻辑节点 ===DY1.AH1.1 全部创建，设备挂在其下
+    assert ('===DY1.AH1', '===DY1.AH1.1', 'hierarchy') in edges
+    assert ('===DY1.AH1.1', DEVICE_CODE_PREFIX + 'GK5', 'power_supply') in edges
+    # 子节点由实体设备供电，而不是由逻辑节点供电
+    assert (DEVICE_CODE_PREFIX + 'GK5', '===DY1.AH1.1.1', 'hierarchy') in edges
+    assert ('===DY1.AH1.1', '===DY1.AH1.1.1', 'hierarchy') not in edges
+
+    leaf = plan.nodes['===DY1.AH1.1.1']
+    assert (leaf.label, leaf.node_type) == ('1回路', 'device')
+
+
+def test_label_upgrade_and_edge_dedup():
+    plan = build_power_graph(FILE_ID, [
+        {'full_code': '===DY1.AH1', 'asset_code': '', 'name': '=不是名称'},
+        {'full_code': '===DY1.AH1', 'asset_code': '', 'name': '1#高压柜'},
+        {'full_code': '===DY1.AH1.QF1', 'asset_code': '', 'name': ''},
+        {'full_code': '+++L1', 'asset_code': 'X', 'name': '非电源编码'},
+        {'full_code': '', 'asset_code': 'Y', 'name': ''},
+    ], {})
+
+    # 以 '=' 开头的名称视为编码，不作为标签；后续行的有效名称替换短码标签
+    assert plan.nodes['===DY1.AH1'].label == '1#高压柜'
+    assert plan.nodes['===DY1.AH1.QF1'].node_type == 'feeder'
+    assert list(plan.nodes) == ['===DY1', '===DY1.AH1', '===DY1.AH1.QF1']
+    assert len(plan.edges) == 2
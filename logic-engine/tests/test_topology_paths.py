@@ -0,0 +1,131 @@
+"""拓扑图最短路径：双向广度优先搜索与 Yen 前 k 条无环路径"""
+
+import random
+from collections import deque
+
+from services.graph_cache import RELATIONS_SOURCE, _build_graph
+
+
+def _graph(node_count, edges):
+    """节点 ID 为 '0'..'n-1'，与节点编号一致；edges 为 (源, 目标, 类型)"""
+    node_ids = [str(i) for i in range(node_count)]
+    return _build_graph(1, RELATIONS_SOURCE, node_ids, node_ids, node_ids,
+                        ((str(source), str(target), type_) for source, target, type_ in edges), 0.0)
+
+
+def _random_edges(rng, node_count, edge_count, types=('FEEDS', 'BACKUP', 'OTHER')):
+    return [(rng.randrange(node_count), rng.randrange(node_count), rng.choice(types)) for _ in range(edge_count)]
+
+
+def _adjacency(node_count, edges, relation_types, banned_edges=()):
+    adjacency = [set() for _ in range(node_count)]
+    for source, target, type_ in edges:
+        if type_ in relation_types and (source, target) not in banned_edges:
+            adjacency[source].add(target)
+    return adjacency
+
+
+def _simple_paths(adjacency, source, target, max_depth):
+    """枚举 source 到 target 的全部无环路径（边数不超过 max_depth）"""
+    paths = []
+    stack = [(source, [source])]
+    while stack:
+        node, path = stack.pop()
+        if node == target:
+            paths.append(tuple(path))
+            continue
+        if len(path) > max_depth:
+            continue
+        for neighbor in adjacency[node]:
+            if neighbor not in path:
+                stack.append((neighbor, path + [neighbor]))
+    return paths
+
+
+def _bfs_distance(adjacency, source, target, banned_nodes=frozenset()):
+    distance = {source: 0}
+    queue = deque([source])
+    while queue:
+        node = queue.popleft()
+        if node == target:
+            return distance[node]
+        for neighbor in adjacency[node]:
+            if neighbor not in distance and neighbor not in banned_nodes:
+                distance[neighbor] = distance[node] + 1
+                queue.append(neighbor)
+    return None
+
+
+def _assert_valid_path(path, adjacency, source, target):
+    assert path[0] == source and path[-1] == target
+    assert len(set(path)) == len(path)
+    assert all(b in adjacency[a] for a, b in zip(path, path[1:]))
+
+
+def test_iter_shortest_paths_matches_simple_path_enumeration():
+    rng = random.Random(11)
+    relation_types = ('FEEDS', 'BACKUP')
+    for _ in range(100):
+        node_count = rng.randint(2, 8)
+        edges = _random_edges(rng, node_count, rng.randint(node_count, 3 * node_count))
+        graph = _graph(node_count, edges)
+        adjacency = _adjacency(node_count, edges, relation_types)
+        max_depth = rng.randint(1, 6)
+
+        for source in range(node_count):
+            for target in range(node_count):
+                if source == target:
+                    continue
+                expected = _simple_paths(adjacency, source, target, max_depth)
+                paths = list(graph.iter_shortest_paths(source, target, relation_types, k=1000, max_depth=max_depth))
+
+                for path in paths:
+                    _assert_valid_path(path, adjacency, source, target)
+                lengths = [len(path) for path in paths]
+                assert lengths == sorted(lengths)
+                # 路径互不相同，且足够大的 k 会列出全部无环路径
+                assert sorted(map(tuple, paths)) == sorted(expected)
+
+                # 较小的 k 返回的路径长度与全部路径中最短的 k 条一致
+                k = rng.randint(1, 4)
+                first = graph.k_shortest_paths(source, target, relation_types, k, max_depth)
+                assert [len(path) for path in first] == sorted(len(path) for path in expected)[:k]
+
+
+def test_shortest_path_respects_banned_nodes_and_edges():
+    rng = random.Random(5)
+    relation_types = ('FEEDS',)
+    for _ in range(300):
+        node_count = rng.randint(2, 9)
+        edges = _random_edges(rng, node_count, rng.randint(1, 24), types=('FEEDS', 'OTHER'))
+        graph = _graph(node_count, edges)
+        type_codes = graph.type_codes(relation_types)
+        source, target = rng.sample(range(node_count), 2)
+        feeds = [(s, t) for s, t, type_ in edges if type_ == 'FEEDS']
+        banned_edges = set(rng.sample(feeds, min(len(feeds), rng.randint(0, 3))))
+        banned_nodes = frozenset(rng.sample([n for n in range(node_count) if n not in (source, target)],
+                                            rng.randint(0, max(0, node_count - 2) // 2)))
+
+        adjacency = _adjacency(node_count, edges, relation_types, banned_edges)
+        distance = _bfs_distance(adjacency, source, target, banned_nodes)
+        path = graph._shortest_path(source, target, type_codes, node_count,
+                                    banned_nodes=banned_nodes, banned_edges=banned_edges)
+        if distance is None:
+            assert path is None
+            continue
+        _assert_valid_path(path, adjacency, source, target)
+        assert len(path) - 1 == distance
+        assert not banned_nodes & set(path)
+
+
+def test_dual_supply_paths():
+    # 0 -> 1 -> 3 与 0 -> 2 -> 3 两条等长路径，另有一条 0 -> 4 -> 5 -> 3 的较长路径，3 -> 0 形成环
+    edges = [(0, 1, 'FEEDS'), (1, 3, 'FEEDS'), (0, 2, 'BACKUP'), (2, 3, 'FEEDS'),
+             (0, 4, 'FEEDS'), (4, 5, 'FEEDS'), (5, 3, 'FEEDS'), (3, 0, 'FEEDS')]
+    graph = _graph(6, edges)
+    paths = graph.k_shortest_paths(0, 3, ('FEEDS', 'BACKUP'), k=5)
+    assert sorted(map(tuple, paths[:2])) == [(0, 1, 3), (0, 2, 3)]
+    assert paths[2:] == [[0, 4, 5, 3]]
+    # 只沿 FEEDS 时备用支路不可用
+    assert graph.k_shortest_paths(0, 3, 'FEEDS', k=5) == [[0, 1, 3], [0, 4, 5, 3]]
+    assert graph.k_shortest_paths(0, 3, 'FEEDS', k=5, max_depth=2) == [[0, 1, 3]]
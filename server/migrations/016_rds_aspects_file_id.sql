@@ -0,0 +1,24 @@
+-- ========================================
+-- rds_aspects 增加 file_id 列
+-- 创建日期: 2026-10-18
+-- 说明: 方面编码直接记录所属文件，为按 file_id 分区 (017) 做准备，
+--       同时避免按文件查询方面时必须关联 rds_objects
+-- ========================================
+
+ALTER TABLE rds_aspects ADD COLUMN IF NOT EXISTS file_id INTEGER REFERENCES model_files(id) ON DELETE CASCADE;
+
+-- 回填已有数据
+UPDATE rds_aspects a
+SET file_id = o.file_id
+FROM rds_objects o
+WHERE o.id = a.object_id
+  AND a.file_id IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_rds_aspects_file_id ON rds_aspects(file_id);
+
+COMMENT ON COLUMN rds_aspects.file_id IS '所属模型文件 ID（与 rds_objects.file_id 一致）';
+
+-- ========================================
+-- 完成
+-- ========================================
+SELECT 'rds_aspects.file_id added successfully' as status;
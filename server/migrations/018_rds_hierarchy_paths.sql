@@ -0,0 +1,88 @@
+-- ========================================
+-- RDS 层级物化路径
+-- 创建日期: 2026-10-18
+-- 说明: rds_aspects / rds_power_nodes 增加 path 列，保存从根节点到自身的编码数组
+--       （沿 parent_code 链，如 {=TA1, =TA1., =TA1.BJ1}），配合 GIN 索引：
+--       - 子树查询: path @> ARRAY['=TA1']（不再需要递归 CTE）
+--       - 祖先查询: full_code = ANY(<节点的 path>)
+--       路径由 logic-engine 导入时调用 rds_refresh_paths(file_id) 维护。
+--       编码包含 = + . 等字符，不符合 ltree 标签规则，因此使用 TEXT[]。
+-- 普通表和分区表 (server/scripts/rds-partition-by-file.sql) 结构均适用；分区表上的索引会自动建在各分区上。
+-- ========================================
+
+-- 1. 路径列
+ALTER TABLE rds_aspects ADD COLUMN IF NOT EXISTS path TEXT[];
+ALTER TABLE rds_power_nodes ADD COLUMN IF NOT EXISTS path TEXT[];
+
+-- 2. 索引
+CREATE INDEX IF NOT EXISTS idx_rds_aspects_path ON rds_aspects USING GIN (path);
+CREATE INDEX IF NOT EXISTS idx_power_nodes_path ON rds_power_nodes USING GIN (path);
+
+-- 3. 计算单个文件的路径（只更新路径发生变化的行，重复调用开销很小）
+--    parent_code 指向文件内不存在的编码时，该节点视为根节点
+CREATE OR REPLACE FUNCTION rds_refresh_paths(p_file_id INTEGER)
+RETURNS VOID AS $$
+BEGIN
+    WITH RECURSIVE codes AS (
+        SELECT DISTINCT full_code, parent_code
+        FROM rds_aspects
+        WHERE file_id = p_file_id
+    ), tree AS (
+        SELECT c.full_code, ARRAY[c.full_code::TEXT] AS path
+        FROM codes c
+        WHERE c.parent_code IS NULL
+           OR NOT EXISTS (SELECT 1 FROM codes p WHERE p.full_code = c.parent_code)
+        UNION ALL
+        SELECT c.full_code, t.path || c.full_code::TEXT
+        FROM codes c
+        JOIN tree t ON c.parent_code = t.full_code
+        WHERE cardinality(t.path) < 64
+    )
+    UPDATE rds_aspects a
+    SET path = t.path
+    FROM tree t
+    WHERE a.file_id = p_file_id
+      AND a.full_code = t.full_code
+      AND a.path IS DISTINCT FROM t.path;
+
+    WITH RECURSIVE tree AS (
+        SELECT n.full_code, ARRAY[n.full_code::TEXT] AS path
+        FROM rds_power_nodes n
+        WHERE n.file_id = p_file_id
+          AND (n.parent_code IS NULL OR NOT EXISTS (
+              SELECT 1 FROM rds_power_nodes p
+              WHERE p.file_id = p_file_id AND p.full_code = n.parent_code
+          ))
+        UNION ALL
+        SELECT n.full_code, t.path || n.full_code::TEXT
+        FROM rds_power_nodes n
+        JOIN tree t ON n.parent_code = t.full_code
+        WHERE n.file_id = p_file_id
+          AND cardinality(t.path) < 64
+    )
+    UPDATE rds_power_nodes n
+    SET path = t.path
+    FROM tree t
+    WHERE n.file_id = p_file_id
+      AND n.full_code = t.full_code
+      AND n.path IS DISTINCT FROM t.path;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 4. 回填已有数据
+SELECT rds_refresh_paths(f.file_id)
+FROM (
+    SELECT DISTINCT file_id FROM rds_aspects WHERE file_id IS NOT NULL
+    UNION
+    SELECT DISTINCT file_id FROM rds_power_nodes WHERE file_id IS NOT NULL
+) f;
+
+-- 5. 注释
+COMMENT ON COLUMN rds_aspects.path IS '从根节点到自身的编码路径（沿 parent_code），用于子树/祖先查询';
+COMMENT ON COLUMN rds_power_nodes.path IS '从根节点到自身的编码路径（沿 parent_code），用于子树/祖先查询';
+COMMENT ON FUNCTION rds_refresh_paths(INTEGER) IS '重新计算模型文件的 rds_aspects / rds_power_nodes 物化路径';
+
+-- ========================================
+-- 完成
+-- ========================================
+SELECT 'RDS hierarchy paths added successfully' as status;
@@ -0,0 +1,46 @@
+-- ========================================
+-- 删除模型文件时清理 RDS 关系与文件分区
+-- 创建日期: 2026-10-18
+-- 说明: 普通表结构下 rds_relations 通过指向 rds_objects 的 ON DELETE CASCADE 外键随对象删除；
+--       按 file_id 分区（server/scripts/rds-partition-by-file.sql）后这两个外键不复存在，
+--       DELETE FROM model_files 只会级联删除分区中的行，留下孤立的关系和空分区。
+--       这里在 model_files 上增加 BEFORE DELETE 触发器：
+--       - 删除引用该文件对象的 rds_relations（必须在对象被级联删除之前执行，因此用 BEFORE）
+--       - 删除该文件的分区 <表名>_f<file_id>（不存在时跳过）
+--       普通表和分区表结构均适用；普通表结构下与外键级联的效果相同。
+-- ========================================
+
+CREATE OR REPLACE FUNCTION rds_cleanup_model_file()
+RETURNS TRIGGER AS $$
+DECLARE
+    parent_table TEXT;
+    partition_table TEXT;
+BEGIN
+    DELETE FROM rds_relations
+    WHERE source_obj_id IN (SELECT id FROM rds_objects WHERE file_id = OLD.id)
+       OR target_obj_id IN (SELECT id FROM rds_objects WHERE file_id = OLD.id);
+
+    -- 先边后节点，先方面后对象（与 logic-engine 删除分区的顺序一致）
+    FOREACH parent_table IN ARRAY ARRAY['rds_power_edges', 'rds_power_nodes', 'rds_aspects', 'rds_objects'] LOOP
+        partition_table := parent_table || '_f' || OLD.id;
+        IF to_regclass(partition_table) IS NOT NULL THEN
+            EXECUTE format('DROP TABLE %I', partition_table);
+        END IF;
+    END LOOP;
+
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS rds_cleanup_model_file ON model_files;
+CREATE TRIGGER rds_cleanup_model_file
+    BEFORE DELETE ON model_files
+    FOR EACH ROW
+    EXECUTE FUNCTION rds_cleanup_model_file();
+
+COMMENT ON FUNCTION rds_cleanup_model_file() IS '删除模型文件前清理其 RDS 关系和文件分区';
+
+-- ========================================
+-- 完成
+-- ========================================
+SELECT 'RDS model file cleanup trigger created successfully' as status;
@@ -390,6 +390,24 @@ router.post('/topology/trace', async (req, res) => {
     }
 });
 
+/**
+ * POST /api/rds/topology/trace/batch
+ * 代理调用 Logic Engine 批量拓扑追溯（多个起始对象一次请求）
+ * Body: { object_ids, direction, relation_type }
+ */
+router.post('/topology/trace/batch', async (req, res) => {
+    try {
+        const response = await axios.post(`${LOGIC_ENGINE_URL}/api/topology/trace/batch`, req.body);
+        res.json(response.data);
+    } catch (error) {
+        console.error('批量拓扑追溯失败:', error.response?.data || error.message);
+        res.status(error.response?.status || 500).json({
+            success: false,
+            error: error.response?.data?.detail || error.message
+        });
+    }
+});
+
 // ==================== BIM 联动接口 ====================
 
 /**
@@ -532,7 +550,7 @@ router.get('/health', async (req, res) => {
 router.post('/import/:fileId', upload.single('file'), async (req, res) => {
     const { fileId } = req.params;
     // 注意：multer 解析完后参数在 req.query 或 req.body
-    const { clearExisting, createRelations } = req.query;
+    const { clearExisting, createRelations, delta } = req.query;
 
     if (!req.file) {
         return res.status(400).json({ success: false, error: '未找到上传文件' });
@@ -550,8 +568,8 @@ router.post('/import/:fileId', upload.single('file'), async (req, res) => {
         });
 
         // 构造 Logic Engine URL
-        // 注意 Logic Engine 期望的参数名是 clear_existing 和 create_relations
-        const targetUrl = `${LOGIC_ENGINE_URL}/api/import/excel/${fileId}?clear_existing=${clearExisting || true}&create_relations=${createRelations !== 'false'}`;
+        // 注意 Logic Engine 期望的参数名是 clear_existing、create_relations 和 delta（增量导入）
+        const targetUrl = `${LOGIC_ENGINE_URL}/api/import/excel/${fileId}?clear_existing=${clearExisting || true}&create_relations=${createRelations !== 'false'}&delta=${delta === 'true'}`;
 
         // 发送给 Logic Engine
         const response = await axios.post(targetUrl, formData, {
@@ -0,0 +1,81 @@
+/**
+ * 将 RDS 表改为按 file_id 分区（可选操作，不随 migrate.js 自动执行）
+ *
+ * 执行 rds-partition-by-file.sql：重写 rds_objects / rds_aspects / rds_power_nodes /
+ * rds_power_edges 四张表，数据量大时耗时较长，请在维护窗口内执行，完成后重启 logic-engine。
+ *
+ * Usage: node scripts/partition-rds-by-file.js
+ */
+
+import { readFileSync } from 'fs';
+import { join, dirname } from 'path';
+import { fileURLToPath, pathToFileURL } from 'url';
+import dotenv from 'dotenv';
+import fs from 'fs';
+
+const __filename = fileURLToPath(import.meta.url);
+const __dirname = dirname(__filename);
+
+// 加载环境变量 (与 migrate.js 保持一致)
+const rootEnvPath = join(__dirname, '../../.env');
+const localEnvPath = join(__dirname, '../../.env.local');
+
+if (fs.existsSync(rootEnvPath)) {
+    dotenv.config({ path: rootEnvPath });
+}
+if (fs.existsSync(localEnvPath)) {
+    dotenv.config({ path: localEnvPath, override: true });
+}
+
+const dbConfigPath = join(__dirname, '../config/database.js');
+const sqlPath = join(__dirname, 'rds-partition-by-file.sql');
+
+async function partitionRdsTables() {
+    const { getClient } = await import(pathToFileURL(dbConfigPath).href);
+    const client = await getClient();
+
+    try {
+        const { rows } = await client.query(
+            "SELECT relkind FROM pg_class WHERE oid = to_regclass('rds_objects')"
+        );
+        if (rows.length === 0) {
+            console.error('❌ rds_objects 表不存在，请先执行数据库迁移 (node scripts/migrate.js)');
+            process.exit(1);
+        }
+        if (rows[0].relkind === 'p') {
+            console.log('✨ RDS 表已按 file_id 分区，无需重复执行。');
+            process.exit(0);
+        }
+
+        const { rows: triggerRows } = await client.query(
+            "SELECT 1 FROM pg_trigger WHERE tgname = 'rds_cleanup_model_file'"
+        );
+        if (triggerRows.length === 0) {
+            console.error('❌ 缺少 model_files 清理触发器，请先执行数据库迁移 (019_rds_model_file_cleanup.sql)');
+            process.exit(1);
+        }
+
+        console.log('⏳ 正在将 RDS 表改为按 file_id 分区...');
+        const sql = readFileSync(sqlPath, 'utf8');
+
+        // 使用同一连接上的事务，失败时整体回滚，不丢失任何数据
+        try {
+            await client.query('BEGIN');
+            await client.query(sql);
+            await client.query('COMMIT');
+        } catch (err) {
+            await client.query('ROLLBACK');
+            throw err;
+        }
+
+        console.log('✅ RDS 表分区完成，请重启 logic-engine 以识别新的表结构。');
+        process.exit(0);
+    } catch (error) {
+        console.error('❌ RDS 表分区失败:', error.message || error);
+        process.exit(1);
+    } finally {
+        client.release();
+    }
+}
+
+partitionRdsTables();
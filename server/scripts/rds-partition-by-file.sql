@@ -0,0 +1,233 @@
+-- ========================================
+-- RDS 表按 file_id 分区（可选，不在 server/migrations 中自动执行）
+-- 创建日期: 2026-10-18
+-- 执行方式: node server/scripts/partition-rds-by-file.js（或 npm run db:partition-rds）
+-- 说明: rds_objects / rds_aspects / rds_power_nodes / rds_power_edges 改为 LIST 分区表，
+--       每个模型文件一个分区（rds_objects_f<file_id> 等），另有 DEFAULT 分区兜底。
+--       清除文件数据时由 logic-engine 直接删除分区，不再逐行 DELETE。
+--       该脚本会重写四张表，数据量大时耗时较长，应在维护窗口内执行；执行后需重启 logic-engine。
+--
+-- 分区表的主键和唯一约束必须包含分区键，因此：
+-- - 主键改为 (id, file_id)
+-- - rds_aspects 唯一约束改为 (file_id, object_id, aspect_type, full_code)
+-- - rds_power_edges 唯一约束改为 (file_id, source_node_id, target_node_id, relation_type)
+-- - 表之间（含 rds_relations -> rds_objects）不再有外键；删除模型文件时由
+--   019_rds_model_file_cleanup.sql 的触发器删除关系和文件分区，清除数据时由 logic-engine 负责
+-- 依赖 016_rds_aspects_file_id.sql、018_rds_hierarchy_paths.sql、019_rds_model_file_cleanup.sql。
+-- file_id 为空的历史数据无法归入分区：存在这类数据时中止，不丢弃任何行，需先人工处理。
+-- ========================================
+
+-- 0. 检查无法归入分区的数据
+DO $$
+DECLARE
+    orphan_objects BIGINT;
+    orphan_aspects BIGINT;
+    orphan_nodes BIGINT;
+    orphan_edges BIGINT;
+BEGIN
+    SELECT COUNT(*) INTO orphan_objects FROM rds_objects WHERE file_id IS NULL;
+    SELECT COUNT(*) INTO orphan_aspects FROM rds_aspects WHERE file_id IS NULL OR object_id IS NULL;
+    SELECT COUNT(*) INTO orphan_nodes FROM rds_power_nodes WHERE file_id IS NULL;
+    SELECT COUNT(*) INTO orphan_edges FROM rds_power_edges
+    WHERE file_id IS NULL OR source_node_id IS NULL OR target_node_id IS NULL;
+
+    IF orphan_objects + orphan_aspects + orphan_nodes + orphan_edges > 0 THEN
+        RAISE EXCEPTION '存在无法归入分区的数据（file_id 或关联 ID 为空）: rds_objects=%, rds_aspects=%, rds_power_nodes=%, rds_power_edges=%，请先处理后再执行',
+            orphan_objects, orphan_aspects, orphan_nodes, orphan_edges;
+    END IF;
+END $$;
+
+-- 补齐 add_mc_code.js 添加的列，保证新旧表结构一致
+ALTER TABLE rds_objects ADD COLUMN IF NOT EXISTS mc_code VARCHAR(255);
+
+-- 1. 旧表改名，暂时保留数据
+ALTER TABLE rds_objects RENAME TO rds_objects_legacy;
+ALTER TABLE rds_aspects RENAME TO rds_aspects_legacy;
+ALTER TABLE rds_power_nodes RENAME TO rds_power_nodes_legacy;
+ALTER TABLE rds_power_edges RENAME TO rds_power_edges_legacy;
+
+-- 2. 分区父表（约束和索引在旧表删除后再创建，沿用原有名称）
+CREATE TABLE rds_objects (
+    id UUID NOT NULL DEFAULT gen_random_uuid(),
+    file_id INTEGER NOT NULL,
+    object_type VARCHAR(20) NOT NULL DEFAULT 'asset',
+    ref_code VARCHAR(255) NOT NULL,
+    bim_guid VARCHAR(255),
+    name VARCHAR(500),
+    metadata JSONB,
+    mc_code VARCHAR(255),
+    created_at TIMESTAMP DEFAULT NOW(),
+    updated_at TIMESTAMP DEFAULT NOW()
+) PARTITION BY LIST (file_id);
+
+CREATE TABLE rds_aspects (
+    id UUID NOT NULL DEFAULT gen_random_uuid(),
+    file_id INTEGER NOT NULL,
+    object_id UUID NOT NULL,
+    aspect_type VARCHAR(20) NOT NULL,
+    full_code VARCHAR(512) NOT NULL,
+    prefix VARCHAR(5) NOT NULL,
+    parent_code VARCHAR(512),
+    hierarchy_level INTEGER NOT NULL,
+    path TEXT[],
+    created_at TIMESTAMP DEFAULT NOW()
+) PARTITION BY LIST (file_id);
+
+CREATE TABLE rds_power_nodes (
+    id UUID NOT NULL DEFAULT gen_random_uuid(),
+    file_id INTEGER NOT NULL,
+    object_id UUID,
+    full_code VARCHAR(255) NOT NULL,
+    short_code VARCHAR(50) NOT NULL,
+    parent_code VARCHAR(255),
+    label VARCHAR(255),
+    level INTEGER NOT NULL DEFAULT 1,
+    node_type VARCHAR(50) DEFAULT 'device',
+    properties JSONB,
+    path TEXT[],
+    created_at TIMESTAMP DEFAULT NOW(),
+    updated_at TIMESTAMP DEFAULT NOW()
+) PARTITION BY LIST (file_id);
+
+CREATE TABLE rds_power_edges (
+    id UUID NOT NULL DEFAULT gen_random_uuid(),
+    file_id INTEGER NOT NULL,
+    source_node_id UUID NOT NULL,
+    target_node_id UUID NOT NULL,
+    relation_type VARCHAR(50) NOT NULL DEFAULT 'hierarchy',
+    properties JSONB,
+    created_at TIMESTAMP DEFAULT NOW()
+) PARTITION BY LIST (file_id);
+
+CREATE TABLE rds_objects_default PARTITION OF rds_objects DEFAULT;
+CREATE TABLE rds_aspects_default PARTITION OF rds_aspects DEFAULT;
+CREATE TABLE rds_power_nodes_default PARTITION OF rds_power_nodes DEFAULT;
+CREATE TABLE rds_power_edges_default PARTITION OF rds_power_edges DEFAULT;
+
+-- 3. 为文件创建分区（logic-engine 导入前调用，幂等）
+-- DEFAULT 分区中已有该文件的数据时，先移出再创建分区，否则 CREATE TABLE ... PARTITION OF 会失败
+CREATE OR REPLACE FUNCTION rds_ensure_file_partitions(p_file_id INTEGER)
+RETURNS VOID AS $$
+DECLARE
+    parent_table TEXT;
+    partition_table TEXT;
+BEGIN
+    -- 同一文件的并发导入串行化创建分区
+    PERFORM pg_advisory_xact_lock(81346, p_file_id);
+
+    FOREACH parent_table IN ARRAY ARRAY['rds_objects', 'rds_aspects', 'rds_power_nodes', 'rds_power_edges'] LOOP
+        partition_table := parent_table || '_f' || p_file_id;
+        IF to_regclass(partition_table) IS NOT NULL THEN
+            CONTINUE;
+        END IF;
+
+        EXECUTE format('CREATE TEMP TABLE _rds_partition_rows (LIKE %I) ON COMMIT DROP', parent_table);
+        EXECUTE format(
+            'WITH moved AS (DELETE FROM %I WHERE file_id = $1 RETURNING *) INSERT INTO _rds_partition_rows SELECT * FROM moved',
+            parent_table || '_default'
+        ) USING p_file_id;
+        EXECUTE format('CREATE TABLE %I PARTITION OF %I FOR VALUES IN (%s)', partition_table, parent_table, p_file_id);
+        EXECUTE format('INSERT INTO %I SELECT * FROM _rds_partition_rows', parent_table);
+        DROP TABLE _rds_partition_rows;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 4. 为已有文件建分区并迁移数据（第 0 步已确认不存在 file_id 为空的行）
+SELECT rds_ensure_file_partitions(f.file_id)
+FROM (
+    SELECT file_id FROM rds_objects_legacy
+    UNION SELECT file_id FROM rds_aspects_legacy
+    UNION SELECT file_id FROM rds_power_nodes_legacy
+    UNION SELECT file_id FROM rds_power_edges_legacy
+) f;
+
+INSERT INTO rds_objects (id, file_id, object_type, ref_code, bim_guid, name, metadata, mc_code, created_at, updated_at)
+SELECT id, file_id, object_type, ref_code, bim_guid, name, metadata, mc_code, created_at, updated_at
+FROM rds_objects_legacy;
+
+INSERT INTO rds_aspects (id, file_id, object_id, aspect_type, full_code, prefix, parent_code, hierarchy_level, path, created_at)
+SELECT id, file_id, object_id, aspect_type, full_code, prefix, parent_code, hierarchy_level, path, created_at
+FROM rds_aspects_legacy;
+
+INSERT INTO rds_power_nodes (id, file_id, object_id, full_code, short_code, parent_code, label, level, node_type, properties, path, created_at, updated_at)
+SELECT id, file_id, object_id, full_code, short_code, parent_code, label, level, node_type, properties, path, created_at, updated_at
+FROM rds_power_nodes_legacy;
+
+INSERT INTO rds_power_edges (id, file_id, source_node_id, target_node_id, relation_type, properties, created_at)
+SELECT id, file_id, source_node_id, target_node_id, relation_type, properties, created_at
+FROM rds_power_edges_legacy;
+
+-- 5. 删除旧表（同时删除 rds_relations 指向 rds_objects 的外键，
+--    删除模型文件时的关系清理由 019 的 model_files 触发器接管）
+DROP TABLE rds_power_edges_legacy CASCADE;
+DROP TABLE rds_power_nodes_legacy CASCADE;
+DROP TABLE rds_aspects_legacy CASCADE;
+DROP TABLE rds_objects_legacy CASCADE;
+
+-- 6. 约束
+ALTER TABLE rds_objects ADD PRIMARY KEY (id, file_id);
+ALTER TABLE rds_objects ADD CONSTRAINT rds_objects_file_id_object_type_ref_code_key UNIQUE (file_id, object_type, ref_code);
+ALTER TABLE rds_objects ADD CONSTRAINT rds_objects_file_id_fkey FOREIGN KEY (file_id) REFERENCES model_files(id) ON DELETE CASCADE;
+
+ALTER TABLE rds_aspects ADD PRIMARY KEY (id, file_id);
+ALTER TABLE rds_aspects ADD CONSTRAINT rds_aspects_file_id_object_id_aspect_type_full_code_key UNIQUE (file_id, object_id, aspect_type, full_code);
+ALTER TABLE rds_aspects ADD CONSTRAINT rds_aspects_file_id_fkey FOREIGN KEY (file_id) REFERENCES model_files(id) ON DELETE CASCADE;
+
+ALTER TABLE rds_power_nodes ADD PRIMARY KEY (id, file_id);
+ALTER TABLE rds_power_nodes ADD CONSTRAINT rds_power_nodes_file_id_full_code_key UNIQUE (file_id, full_code);
+ALTER TABLE rds_power_nodes ADD CONSTRAINT rds_power_nodes_file_id_fkey FOREIGN KEY (file_id) REFERENCES model_files(id) ON DELETE CASCADE;
+
+ALTER TABLE rds_power_edges ADD PRIMARY KEY (id, file_id);
+ALTER TABLE rds_power_edges ADD CONSTRAINT rds_power_edges_file_id_source_target_type_key UNIQUE (file_id, source_node_id, target_node_id, relation_type);
+ALTER TABLE rds_power_edges ADD CONSTRAINT rds_power_edges_file_id_fkey FOREIGN KEY (file_id) REFERENCES model_files(id) ON DELETE CASCADE;
+
+-- 7. 索引（file_id 由分区裁剪覆盖，不再单独建索引）
+CREATE INDEX IF NOT EXISTS idx_rds_objects_ref_code ON rds_objects(ref_code);
+CREATE INDEX IF NOT EXISTS idx_rds_objects_object_type ON rds_objects(object_type);
+CREATE INDEX IF NOT EXISTS idx_rds_objects_bim_guid ON rds_objects(bim_guid);
+CREATE INDEX IF NOT EXISTS idx_rds_objects_mc_code ON rds_objects(mc_code);
+
+CREATE INDEX IF NOT EXISTS idx_rds_aspects_object_id ON rds_aspects(object_id);
+CREATE INDEX IF NOT EXISTS idx_rds_aspects_type ON rds_aspects(aspect_type);
+CREATE INDEX IF NOT EXISTS idx_rds_aspects_full_code ON rds_aspects(full_code);
+CREATE INDEX IF NOT EXISTS idx_rds_aspects_parent_code ON rds_aspects(parent_code);
+CREATE INDEX IF NOT EXISTS idx_rds_aspects_level ON rds_aspects(hierarchy_level);
+CREATE INDEX IF NOT EXISTS idx_rds_aspects_type_level ON rds_aspects(aspect_type, hierarchy_level);
+CREATE INDEX IF NOT EXISTS idx_rds_aspects_path ON rds_aspects USING GIN (path);
+
+CREATE INDEX IF NOT EXISTS idx_power_nodes_full_code ON rds_power_nodes(full_code);
+CREATE INDEX IF NOT EXISTS idx_power_nodes_parent_code ON rds_power_nodes(parent_code);
+CREATE INDEX IF NOT EXISTS idx_power_nodes_object_id ON rds_power_nodes(object_id);
+CREATE INDEX IF NOT EXISTS idx_power_nodes_level ON rds_power_nodes(level);
+CREATE INDEX IF NOT EXISTS idx_power_nodes_type ON rds_power_nodes(node_type);
+CREATE INDEX IF NOT EXISTS idx_power_nodes_path ON rds_power_nodes USING GIN (path);
+
+CREATE INDEX IF NOT EXISTS idx_power_edges_source ON rds_power_edges(source_node_id);
+CREATE INDEX IF NOT EXISTS idx_power_edges_target ON rds_power_edges(target_node_id);
+CREATE INDEX IF NOT EXISTS idx_power_edges_type ON rds_power_edges(relation_type);
+CREATE INDEX IF NOT EXISTS idx_power_edges_source_type ON rds_power_edges(source_node_id, relation_type);
+CREATE INDEX IF NOT EXISTS idx_power_edges_target_type ON rds_power_edges(target_node_id, relation_type);
+
+-- 8. 触发器：自动更新 updated_at
+CREATE TRIGGER update_rds_objects_updated_at
+    BEFORE UPDATE ON rds_objects
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
+CREATE TRIGGER update_rds_power_nodes_updated_at
+    BEFORE UPDATE ON rds_power_nodes
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
+-- 9. 注释
+COMMENT ON TABLE rds_objects IS 'RDS 核心对象表，存储设备和空间实体（按 file_id 分区）';
+COMMENT ON TABLE rds_aspects IS 'RDS 方面编码表，存储对象的多维度编码（按 file_id 分区）';
+COMMENT ON TABLE rds_power_nodes IS '电源网络节点表，存储电源功能图的所有节点（按 file_id 分区）';
+COMMENT ON TABLE rds_power_edges IS '电源网络边表，存储节点间的层级和供电关系（按 file_id 分区）';
+COMMENT ON FUNCTION rds_ensure_file_partitions(INTEGER) IS '为模型文件创建四张 RDS 表的分区（幂等）';
+
+-- ========================================
+-- 完成
+-- ========================================
+SELECT 'RDS tables partitioned by file_id successfully' as status;